@@ -0,0 +1,32 @@
+"""sell_requests.version for optimistic locking
+
+Revision ID: 3b7d2f1a9c40
+Revises: ec5dd4354f0b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2f1a9c40'
+down_revision: Union[str, Sequence[str], None] = 'ec5dd4354f0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('sell_requests') as batch_op:
+        batch_op.add_column(
+            sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False)
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('sell_requests') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,37 @@
+"""indexes for hot query predicates
+
+Revision ID: 5e1c8a7b2d93
+Revises: 3b7d2f1a9c40
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1c8a7b2d93'
+down_revision: Union[str, Sequence[str], None] = '3b7d2f1a9c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_asic_models_line_name', 'asic_models', ['model_line_id', 'name']),
+    ('ix_asic_models_active_line', 'asic_models', ['is_active', 'model_line_id']),
+    ('ix_sell_requests_status_created', 'sell_requests', ['status', 'created_at']),
+    ('ix_users_notifications_uid', 'users', ['notifications', 'uid']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,57 @@
+"""asic_model_coins association table
+
+Revision ID: 8a4f0c2e6b17
+Revises: 5e1c8a7b2d93
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4f0c2e6b17'
+down_revision: Union[str, Sequence[str], None] = '5e1c8a7b2d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    links = op.create_table('asic_model_coins',
+    sa.Column('model_id', sa.Integer(), nullable=False),
+    sa.Column('coin_symbol', sa.String(length=10), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['model_id'], ['asic_models.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('model_id', 'coin_symbol', name='uq_asic_model_coins_model_coin')
+    )
+    op.create_index('ix_asic_model_coins_coin_model', 'asic_model_coins', ['coin_symbol', 'model_id'], unique=False)
+
+    # Переносим строки get_coin ("BTC, BCH, BSV") в таблицу связей
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.text("SELECT id, get_coin FROM asic_models WHERE get_coin IS NOT NULL AND get_coin != ''")
+    ).all()
+    values = []
+    for model_id, get_coin in rows:
+        symbols = []
+        for part in get_coin.split(','):
+            symbol = part.strip().upper()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+        values.extend(
+            {'model_id': model_id, 'coin_symbol': symbol, 'position': position}
+            for position, symbol in enumerate(symbols)
+        )
+    if values:
+        op.bulk_insert(links, values)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_asic_model_coins_coin_model', table_name='asic_model_coins')
+    op.drop_table('asic_model_coins')
@@ -0,0 +1,44 @@
+"""outbox_messages: persistent queue of admin notifications with retries
+
+Revision ID: a6d2f4b8c915
+Revises: f3c8a1d5b702
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2f4b8c915'
+down_revision: Union[str, Sequence[str], None] = 'f3c8a1d5b702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_messages',
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('message_text', sa.Text(), nullable=False),
+    sa.Column('photo', sa.String(length=255), nullable=True),
+    sa.Column('fallback_text', sa.Text(), nullable=True),
+    sa.Column('parse_mode', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=20), server_default=sa.text("'pending'"), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_messages_status_next', 'outbox_messages', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_messages_status_next', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
@@ -0,0 +1,57 @@
+"""resumable broadcast jobs: progress columns and broadcast_deliveries
+
+Revision ID: c41e9d7a2b58
+Revises: 8a4f0c2e6b17
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9d7a2b58'
+down_revision: Union[str, Sequence[str], None] = '8a4f0c2e6b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('broadcast_messages') as batch_op:
+        batch_op.add_column(
+            sa.Column('status', sa.String(length=20), server_default=sa.text("'done'"), nullable=False)
+        )
+        batch_op.add_column(sa.Column('chat_id', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('status_message_id', sa.BigInteger(), nullable=True))
+        for name in ('total', 'sent', 'failed', 'unknown'):
+            batch_op.add_column(
+                sa.Column(name, sa.Integer(), server_default=sa.text('0'), nullable=False)
+            )
+        batch_op.add_column(sa.Column('last_uid', sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column('finished_at', sa.DateTime(), nullable=True))
+
+    op.create_table('broadcast_deliveries',
+    sa.Column('broadcast_id', sa.Integer(), nullable=False),
+    sa.Column('uid', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['broadcast_id'], ['broadcast_messages.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('broadcast_id', 'uid', name='uq_broadcast_deliveries_broadcast_uid')
+    )
+    op.create_index('ix_broadcast_deliveries_broadcast_status', 'broadcast_deliveries', ['broadcast_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_broadcast_deliveries_broadcast_status', table_name='broadcast_deliveries')
+    op.drop_table('broadcast_deliveries')
+    with op.batch_alter_table('broadcast_messages') as batch_op:
+        for name in (
+            'finished_at', 'last_uid', 'unknown', 'failed', 'sent', 'total',
+            'status_message_id', 'chat_id', 'status',
+        ):
+            batch_op.drop_column(name)
@@ -0,0 +1,49 @@
+"""ai_conversations, media_files: tables created until now only by create_all
+
+Revision ID: c5f1e8a3d247
+Revises: b9e4c7a1f326
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1e8a3d247'
+down_revision: Union[str, Sequence[str], None] = 'b9e4c7a1f326'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # На установках, где бот сам создавал таблицы при старте, они уже есть
+    op.create_table('ai_conversations',
+    sa.Column('uid', sa.BigInteger(), nullable=False),
+    sa.Column('conversation_id', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('uid'),
+    if_not_exists=True,
+    )
+    op.create_table('media_files',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('file_id', sa.String(length=255), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash'),
+    if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('media_files')
+    op.drop_table('ai_conversations')
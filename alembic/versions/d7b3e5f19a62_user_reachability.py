@@ -0,0 +1,46 @@
+"""user reachability: skip blocked and deactivated recipients in fan-out
+
+Revision ID: d7b3e5f19a62
+Revises: c41e9d7a2b58
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3e5f19a62'
+down_revision: Union[str, Sequence[str], None] = 'c41e9d7a2b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(
+            sa.Column('is_reachable', sa.Boolean(), server_default=sa.true(), nullable=False)
+        )
+        batch_op.add_column(sa.Column('unreachable_at', sa.DateTime(), nullable=True))
+
+    op.drop_index('ix_users_notifications_uid', table_name='users', if_exists=True)
+    op.create_index('ix_users_reachable_uid', 'users', ['is_reachable', 'uid'], unique=False)
+    op.create_index(
+        'ix_users_reachable_notifications_uid',
+        'users',
+        ['is_reachable', 'notifications', 'uid'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_reachable_notifications_uid', table_name='users')
+    op.drop_index('ix_users_reachable_uid', table_name='users')
+    op.create_index('ix_users_notifications_uid', 'users', ['notifications', 'uid'], unique=False)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('unreachable_at')
+        batch_op.drop_column('is_reachable')
@@ -0,0 +1,36 @@
+"""refreshed_at for algorithm_data and coin_network_params
+
+Revision ID: d8a3f6c1e947
+Revises: c5f1e8a3d247
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f6c1e947'
+down_revision: Union[str, Sequence[str], None] = 'c5f1e8a3d247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('algorithm_data', 'coin_network_params')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL у всех строк: до первого обновления из источника значения считаются начальными
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('refreshed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('refreshed_at')
@@ -0,0 +1,55 @@
+"""coin_network_params: per-coin block time, reward, hashrate and merged-mining parent
+
+Revision ID: f3c8a1d5b702
+Revises: e2a9c6d4f813
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d5b702'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c6d4f813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ALGORITHMS = ('SHA256', 'SCRYPT', 'ETCHASH', 'KHEAVYHASH', 'BLAKE2S', 'BLAKE2B_SHA3')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table = op.create_table('coin_network_params',
+    sa.Column('symbol', sa.String(length=10), nullable=False),
+    # Тип algorithm уже создан вместе с algorithm_data
+    sa.Column('algorithm', postgresql.ENUM(*ALGORITHMS, name='algorithm', create_type=False), nullable=False),
+    sa.Column('block_time', sa.Float(), nullable=True),
+    sa.Column('block_reward', sa.Float(), nullable=True),
+    sa.Column('network_hashrate', sa.Float(), nullable=True),
+    sa.Column('merged_parent', sa.String(length=10), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('symbol')
+    )
+    # Значения, которые раньше были зашиты в обработчиках калькулятора
+    rows = [
+        ('BTC', 'SHA256', 600, 3.125, None, None),
+        ('BCH', 'SHA256', 600, 3.125, None, None),
+        ('BSV', 'SHA256', 600, 3.125, None, None),
+        ('LTC', 'SCRYPT', 150, 6.25, None, None),
+        ('DOGE', 'SCRYPT', 60, 10000, 2958883, 'LTC'),
+    ]
+    op.bulk_insert(table, [
+        dict(zip(('symbol', 'algorithm', 'block_time', 'block_reward', 'network_hashrate', 'merged_parent'), row))
+        for row in rows
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('coin_network_params')
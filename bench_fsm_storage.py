@@ -0,0 +1,86 @@
+"""
+Накладные расходы хранилища FSM на один апдейт: MemoryStorage против SqlStorage.
+
+Апдейт повторяет то, что делают aiogram и обработчики калькулятора:
+get_state (FSMContextMiddleware), get_data, update_data и set_state.
+Для SqlStorage отдельно меряются первый апдейт чата (чтение из БД),
+апдейты чатов из кэша и запись накопленных изменений одной пачкой.
+
+    python bench_fsm_storage.py
+"""
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database.models import Algorithm, CreateDatabase
+from database.request import FsmReq
+from utils.fsm_storage import SqlStorage
+from utils.states import CalculatorState
+
+CHATS = 2_000
+UPDATES = 20_000
+
+
+def _key(uid: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=uid, user_id=uid)
+
+
+async def _update(storage, key: StorageKey, step: int) -> None:
+    await storage.get_state(key)
+    await storage.get_data(key)
+    await storage.update_data(key, {"algorithm": Algorithm.SCRYPT, "hashrate": step})
+    await storage.set_state(key, CalculatorState.input_power)
+
+
+async def _run(storage, uids) -> float:
+    """Среднее время апдейта, мкс"""
+    started = time.perf_counter()
+    for step, uid in enumerate(uids):
+        await _update(storage, _key(uid), step)
+    return (time.perf_counter() - started) / len(uids) * 1e6
+
+
+async def main() -> None:
+    random.seed(1)
+    first_touch = list(range(CHATS))
+    traffic = [random.randrange(CHATS) for _ in range(UPDATES)]
+
+    memory = MemoryStorage()
+    await _run(memory, first_touch)
+    print(f"MemoryStorage:            {await _run(memory, traffic):8.1f} мкс/апдейт")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = CreateDatabase(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'fsm.db')}"
+        )
+        await db_manager.async_main()
+        fsm_req = FsmReq(db_manager.async_session)
+
+        storage = SqlStorage(fsm_req, flush_interval=3600)
+        cold = await _run(storage, first_touch)
+        print(f"SqlStorage, первый апдейт: {cold:8.1f} мкс/апдейт (чтение из БД)")
+        warm = await _run(storage, traffic)
+        print(f"SqlStorage, из кэша:       {warm:8.1f} мкс/апдейт")
+
+        started = time.perf_counter()
+        await storage.flush()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(
+            f"SqlStorage, запись пачки:  {elapsed:8.1f} мс на {CHATS} чатов "
+            f"({elapsed * 1000 / UPDATES:.1f} мкс на апдейт)"
+        )
+
+        # После перезапуска чаты читаются из БД
+        restarted = SqlStorage(fsm_req)
+        print(f"После перезапуска:         {await _run(restarted, first_touch):8.1f} мкс/апдейт")
+        await restarted.close()
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+Проверка планов горячих запросов.
+
+Заполняет временную SQLite-базу синтетическими данными (100k пользователей,
+10k заявок), выполняет EXPLAIN QUERY PLAN для каждого горячего запроса и
+проверяет, что он идёт по индексу, а не полным сканированием таблицы.
+
+    python bench_query_plans.py
+"""
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, insert, select, text
+
+from database.models import (
+    AsicModel,
+    AsicModelLine,
+    Algorithm,
+    CreateDatabase,
+    Manufacturer,
+    SellRequest,
+    User,
+    UserStatus,
+)
+
+USERS = 100_000
+SELL_REQUESTS = 10_000
+MODEL_LINES = 50
+MODELS_PER_LINE = 20
+
+HOT_QUERIES = {
+    "модели линейки (каталог)": select(AsicModel.id, AsicModel.name)
+    .where(AsicModel.model_line_id == 7)
+    .order_by(AsicModel.name),
+    "активные модели": select(AsicModel.id).where(AsicModel.is_active == True),
+    "заявки в ожидании": select(SellRequest)
+    .where(SellRequest.status == "pending")
+    .order_by(SellRequest.created_at.desc()),
+    "подписчики уведомлений (пачка)": select(User.uid)
+    .where(User.is_reachable == True, User.notifications == True, User.uid > 1_050_000)
+    .order_by(User.uid)
+    .limit(1000),
+    "получатели рассылки (пачка)": select(User.uid)
+    .where(User.is_reachable == True, User.uid > 1_050_000)
+    .order_by(User.uid)
+    .limit(1000),
+    "is_admin": select(User.id).where(
+        and_(User.uid == 4242, User.status == UserStatus.ADMIN)
+    ),
+}
+
+
+async def _seed(db_manager: CreateDatabase) -> None:
+    rnd = random.Random(1)
+    now = datetime.now()
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "uid": 1_000_000 + i,
+                    "uname": f"user{i}",
+                    "status": UserStatus.ADMIN if i % 5000 == 0 else UserStatus.USER,
+                    "notifications": rnd.random() < 0.3,
+                    "is_reachable": rnd.random() < 0.95,
+                    "created_at": now,
+                }
+                for i in range(USERS)
+            ],
+        )
+        await conn.execute(
+            insert(AsicModelLine),
+            [
+                {
+                    "name": f"S{i}",
+                    "manufacturer": Manufacturer.BITMAIN,
+                    "algorithm": Algorithm.SHA256,
+                }
+                for i in range(MODEL_LINES)
+            ],
+        )
+        await conn.execute(
+            insert(AsicModel),
+            [
+                {
+                    "name": f"S{line} {j}T",
+                    "model_line_id": line + 1,
+                    "hash_rate": 100 + j,
+                    "power_consumption": 3000,
+                    "is_active": rnd.random() < 0.1,
+                }
+                for line in range(MODEL_LINES)
+                for j in range(MODELS_PER_LINE)
+            ],
+        )
+        await conn.execute(
+            insert(SellRequest),
+            [
+                {
+                    "user_id": rnd.randint(1, USERS),
+                    "device_id": rnd.randint(1, MODEL_LINES * MODELS_PER_LINE),
+                    "price": 1000,
+                    "condition": "used",
+                    "contact_info": "@seller",
+                    "status": "pending" if rnd.random() < 0.05 else "closed",
+                    "created_at": now - timedelta(minutes=i),
+                }
+                for i in range(SELL_REQUESTS)
+            ],
+        )
+        await conn.execute(text("ANALYZE"))
+
+
+async def _check(db_manager: CreateDatabase) -> bool:
+    ok = True
+    async with db_manager.engine.connect() as conn:
+        for title, query in HOT_QUERIES.items():
+            sql = str(
+                query.compile(
+                    dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                )
+            )
+            plan = (await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+            details = " | ".join(row[-1] for row in plan)
+
+            started = time.perf_counter()
+            await conn.execute(query)
+            elapsed = (time.perf_counter() - started) * 1000
+
+            uses_index = "USING" in details and "INDEX" in details
+            ok &= uses_index
+            print(
+                f"[{'OK' if uses_index else 'SCAN'}] {title}: {elapsed:.2f} мс\n"
+                f"      {details}"
+            )
+    return ok
+
+
+async def main() -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = CreateDatabase(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'plans.db')}"
+        )
+        await db_manager.async_main()
+        await _seed(db_manager)
+        ok = await _check(db_manager)
+        await db_manager.engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,133 @@
+"""
+Бенчмарк горячих чтений: ORM-сущности против проекций колонок (NamedTuple).
+
+Для каждого запроса сравнивает время вызова и объём памяти, выделенной за
+вызов (tracemalloc), при загрузке полных ORM-объектов и при select колонок
+в read-модели, которые теперь возвращают репозитории.
+
+    python bench_read_models.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from database.models import (
+    Algorithm,
+    AlgorithmData,
+    AsicModel,
+    AsicModelLine,
+    Coin,
+    CreateDatabase,
+    Manufacturer,
+)
+from database.request import CalculatorReq, CoinReq
+
+CALLS = 300
+EXTRA_COINS = 200
+MODELS = 2000
+
+
+async def _seed(db_manager: CreateDatabase) -> None:
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(
+            insert(Coin),
+            [
+                {
+                    "symbol": f"C{i}",
+                    "name": f"Coin {i}",
+                    "coin_gecko_id": f"coin-{i}",
+                    "algorithm": Algorithm.SHA256,
+                    "current_price_usd": i,
+                }
+                for i in range(EXTRA_COINS)
+            ],
+        )
+        await conn.execute(
+            insert(AsicModelLine),
+            [{"name": "S21", "manufacturer": Manufacturer.BITMAIN, "algorithm": Algorithm.SHA256}],
+        )
+        await conn.execute(
+            insert(AsicModel),
+            [
+                {
+                    "name": f"S21 {i}T",
+                    "model_line_id": 1,
+                    "hash_rate": 100 + i,
+                    "power_consumption": 3500,
+                    "get_coin": "BTC, BCH",
+                    "is_active": True,
+                }
+                for i in range(MODELS)
+            ],
+        )
+
+
+async def _measure(fn) -> tuple:
+    await fn()  # прогрев
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    await fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await fn()
+    return (time.perf_counter() - started) / CALLS * 1000, peak / 1024
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = CreateDatabase(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'read.db')}"
+        )
+        await db_manager.async_main()
+        await _seed(db_manager)
+        calc_req = CalculatorReq(db_manager.async_session)
+        coin_req = CoinReq(db_manager.async_session)
+        algorithms = set(Algorithm)
+
+        async def orm(stmt):
+            async with db_manager.async_session() as session:
+                return list((await session.execute(stmt)).scalars().all())
+
+        cases = {
+            "get_all_coins": (
+                lambda: orm(select(Coin)),
+                coin_req.get_all_coins,
+            ),
+            "get_coins_by_symbols": (
+                lambda: orm(select(Coin).where(Coin.symbol.in_(["BTC", "LTC", "DOGE"]))),
+                lambda: coin_req.get_coins_by_symbols(["BTC", "LTC", "DOGE"]),
+            ),
+            "get_algorithm_data_batch": (
+                lambda: orm(select(AlgorithmData).where(AlgorithmData.algorithm.in_(algorithms))),
+                lambda: calc_req.get_algorithm_data_batch(algorithms),
+            ),
+            "get_all_asic_models": (
+                lambda: orm(select(AsicModel).where(AsicModel.is_active == True)),
+                calc_req.get_all_asic_models,
+            ),
+            "get_asic_models_by_model_line": (
+                lambda: orm(select(AsicModel).where(AsicModel.model_line_id == 1)),
+                lambda: calc_req.get_asic_models_by_model_line(1),
+            ),
+        }
+
+        print(f"{'запрос':32} {'ORM мс':>8} {'ORM KiB':>9} {'rows мс':>8} {'rows KiB':>9}")
+        for title, (orm_fn, rows_fn) in cases.items():
+            orm_ms, orm_kib = await _measure(orm_fn)
+            rows_ms, rows_kib = await _measure(rows_fn)
+            print(
+                f"{title:32} {orm_ms:8.3f} {orm_kib:9.1f} {rows_ms:8.3f} {rows_kib:9.1f}"
+            )
+
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
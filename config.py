@@ -8,6 +8,90 @@ load_dotenv()
 # Можно переопределить через переменную окружения ADMIN_ID
 ADMIN_ID = int(os.getenv("ADMIN_ID", "1145377244"))
 
+# Администраторы бота (доступ к админ-панели, фото от пользователей) через запятую
+ADMIN_IDS = [int(uid) for uid in os.getenv("ADMIN_IDS", "").split(",") if uid.strip()]
+# Сколько запросов к Telegram одновременно при уведомлении администраторов
+ADMIN_NOTIFY_CONCURRENCY = int(os.getenv("ADMIN_NOTIFY_CONCURRENCY", "5"))
+
+# Кэш привязок пользователь -> чат AI-сервиса и размер пула заранее созданных чатов
+AI_CHAT_CACHE_SIZE = int(os.getenv("AI_CHAT_CACHE_SIZE", "10000"))
+AI_CHAT_POOL_SIZE = int(os.getenv("AI_CHAT_POOL_SIZE", "5"))
+
+# Профиль SQLite: PRAGMA применяются к каждому новому соединению
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Профиль PostgreSQL: пул соединений asyncpg и кэш подготовленных запросов
+# (PG_STATEMENT_CACHE_SIZE=0 при работе через pgbouncer в режиме transaction)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+PG_STATEMENT_CACHE_SIZE = int(os.getenv("PG_STATEMENT_CACHE_SIZE", "500"))
+
+# Реплика только для чтения (необязательно) и сколько секунд после записи
+# пользователь читает с primary, чтобы увидеть свои изменения
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+# Запросы дольше порога (мс) пишутся в лог медленных запросов
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+# Общий темп массовых отправок бота (рассылки и курсы вместе, сообщений в секунду):
+# лимит Telegram ~30 на токен, запас остаётся для ответов пользователям.
+# BROADCAST_RATE - прежнее имя переменной
+BOT_SEND_RATE = float(os.getenv("BOT_SEND_RATE", os.getenv("BROADCAST_RATE", "25")))
+
+# Рассылки: число параллельных отправителей и как часто обновлять сообщение с прогрессом
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_PROGRESS_SECONDS = float(os.getenv("BROADCAST_PROGRESS_SECONDS", "3"))
+
+# Рассылка курсов подписчикам после каждого обновления цен (по умолчанию выключена),
+# темп - общий с рассылками (BOT_SEND_RATE)
+PRICE_NOTIFICATIONS_ENABLED = os.getenv("PRICE_NOTIFICATIONS_ENABLED", "0").lower() in (
+    "1", "true", "yes"
+)
+PRICE_NOTIFICATION_WORKERS = int(os.getenv("PRICE_NOTIFICATION_WORKERS", "8"))
+
+# Счётчики статистики копятся в памяти и пишутся в daily_stats раз в N секунд
+STATS_FLUSH_SECONDS = float(os.getenv("STATS_FLUSH_SECONDS", "5"))
+
+# Данные сети (хешрейт, сложность) для калькулятора: источники через запятую
+# в порядке приоритета (blockchair, fixture), JSON-файл для fixture и период.
+# blockchair покрывает BTC, BCH, BSV, LTC и DOGE; KAS, ETC, KDA и KLS - только через fixture
+NETWORK_STATS_SOURCES = os.getenv("NETWORK_STATS_SOURCES", "blockchair").split(",")
+NETWORK_STATS_FIXTURE = os.getenv("NETWORK_STATS_FIXTURE") or None
+NETWORK_STATS_MINUTES = int(os.getenv("NETWORK_STATS_MINUTES", "30"))
+
+# Заявки администратору уходят через очередь outbox_messages с повторами:
+# сколько попыток отправки до пометки failed
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+# Хранилище FSM: sql - состояния диалогов в БД бота (переживают перезапуск),
+# memory - в памяти процесса. Брошенный диалог сбрасывается через FSM_TTL_HOURS,
+# изменения пишутся в БД пачкой раз в FSM_FLUSH_SECONDS
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sql").lower()
+FSM_TTL_HOURS = float(os.getenv("FSM_TTL_HOURS", "72"))
+FSM_FLUSH_SECONDS = float(os.getenv("FSM_FLUSH_SECONDS", "1"))
+
+# Режим получения апдейтов: polling или webhook. Для webhook нужен публичный
+# HTTPS-адрес WEBHOOK_URL (без пути), бот слушает WEBHOOK_HOST:WEBHOOK_PORT.
+# Без WEBHOOK_SECRET секрет генерируется при каждом запуске
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = (os.getenv("WEBHOOK_URL") or "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+# Очередь апдейтов (при переполнении Telegram получает 503 и повторяет позже)
+# и число параллельных обработчиков
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+
 
 def get_db_url():
     # Если указан DATABASE_URL, используем его
@@ -0,0 +1,159 @@
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.models import AsicModel, AsicModelCoin, AsicModelLine, Manufacturer
+from database.read_models import AsicModelRow, ModelLineRow
+from database.routing import primary_reads
+
+
+def natural_sort_key(text: str) -> list:
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", text)
+    ]
+
+
+class CatalogIndex:
+    """Каталог ASIC в памяти: производитель -> линейки -> модели.
+
+    Загружается тремя запросами (линейки, модели, монеты моделей), сортировка и подписи кнопок считаются один раз.
+    После изменений каталога вызывается invalidate(), следующий запрос
+    перечитает БД. max_age страхует от правок из других процессов
+    (например, fill_asic_models.py).
+    """
+
+    def __init__(self, db_session_maker: async_sessionmaker, max_age: float = 600) -> None:
+        self.db_session_maker = db_session_maker
+        self.max_age = max_age
+        self._lines: Dict[int, ModelLineRow] = {}
+        self._models: Dict[int, AsicModelRow] = {}
+        self._lines_by_manufacturer: Dict[Manufacturer, List[ModelLineRow]] = {}
+        self._models_by_line: Dict[int, List[AsicModelRow]] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+
+    async def load(self) -> None:
+        generation = self._generation
+        # Индекс живёт в памяти до max_age: читаем с primary, а не с отставшей реплики
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                lines_res = await session.execute(
+                    select(
+                        AsicModelLine.id,
+                        AsicModelLine.name,
+                        AsicModelLine.manufacturer,
+                        AsicModelLine.algorithm,
+                    )
+                )
+                models_res = await session.execute(
+                    select(
+                        AsicModel.id,
+                        AsicModel.name,
+                        AsicModel.model_line_id,
+                        AsicModel.hash_rate,
+                        AsicModel.power_consumption,
+                        AsicModel.is_active,
+                    )
+                )
+                coins_res = await session.execute(
+                    select(AsicModelCoin.model_id, AsicModelCoin.coin_symbol).order_by(
+                        AsicModelCoin.model_id, AsicModelCoin.position
+                    )
+                )
+                line_rows = lines_res.all()
+                model_rows = models_res.all()
+                coin_rows = coins_res.all()
+
+        coins_by_model: Dict[int, List[str]] = {}
+        for model_id, symbol in coin_rows:
+            coins_by_model.setdefault(model_id, []).append(symbol)
+
+        lines = {
+            row.id: ModelLineRow(*row, label=f"Модель {row.name}") for row in line_rows
+        }
+        models: Dict[int, AsicModelRow] = {}
+        models_by_line: Dict[int, List[AsicModelRow]] = {}
+        lines_with_active = set()
+        for row in model_rows:
+            model = AsicModelRow(
+                id=row.id,
+                name=row.name,
+                model_line_id=row.model_line_id,
+                hash_rate=row.hash_rate,
+                power_consumption=row.power_consumption,
+                coins=tuple(coins_by_model.get(row.id, ())),
+                is_active=bool(row.is_active),
+                label=row.name,
+            )
+            models[model.id] = model
+            models_by_line.setdefault(model.model_line_id, []).append(model)
+            if model.is_active:
+                lines_with_active.add(model.model_line_id)
+        for line_models in models_by_line.values():
+            line_models.sort(key=lambda m: m.name)
+
+        # В меню показываем только линейки, в которых есть хотя бы одна активная модель
+        lines_by_manufacturer: Dict[Manufacturer, List[ModelLineRow]] = {}
+        for line in sorted(lines.values(), key=lambda l: natural_sort_key(l.name)):
+            if line.id in lines_with_active:
+                lines_by_manufacturer.setdefault(line.manufacturer, []).append(line)
+
+        self._lines = lines
+        self._models = models
+        self._models_by_line = models_by_line
+        self._lines_by_manufacturer = lines_by_manufacturer
+        # Если каталог успели изменить во время загрузки - данные уже устарели
+        if generation == self._generation:
+            self._loaded_at = time.monotonic()
+
+    async def _ensure_loaded(self) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                await self.load()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.max_age
+        )
+
+    async def lines_by_manufacturer(self, manufacturer: Manufacturer) -> List[ModelLineRow]:
+        await self._ensure_loaded()
+        return self._lines_by_manufacturer.get(manufacturer, [])
+
+    async def models_by_line(self, model_line_id: int) -> List[AsicModelRow]:
+        await self._ensure_loaded()
+        return self._models_by_line.get(model_line_id, [])
+
+    async def line(self, model_line_id: int) -> Optional[ModelLineRow]:
+        await self._ensure_loaded()
+        return self._lines.get(model_line_id)
+
+    async def model(self, model_id: int) -> Optional[AsicModelRow]:
+        await self._ensure_loaded()
+        return self._models.get(model_id)
+
+    async def active_models(self) -> List[AsicModelRow]:
+        await self._ensure_loaded()
+        return [model for model in self._models.values() if model.is_active]
+
+    async def all_lines(self) -> List[ModelLineRow]:
+        await self._ensure_loaded()
+        return list(self._lines.values())
+
+    async def all_models(self) -> List[AsicModelRow]:
+        """Все модели, включая снятые с продажи"""
+        await self._ensure_loaded()
+        return list(self._models.values())
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.models import CoinNetworkParams
+from database.read_models import CoinParamsRow
+from database.routing import primary_reads
+
+COIN_PARAMS_COLUMNS = (
+    CoinNetworkParams.symbol,
+    CoinNetworkParams.algorithm,
+    CoinNetworkParams.block_time,
+    CoinNetworkParams.block_reward,
+    CoinNetworkParams.network_hashrate,
+    CoinNetworkParams.merged_parent,
+    CoinNetworkParams.updated_at,
+    CoinNetworkParams.refreshed_at,
+)
+
+
+class CoinParamsIndex:
+    """Параметры сети монет в памяти: symbol -> CoinParamsRow.
+
+    Таблица маленькая (строка на монету) и читается при каждом расчёте,
+    поэтому загружается целиком одним запросом. Как и CatalogIndex:
+    после записи вызывается invalidate(), max_age страхует от правок
+    из других процессов.
+    """
+
+    def __init__(self, db_session_maker: async_sessionmaker, max_age: float = 600) -> None:
+        self.db_session_maker = db_session_maker
+        self.max_age = max_age
+        self._params: Dict[str, CoinParamsRow] = {}
+        self._merged: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+
+    async def load(self) -> None:
+        generation = self._generation
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                res = await session.execute(select(*COIN_PARAMS_COLUMNS))
+                rows = [CoinParamsRow._make(row) for row in res]
+
+        merged: Dict[str, List[str]] = {}
+        for row in sorted(rows, key=lambda r: r.symbol):
+            if row.merged_parent:
+                merged.setdefault(row.merged_parent, []).append(row.symbol)
+
+        self._params = {row.symbol: row for row in rows}
+        self._merged = merged
+        if generation == self._generation:
+            self._loaded_at = time.monotonic()
+
+    async def _ensure_loaded(self) -> None:
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if not self._is_fresh():
+                await self.load()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.max_age
+        )
+
+    async def get(self, symbol: str) -> Optional[CoinParamsRow]:
+        await self._ensure_loaded()
+        return self._params.get(symbol.upper())
+
+    async def merged_coins(self, symbols: Iterable[str]) -> List[str]:
+        """Монеты, которые добываются вместе с symbols и не входят в них"""
+        await self._ensure_loaded()
+        symbols = [symbol.upper() for symbol in symbols]
+        result = []
+        for symbol in symbols:
+            for child in self._merged.get(symbol, ()):
+                if child not in symbols and child not in result:
+                    result.append(child)
+        return result
@@ -0,0 +1,79 @@
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+import config
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def _choice(name: str, value: str, allowed: set) -> str:
+    value = value.upper()
+    if value not in allowed:
+        raise ValueError(f"{name}={value}: допустимые значения {sorted(allowed)}")
+    return value
+
+
+def sqlite_pragmas() -> Dict[str, object]:
+    """PRAGMA профиля SQLite из настроек окружения"""
+    return {
+        "journal_mode": _choice(
+            "SQLITE_JOURNAL_MODE", config.SQLITE_JOURNAL_MODE, _JOURNAL_MODES
+        ),
+        "synchronous": _choice(
+            "SQLITE_SYNCHRONOUS", config.SQLITE_SYNCHRONOUS, _SYNCHRONOUS
+        ),
+        "mmap_size": int(config.SQLITE_MMAP_SIZE),
+        # Отрицательное значение - размер в KiB, а не в страницах
+        "cache_size": -abs(int(config.SQLITE_CACHE_SIZE_KB)),
+        "temp_store": _choice("SQLITE_TEMP_STORE", config.SQLITE_TEMP_STORE, _TEMP_STORE),
+        "busy_timeout": int(config.SQLITE_BUSY_TIMEOUT_MS),
+    }
+
+
+def _install_sqlite_pragmas(engine: AsyncEngine) -> None:
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout первым: смена journal_mode сама может ждать блокировку
+            cursor.execute(f"PRAGMA busy_timeout = {pragmas['busy_timeout']}")
+            for name, value in pragmas.items():
+                if name != "busy_timeout":
+                    cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+
+def create_engine(database_url: str, echo: bool = False) -> AsyncEngine:
+    """Движок БД с профилем производительности для SQLite или PostgreSQL"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        engine = create_async_engine(url, echo=echo)
+        _install_sqlite_pragmas(engine)
+        return engine
+
+    if backend == "postgresql":
+        connect_args = {}
+        if url.get_driver_name() == "asyncpg":
+            connect_args["prepared_statement_cache_size"] = config.PG_STATEMENT_CACHE_SIZE
+        return create_async_engine(
+            url,
+            echo=echo,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args=connect_args,
+        )
+
+    return create_async_engine(url, echo=echo)
@@ -0,0 +1,266 @@
+import functools
+import inspect
+import logging
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Кто выполняет запрос: обработчик aiogram и метод репозитория
+_handler_tag: ContextVar[str] = ContextVar("db_handler_tag", default="-")
+_repo_tag: ContextVar[str] = ContextVar("db_repo_tag", default="-")
+# Счётчик запросов текущего обработчика (список, чтобы менять из событий движка)
+_handler_queries: ContextVar[Optional[List[int]]] = ContextVar(
+    "db_handler_queries", default=None
+)
+
+# Границы корзин гистограммы задержек, мс
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*\$\d+\s*,)+\s*\$\d+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """SQL без переносов, списки IN (?, ?, ?) сворачиваются в (?...)"""
+    statement = _IN_LIST.sub("(?...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def redact_parameters(parameters, executemany: bool = False) -> str:
+    """Описание параметров без значений (в логах не должно быть данных пользователей)"""
+    if executemany:
+        return f"<{len(parameters)} наборов параметров>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}=?" for k in parameters) + "}"
+    if parameters:
+        return f"<{len(parameters)} параметров>"
+    return "<нет параметров>"
+
+
+class LatencyStats:
+    __slots__ = ("count", "total_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile_ms(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает q-й перцентиль"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+class QueryStats:
+    """Статистика запросов к БД в памяти процесса"""
+
+    def __init__(self, slow_query_ms: float = 200.0, max_statements: int = 500) -> None:
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self.reset()
+
+    def reset(self) -> None:
+        self.started_at = time.time()
+        self.by_source: Dict[Tuple[str, str], LatencyStats] = {}
+        self.by_statement: Dict[str, LatencyStats] = {}
+        # Обработчик -> (число вызовов, всего запросов, максимум запросов за вызов)
+        self.by_handler: Dict[str, List[int]] = {}
+        # (обработчик, репозиторий) -> число запросов, завершившихся ошибкой
+        self.errors: Dict[Tuple[str, str], int] = {}
+
+    def record(self, statement: str, parameters, executemany: bool, elapsed_ms: float) -> None:
+        handler, repo = _handler_tag.get(), _repo_tag.get()
+        self.by_source.setdefault((handler, repo), LatencyStats()).add(elapsed_ms)
+
+        normalized = normalize_statement(statement)
+        stats = self.by_statement.get(normalized)
+        if stats is None and len(self.by_statement) < self.max_statements:
+            stats = self.by_statement[normalized] = LatencyStats()
+        if stats is not None:
+            stats.add(elapsed_ms)
+
+        counter = _handler_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning(
+                f"Медленный запрос {elapsed_ms:.0f} мс [{handler} / {repo}]: "
+                f"{normalized[:500]} {redact_parameters(parameters, executemany)}"
+            )
+
+    def record_error(
+        self, statement: str, parameters, executemany: bool, elapsed_ms: float, error: Exception
+    ) -> None:
+        """Запрос завершился ошибкой: в гистограммы задержек не попадает"""
+        handler, repo = _handler_tag.get(), _repo_tag.get()
+        self.errors[(handler, repo)] = self.errors.get((handler, repo), 0) + 1
+        logger.warning(
+            f"Ошибка запроса через {elapsed_ms:.0f} мс [{handler} / {repo}]: "
+            f"{type(error).__name__}: {normalize_statement(statement or '')[:500]} "
+            f"{redact_parameters(parameters, executemany)}"
+        )
+
+    def record_handler(self, handler: str, queries: int) -> None:
+        stats = self.by_handler.setdefault(handler, [0, 0, 0])
+        stats[0] += 1
+        stats[1] += queries
+        stats[2] = max(stats[2], queries)
+
+    def report(self, limit: int = 10) -> str:
+        minutes = (time.time() - self.started_at) / 60
+        lines = [f"📊 Запросы к БД за {minutes:.0f} мин"]
+
+        lines.append("\nОбработчики (вызовов, запросов на вызов: среднее / макс):")
+        top_handlers = sorted(
+            self.by_handler.items(), key=lambda item: item[1][1], reverse=True
+        )[:limit]
+        for handler, (calls, queries, max_queries) in top_handlers:
+            lines.append(f"• {handler}: {calls}, {queries / calls:.1f} / {max_queries}")
+
+        lines.append("\nИсточники по суммарному времени (обработчик / репозиторий):")
+        top_sources = sorted(
+            self.by_source.items(), key=lambda item: item[1].total_ms, reverse=True
+        )[:limit]
+        for (handler, repo), stats in top_sources:
+            lines.append(f"• {handler} / {repo}: {self._format(stats)}")
+
+        if self.errors:
+            lines.append("\nОшибки запросов (обработчик / репозиторий):")
+            top_errors = sorted(self.errors.items(), key=lambda item: item[1], reverse=True)[:limit]
+            for (handler, repo), count in top_errors:
+                lines.append(f"• {handler} / {repo}: {count}")
+
+        lines.append("\nЗапросы по суммарному времени:")
+        top_statements = sorted(
+            self.by_statement.items(), key=lambda item: item[1].total_ms, reverse=True
+        )[:limit]
+        for statement, stats in top_statements:
+            lines.append(f"• {self._format(stats)}\n  {statement[:200]}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format(stats: LatencyStats) -> str:
+        return (
+            f"{stats.count} шт, всего {stats.total_ms:.0f} мс, "
+            f"ср {stats.avg_ms:.1f} мс, p95 ≤{stats.percentile_ms(0.95):.0f} мс, "
+            f"макс {stats.max_ms:.0f} мс"
+        )
+
+
+query_stats = QueryStats(slow_query_ms=config.DB_SLOW_QUERY_MS)
+
+
+def instrument_engine(engine: Engine, stats: QueryStats = query_stats) -> None:
+    """Подписывает синхронный движок на события выполнения запросов"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        stats.record(
+            statement, parameters, executemany, (time.perf_counter() - started) * 1000
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # after_cursor_execute для упавшего запроса не вызывается: без этого время
+        # начала осталось бы в info соединения, которое вернётся в пул
+        conn = context.connection
+        pending = conn.info.get("query_started") if conn is not None else None
+        if not pending:
+            return
+        started = pending.pop()
+        execution = context.execution_context
+        stats.record_error(
+            context.statement,
+            context.parameters,
+            bool(execution is not None and execution.executemany),
+            (time.perf_counter() - started) * 1000,
+            context.original_exception,
+        )
+
+
+@contextmanager
+def handler_scope(name: str, stats: QueryStats = query_stats) -> Iterator[None]:
+    """Запросы внутри блока относятся к обработчику name"""
+    counter = [0]
+    tag_token = _handler_tag.set(name)
+    counter_token = _handler_queries.set(counter)
+    try:
+        yield
+    finally:
+        _handler_queries.reset(counter_token)
+        _handler_tag.reset(tag_token)
+        stats.record_handler(name, counter[0])
+
+
+def _tag_method(name: str, fn):
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def gen_wrapper(*args, **kwargs):
+            agen = fn(*args, **kwargs)
+            while True:
+                token = _repo_tag.set(name)
+                try:
+                    item = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _repo_tag.reset(token)
+                yield item
+
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = _repo_tag.set(name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            _repo_tag.reset(token)
+
+    return wrapper
+
+
+def instrumented(cls):
+    """Декоратор репозитория: запросы публичных async-методов помечаются
+    как 'Класс.метод' в статистике"""
+    for attr, fn in list(vars(cls).items()):
+        if attr.startswith("_"):
+            continue
+        if inspect.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn):
+            setattr(cls, attr, _tag_method(f"{cls.__name__}.{attr}", fn))
+    return cls
@@ -2,14 +2,25 @@
 from contextlib import asynccontextmanager
 from datetime import datetime
 from enum import Enum
+from pathlib import Path
+from typing import List, Optional
 
-from sqlalchemy import BigInteger, Boolean, Column, DateTime
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import Float, ForeignKey, Integer, String, Text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy import inspect, select, text, true
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.orm import DeclarativeBase, relationship
 
+from database.engine import create_engine
+from database.instrumentation import instrument_engine
+from database.routing import ReadRouter, RoutingSession
+
+ALEMBIC_DIR = Path(__file__).resolve().parent.parent / "alembic"
+
 
 class Base(DeclarativeBase):
     @declared_attr
@@ -50,9 +61,19 @@ class User(Base):
     status = Column(SQLEnum(UserStatus), default=UserStatus.USER)
     notifications = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
+    # False - бот заблокирован, аккаунт удалён или чат не найден; рассылки
+    # таких пропускают, /start возвращает True
+    is_reachable = Column(Boolean, nullable=False, server_default=true())
+    unreachable_at = Column(DateTime)
 
     sell_requests = relationship("SellRequest", back_populates="user")
 
+    __table_args__ = (
+        # Рассылки: uid доступных пользователей (и подписчиков) читаются прямо из индекса
+        Index("ix_users_reachable_uid", "is_reachable", "uid"),
+        Index("ix_users_reachable_notifications_uid", "is_reachable", "notifications", "uid"),
+    )
+
 
 class Coin(Base):
     __tablename__ = "coins"
@@ -90,6 +111,44 @@ class AsicModel(Base):
     model_line = relationship("AsicModelLine", back_populates="models")
     sell_requests = relationship("SellRequest", back_populates="device")
 
+    __table_args__ = (
+        # Страница линейки: модели линейки уже отсортированы по имени
+        Index("ix_asic_models_line_name", "model_line_id", "name"),
+        Index("ix_asic_models_active_line", "is_active", "model_line_id"),
+    )
+
+
+def parse_coin_symbols(get_coin: str) -> List[str]:
+    """'btc, BCH,  bsv' -> ['BTC', 'BCH', 'BSV'] без пустых и повторов"""
+    symbols: List[str] = []
+    for part in (get_coin or "").split(","):
+        symbol = part.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+
+class AsicModelCoin(Base):
+    """Монеты, которые добывает модель (нормализованный AsicModel.get_coin).
+
+    Символ хранится как есть, без внешнего ключа на coins: в get_coin бывают
+    монеты, которых нет в таблице coins. position сохраняет порядок из строки.
+    """
+
+    __tablename__ = "asic_model_coins"
+
+    model_id = Column(
+        Integer, ForeignKey("asic_models.id", ondelete="CASCADE"), nullable=False
+    )
+    coin_symbol = Column(String(10), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Монеты модели и модели монеты - по индексу в обе стороны
+        UniqueConstraint("model_id", "coin_symbol", name="uq_asic_model_coins_model_coin"),
+        Index("ix_asic_model_coins_coin_model", "coin_symbol", "model_id"),
+    )
+
 
 class AlgorithmData(Base):
     __tablename__ = "algorithm_data"
@@ -100,6 +159,27 @@ class AlgorithmData(Base):
     network_hashrate = Column(Float, default=0.0)
     block_reward = Column(Float, default=0.0)
     last_updated = Column(DateTime, default=datetime.now)
+    # Когда данные последний раз пришли из источника; NULL - начальные значения
+    refreshed_at = Column(DateTime, nullable=True)
+
+
+class CoinNetworkParams(Base):
+    """Параметры сети по монетам. У монет одного алгоритма разные сети
+    (LTC и DOGE, BTC/BCH/BSV), а algorithm_data хранит одну строку на алгоритм.
+    NULL - значение берётся из algorithm_data алгоритма монеты"""
+
+    __tablename__ = "coin_network_params"
+
+    symbol = Column(String(10), nullable=False, unique=True)
+    algorithm = Column(SQLEnum(Algorithm), nullable=False)
+    block_time = Column(Float, nullable=True)  # секунды
+    block_reward = Column(Float, nullable=True)
+    network_hashrate = Column(Float, nullable=True)  # в единицах калькулятора алгоритма
+    # Монета, вместе с которой добывается (merged mining): DOGE -> LTC
+    merged_parent = Column(String(10), nullable=True)
+    updated_at = Column(DateTime, default=datetime.now)
+    # Когда данные последний раз пришли из источника; NULL - начальные значения
+    refreshed_at = Column(DateTime, nullable=True)
 
 
 class SellRequest(Base):
@@ -113,18 +193,102 @@ class SellRequest(Base):
     contact_info = Column(String(100), nullable=False)
     status = Column(String(20), default="pending")
     created_at = Column(DateTime, default=datetime.now)
+    # Версия для оптимистичной блокировки (смена статуса несколькими админами)
+    version = Column(Integer, nullable=False, server_default=text("1"))
 
     user = relationship("User", back_populates="sell_requests")
     device = relationship("AsicModel", back_populates="sell_requests")
 
+    __table_args__ = (
+        Index("ix_sell_requests_status_created", "status", "created_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 
 class BroadcastMessage(Base):
+    """Рассылка и её прогресс: по нему рассылка продолжается после перезапуска"""
+
     __tablename__ = "broadcast_messages"
 
     message_text = Column(Text, nullable=False)
+    # file_id фото в Telegram
     photo_url = Column(String(255))
     sent_at = Column(DateTime, default=datetime.now)
     sent_by = Column(Integer, ForeignKey("users.id"))
+    # running / paused / cancelled / done
+    status = Column(String(20), nullable=False, server_default=text("'done'"))
+    # Чат администратора и сообщение с прогрессом
+    chat_id = Column(BigInteger)
+    status_message_id = Column(BigInteger)
+    total = Column(Integer, nullable=False, server_default=text("0"))
+    sent = Column(Integer, nullable=False, server_default=text("0"))
+    failed = Column(Integer, nullable=False, server_default=text("0"))
+    unknown = Column(Integer, nullable=False, server_default=text("0"))
+    # Контрольная точка: получатели с uid <= last_uid уже взяты в работу
+    last_uid = Column(BigInteger)
+    finished_at = Column(DateTime)
+
+
+class BroadcastDelivery(Base):
+    """Получатель рассылки. Строка создаётся до отправки (pending), поэтому
+    после перезапуска уже взятые в работу получатели не получат сообщение
+    повторно. requeued - взят, но точно не отправлен (бот остановили раньше)."""
+
+    __tablename__ = "broadcast_deliveries"
+
+    broadcast_id = Column(
+        Integer, ForeignKey("broadcast_messages.id", ondelete="CASCADE"), nullable=False
+    )
+    uid = Column(BigInteger, nullable=False)
+    # pending / sent / failed / blocked / inactive / not_found / cancelled / unknown / requeued
+    status = Column(String(10), nullable=False, default="pending")
+
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "uid", name="uq_broadcast_deliveries_broadcast_uid"),
+        # Возврат в работу получателей requeued и сброс pending -> unknown
+        Index("ix_broadcast_deliveries_broadcast_status", "broadcast_id", "status"),
+    )
+
+
+class OutboxMessage(Base):
+    """Исходящее сообщение администратору (заявки пользователей).
+    Обработчик только записывает строку, отправляет фоновый Outbox с повторами;
+    строка в БД переживает перезапуск бота"""
+
+    __tablename__ = "outbox_messages"
+
+    chat_id = Column(BigInteger, nullable=False)
+    message_text = Column(Text, nullable=False)
+    # file_id фото в Telegram: текст тогда отправляется подписью
+    photo = Column(String(255))
+    # Отправляется вместо фото, если фото не уходит из-за сети
+    fallback_text = Column(Text)
+    parse_mode = Column(String(20))
+    # pending / sent / failed
+    status = Column(String(20), nullable=False, server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(String(255))
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_outbox_messages_status_next", "status", "next_attempt_at"),
+    )
+
+
+class FsmState(Base):
+    """Состояние и данные FSM aiogram (SqlStorage): диалоги переживают перезапуск.
+    key - StorageKey одной строкой, data - компактный JSON"""
+
+    __tablename__ = "fsm_states"
+
+    key = Column(String(255), nullable=False, unique=True)
+    state = Column(String(255))
+    data = Column(Text)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (Index("ix_fsm_states_updated_at", "updated_at"),)
 
 
 class UsedDeviceGuide(Base):
@@ -142,16 +306,77 @@ class Link(Base):
     link = Column(String(), nullable=False)
 
 
+class AiConversation(Base):
+    __tablename__ = "ai_conversations"
+
+    uid = Column(BigInteger, nullable=False, unique=True)
+    conversation_id = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class MediaFile(Base):
+    __tablename__ = "media_files"
+
+    content_hash = Column(String(64), nullable=False, unique=True)
+    kind = Column(String(20), nullable=False)
+    file_id = Column(String(255), nullable=False)
+    path = Column(String(255))
+    updated_at = Column(DateTime, default=datetime.now)
+
+
+class DailyStat(Base):
+    """Счётчики по дням: новые пользователи, расчёты, вопросы AI, заявки.
+    Пишутся пачками из StatsCounter, итоги - сумма по дням без count(*)
+    по растущим таблицам"""
+
+    __tablename__ = "daily_stats"
+
+    day = Column(Date, nullable=False)
+    metric = Column(String(40), nullable=False)
+    value = Column(BigInteger, nullable=False, server_default=text("0"))
+
+    __table_args__ = (
+        UniqueConstraint("day", "metric", name="uq_daily_stats_day_metric"),
+    )
+
+
 class CreateDatabase:
-    def __init__(self, database_url: str, echo: bool = False) -> None:
-        self.engine = create_async_engine(url=database_url, echo=echo)
+    def __init__(
+        self,
+        database_url: str,
+        echo: bool = False,
+        replica_url: Optional[str] = None,
+        sticky_seconds: float = 5.0,
+    ) -> None:
+        self.engine = create_engine(database_url, echo=echo)
+        # Необязательная реплика только для чтения: чтения репозиториев идут туда,
+        # записи и чтения сразу после записи (read-your-writes) - на primary
+        self.read_engine = create_engine(replica_url, echo=echo) if replica_url else None
+        instrument_engine(self.engine.sync_engine)
+        if self.read_engine is not None:
+            instrument_engine(self.read_engine.sync_engine)
+        session_options = {}
+        if self.read_engine is not None:
+            router = ReadRouter(
+                self.engine.sync_engine, self.read_engine.sync_engine, sticky_seconds
+            )
+            session_options = {
+                "sync_session_class": RoutingSession,
+                "info": {"db_router": router},
+            }
         self.async_session = async_sessionmaker(
             bind=self.engine,
             expire_on_commit=False,
             class_=AsyncSession,
             autoflush=False,
+            **session_options,
         )
 
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        if self.read_engine is not None:
+            await self.read_engine.dispose()
+
     @asynccontextmanager
     async def get_session(self):
         async with self.async_session() as session:
@@ -164,10 +389,28 @@ class CreateDatabase:
             finally:
                 await session.close()
 
+    @staticmethod
+    def _create_schema(sync_conn) -> None:
+        """Новая БД создаётся по моделям и помечается последней ревизией alembic.
+        Существующая меняется только миграциями (alembic upgrade head)"""
+        context = MigrationContext.configure(sync_conn)
+        script = ScriptDirectory(str(ALEMBIC_DIR))
+        head = script.get_current_head()
+        if not inspect(sync_conn).get_table_names():
+            Base.metadata.create_all(sync_conn)
+            context.stamp(script, head)
+            print("[OK] Таблицы успешно созданы")
+            return
+        current = context.get_current_revision()
+        if current != head:
+            print(
+                f"[WARN] Схема БД на ревизии {current}, код ожидает {head}: "
+                "выполните alembic upgrade head"
+            )
+
     async def async_main(self):
         async with self.engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-            print("[OK] Таблицы успешно созданы")
+            await conn.run_sync(self._create_schema)
 
         async with self.async_session() as session:
             from sqlalchemy import select
@@ -233,6 +476,34 @@ class CreateDatabase:
                 print(f"[ERROR] Ошибка при работе с algorithm_data: {e}")
                 await session.rollback()
 
+            try:
+                params_exist = await session.execute(select(CoinNetworkParams.id).limit(1))
+                if params_exist.first() is None:
+                    print("[INFO] Добавляем начальные данные в coin_network_params...")
+                    # Хешрейт сети BCH/BSV заполнит обновление данных сети,
+                    # до тех пор он берётся из algorithm_data (как у BTC)
+                    session.add_all(
+                        [
+                            CoinNetworkParams(symbol="BTC", algorithm=Algorithm.SHA256, block_time=600, block_reward=3.125),
+                            CoinNetworkParams(symbol="BCH", algorithm=Algorithm.SHA256, block_time=600, block_reward=3.125),
+                            CoinNetworkParams(symbol="BSV", algorithm=Algorithm.SHA256, block_time=600, block_reward=3.125),
+                            CoinNetworkParams(symbol="LTC", algorithm=Algorithm.SCRYPT, block_time=150, block_reward=6.25),
+                            CoinNetworkParams(
+                                symbol="DOGE",
+                                algorithm=Algorithm.SCRYPT,
+                                block_time=60,
+                                block_reward=10000,
+                                network_hashrate=2_958_883,  # GH/s - отдельная сеть, не хешрейт LTC (capminer.ru)
+                                merged_parent="LTC",
+                            ),
+                        ]
+                    )
+                    await session.commit()
+                    print("[OK] Начальные данные coin_network_params добавлены")
+            except Exception as e:
+                print(f"[ERROR] Ошибка при работе с coin_network_params: {e}")
+                await session.rollback()
+
             try:
                 coins_exist = await session.execute(select(Coin))
                 if not coins_exist.scalars().first():
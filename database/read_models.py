@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from database.models import Algorithm, Manufacturer
+
+
+class ModelLineRow(NamedTuple):
+    id: int
+    name: str
+    manufacturer: Manufacturer
+    algorithm: Algorithm
+    label: str
+
+
+class AsicModelRow(NamedTuple):
+    id: int
+    name: str
+    model_line_id: int
+    hash_rate: float
+    power_consumption: float
+    coins: Tuple[str, ...]
+    is_active: bool
+    label: str
+
+
+class CoinRow(NamedTuple):
+    id: int
+    symbol: str
+    name: str
+    coin_gecko_id: str
+    algorithm: Algorithm
+    current_price_usd: float
+    current_price_rub: float
+    price_change_24h: float
+    last_updated: Optional[datetime]
+
+
+class AlgorithmDataRow(NamedTuple):
+    algorithm: Algorithm
+    default_coin: str
+    difficulty: float
+    network_hashrate: float
+    block_reward: float
+    last_updated: Optional[datetime]
+    refreshed_at: Optional[datetime]
+
+
+class CoinParamsRow(NamedTuple):
+    symbol: str
+    algorithm: Algorithm
+    block_time: Optional[float]
+    block_reward: Optional[float]
+    network_hashrate: Optional[float]
+    merged_parent: Optional[str]
+    updated_at: Optional[datetime]
+    refreshed_at: Optional[datetime]
+
+
+class OutboxRow(NamedTuple):
+    id: int
+    chat_id: int
+    message_text: str
+    photo: Optional[str]
+    fallback_text: Optional[str]
+    parse_mode: Optional[str]
+    attempts: int
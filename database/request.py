@@ -1,163 +1,280 @@
-import re
-from asyncio import Lock
-from datetime import datetime
-from typing import Dict, List, Optional, Set
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set, Tuple
 
-from sqlalchemy import and_, delete, select, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, not_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from database.catalog import CatalogIndex
+from database.coin_params import COIN_PARAMS_COLUMNS, CoinParamsIndex
+from database.instrumentation import instrumented
 from database.models import (
+    AiConversation,
     Algorithm,
     AlgorithmData,
     AsicModel,
+    AsicModelCoin,
     AsicModelLine,
+    BroadcastDelivery,
     BroadcastMessage,
     Coin,
+    CoinNetworkParams,
+    DailyStat,
+    FsmState,
     Link,
     Manufacturer,
+    MediaFile,
+    OutboxMessage,
     SellRequest,
     UsedDeviceGuide,
     User,
     UserStatus,
+    parse_coin_symbols,
 )
+from database.read_models import (
+    AlgorithmDataRow,
+    AsicModelRow,
+    CoinParamsRow,
+    CoinRow,
+    ModelLineRow,
+    OutboxRow,
+)
+from database.routing import primary_reads
+
+if TYPE_CHECKING:
+    from utils.catalog_importer import CatalogDiff
+
+
+# Проекции для чтения: только колонки, без ORM-объектов и identity map
+_COIN_COLUMNS = (
+    Coin.id,
+    Coin.symbol,
+    Coin.name,
+    Coin.coin_gecko_id,
+    Coin.algorithm,
+    Coin.current_price_usd,
+    Coin.current_price_rub,
+    Coin.price_change_24h,
+    Coin.last_updated,
+)
+_ALGORITHM_DATA_COLUMNS = (
+    AlgorithmData.algorithm,
+    AlgorithmData.default_coin,
+    AlgorithmData.difficulty,
+    AlgorithmData.network_hashrate,
+    AlgorithmData.block_reward,
+    AlgorithmData.last_updated,
+    AlgorithmData.refreshed_at,
+)
+
+
+def _insert(session, model):
+    """INSERT с поддержкой ON CONFLICT для текущего диалекта (PostgreSQL/SQLite)"""
+    if session.bind.dialect.name == "postgresql":
+        return pg_insert(model)
+    return sqlite_insert(model)
 
 
+@instrumented
 class UserReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
+        # uid всех зарегистрированных пользователей: повторный /start не ходит в БД
+        self.known_uids: Set[int] = set()
+
+    async def load_known_uids(self) -> int:
+        # Недоступные не попадают в кэш: их /start должен дойти до БД и вернуть доступность
+        async with self.db_session_maker() as session:
+            res = await session.execute(select(User.uid).where(User.is_reachable == True))
+            self.known_uids = set(res.scalars().all())
+            return len(self.known_uids)
 
     async def user_exists(self, uid: int) -> bool:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(select(User).where(User.uid == uid))
             return res.scalar() is not None
 
     async def add_user(self, uid: int, uname: str) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                try:
-                    new_user = User(uid=uid, uname=uname)
-                    session.add(new_user)
-                    await session.commit()
-                    return True
-                except IntegrityError:
-                    await session.rollback()
-                    return False
+        # Атомарный INSERT ... ON CONFLICT DO NOTHING - блокировка не нужна
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                _insert(session, User)
+                .values(uid=uid, uname=uname)
+                .on_conflict_do_nothing(index_elements=[User.uid])
+            )
+            created = res.rowcount == 1
+            if not created:
+                # Пользователь, помеченный недоступным, снова пишет боту
+                await session.execute(
+                    update(User)
+                    .where(User.uid == uid, User.is_reachable == False)
+                    .values(is_reachable=True, unreachable_at=None)
+                )
+            await session.commit()
+            self.known_uids.add(uid)
+            return created
+
+    async def ensure_user(self, uid: int, uname: str) -> bool:
+        """Регистрирует пользователя, если его ещё нет. True - если добавлен сейчас"""
+        if uid in self.known_uids:
+            return False
+        return await self.add_user(uid, uname)
 
     async def is_admin(self, uid: int) -> bool:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(User).where(
+                select(User.id).where(
                     and_(User.uid == uid, User.status == UserStatus.ADMIN)
                 )
             )
             return res.scalar() is not None
 
     async def toggle_notifications(self, uid: int) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                res = await session.execute(select(User).where(User.uid == uid))
-                user = res.scalar()
-                if user:
-                    user.notifications = not user.notifications
-                    await session.commit()
-                    return user.notifications
-                return False
+        # Переключение одним UPDATE ... RETURNING: корректно и при нескольких процессах
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                update(User)
+                .where(User.uid == uid)
+                .values(notifications=not_(func.coalesce(User.notifications, True)))
+                .returning(User.notifications)
+            )
+            notifications = res.scalar()
+            await session.commit()
+            return bool(notifications)
 
     async def get_user_notifications_status(self, uid: int) -> bool:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(
                 select(User.notifications).where(User.uid == uid)
             )
             return res.scalar() or False
 
+    async def iter_uid_batches(
+        self, batch_size: int = 1000, notifications: Optional[bool] = None
+    ) -> AsyncIterator[List[int]]:
+        """uid доступных пользователей пачками по возрастанию uid.
+
+        Постраничная выборка по ключу (uid > последний): каждая пачка - короткий
+        запрос по индексу, память не растёт с числом пользователей и соединение
+        не удерживается между пачками (пока идёт рассылка).
+        """
+        last_uid = None
+        while True:
+            stmt = (
+                select(User.uid)
+                .where(User.is_reachable == True)
+                .order_by(User.uid)
+                .limit(batch_size)
+            )
+            if notifications is not None:
+                stmt = stmt.where(User.notifications == notifications)
+            if last_uid is not None:
+                stmt = stmt.where(User.uid > last_uid)
+            async with self.db_session_maker() as session:
+                res = await session.execute(stmt)
+                batch = list(res.scalars().all())
+            if not batch:
+                return
+            yield batch
+            if len(batch) < batch_size:
+                return
+            last_uid = batch[-1]
+
+    async def iter_uids(
+        self, batch_size: int = 1000, notifications: Optional[bool] = None
+    ) -> AsyncIterator[int]:
+        async for batch in self.iter_uid_batches(batch_size, notifications):
+            for uid in batch:
+                yield uid
+
+    async def count_uids(self, notifications: Optional[bool] = None) -> int:
+        stmt = select(func.count(User.uid)).where(User.is_reachable == True)
+        if notifications is not None:
+            stmt = stmt.where(User.notifications == notifications)
+        async with self.db_session_maker() as session:
+            res = await session.execute(stmt)
+            return res.scalar() or 0
+
+    async def mark_unreachable(self, uids: List[int]) -> int:
+        """Пользователи, которым бот больше не может писать (заблокировали бота,
+        удалили аккаунт). Рассылки их пропускают до следующего /start"""
+        if not uids:
+            return 0
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                update(User)
+                .where(User.uid.in_(uids), User.is_reachable == True)
+                .values(is_reachable=False, unreachable_at=datetime.now())
+            )
+            await session.commit()
+        self.known_uids.difference_update(uids)
+        return res.rowcount
+
     async def get_all_users(self) -> List[User]:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(select(User))
             return list(res.scalars().all())
 
     async def get_user_by_uid(self, uid: int) -> Optional[User]:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(select(User).where(User.uid == uid))
             return res.scalar()
 
 
+@instrumented
 class CalculatorReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
+        self.catalog = CatalogIndex(db_session_maker)
+        self.coin_params = CoinParamsIndex(db_session_maker)
 
     async def get_manufacturers(self) -> List[Manufacturer]:
-        # Чтение - блокировка не нужна
         return list(Manufacturer)
 
     async def get_model_lines_by_manufacturer(
         self, manufacturer: Manufacturer
-    ) -> List[AsicModelLine]:
-        # Чтение - блокировка не нужна
-        async with self.db_session_maker() as session:
-                # Получаем только линейки, в которых есть хотя бы одна активная модель
-                res = await session.execute(
-                    select(AsicModelLine)
-                    .join(AsicModel, AsicModelLine.id == AsicModel.model_line_id)
-                    .where(
-                        AsicModelLine.manufacturer == manufacturer,
-                        AsicModel.is_active == True
-                    )
-                    .distinct()
-                )
-                lines = list(res.scalars().all())
-
-                def natural_sort_key(text):
-                    return [
-                        int(part) if part.isdigit() else part.lower()
-                        for part in re.split(r"(\d+)", text)
-                    ]
-
-                lines.sort(key=lambda x: natural_sort_key(x.name))
-                return lines
+    ) -> List[ModelLineRow]:
+        # Из индекса каталога: только линейки с активными моделями, в естественном порядке
+        return await self.catalog.lines_by_manufacturer(manufacturer)
 
     async def get_asic_models_by_model_line(
         self, model_line_id: int
-    ) -> List[AsicModel]:
-        # Чтение - блокировка не нужна
-        async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AsicModel)
-                    .where(AsicModel.model_line_id == model_line_id)
-                    .order_by(AsicModel.name)
-                )
-                return list(res.scalars().all())
+    ) -> List[AsicModelRow]:
+        return await self.catalog.models_by_line(model_line_id)
 
-    async def get_model_line_by_id(self, model_line_id: int) -> Optional[AsicModelLine]:
-        # Чтение - блокировка не нужна
-        async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AsicModelLine).where(AsicModelLine.id == model_line_id)
-                )
-                return res.scalar()
+    async def get_model_line_by_id(self, model_line_id: int) -> Optional[ModelLineRow]:
+        return await self.catalog.line(model_line_id)
+
+    async def get_all_asic_models(self) -> List[AsicModelRow]:
+        return await self.catalog.active_models()
 
-    async def get_all_asic_models(self) -> List[AsicModel]:
-        # Чтение - блокировка не нужна
+    async def get_asic_model_by_id(self, model_id: int) -> Optional[AsicModelRow]:
+        return await self.catalog.model(model_id)
+
+    async def get_model_coins(self, model_id: int) -> List[str]:
+        """Символы монет модели в порядке из get_coin"""
         async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AsicModel).where(AsicModel.is_active == True)
-                )
-                return list(res.scalars().all())
+            res = await session.execute(
+                select(AsicModelCoin.coin_symbol)
+                .where(AsicModelCoin.model_id == model_id)
+                .order_by(AsicModelCoin.position)
+            )
+            return list(res.scalars().all())
 
-    async def get_asic_model_by_id(self, model_id: int) -> Optional[AsicModel]:
-        # Чтение - блокировка не нужна
+    async def get_models_by_coin(self, symbol: str) -> List[AsicModelRow]:
+        """Активные модели, которые могут добывать монету"""
         async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AsicModel).where(AsicModel.id == model_id)
+            res = await session.execute(
+                select(AsicModelCoin.model_id).where(
+                    AsicModelCoin.coin_symbol == symbol.upper()
                 )
-                return res.scalar()
+            )
+            model_ids = list(res.scalars().all())
+        models = [await self.catalog.model(model_id) for model_id in model_ids]
+        return sorted(
+            (m for m in models if m and m.is_active), key=lambda m: m.name
+        )
 
     async def add_model_line(
         self,
@@ -165,18 +282,18 @@ class CalculatorReq:
         manufacturer: Manufacturer,
         algorithm: Algorithm,
     ) -> int:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                model_line = AsicModelLine(
-                    name=name,
-                    manufacturer=manufacturer,
-                    algorithm=algorithm,
-                )
-                session.add(model_line)
-                await session.flush()
-                model_line_id = model_line.id
-                await session.commit()
-                return model_line_id
+        async with self.db_session_maker() as session:
+            model_line = AsicModelLine(
+                name=name,
+                manufacturer=manufacturer,
+                algorithm=algorithm,
+            )
+            session.add(model_line)
+            await session.flush()
+            model_line_id = model_line.id
+            await session.commit()
+            self.catalog.invalidate()
+            return model_line_id
 
     async def add_asic_model(
         self,
@@ -186,76 +303,186 @@ class CalculatorReq:
         power_consumption: float,
         get_coin: str = "",
     ) -> int:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                model = AsicModel(
-                    name=name,
-                    model_line_id=model_line_id,
-                    hash_rate=hash_rate,
-                    power_consumption=power_consumption,
-                    get_coin=get_coin,
-                    is_active=True,
-                )
-                session.add(model)
-                await session.flush()
-                model_id = model.id
-                await session.commit()
-                return model_id
+        async with self.db_session_maker() as session:
+            model = AsicModel(
+                name=name,
+                model_line_id=model_line_id,
+                hash_rate=hash_rate,
+                power_consumption=power_consumption,
+                get_coin=get_coin,
+                is_active=True,
+            )
+            session.add(model)
+            await session.flush()
+            model_id = model.id
+            session.add_all(
+                AsicModelCoin(model_id=model_id, coin_symbol=symbol, position=position)
+                for position, symbol in enumerate(parse_coin_symbols(get_coin))
+            )
+            await session.commit()
+            self.catalog.invalidate()
+            return model_id
 
     async def delete_model_line(self, model_line_id: int) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
+        async with self.db_session_maker() as session:
+            # Модели линейки отвязываем в той же транзакции (как делал ORM при session.delete)
+            await session.execute(
+                update(AsicModel)
+                .where(AsicModel.model_line_id == model_line_id)
+                .values(model_line_id=None)
+            )
+            res = await session.execute(
+                delete(AsicModelLine).where(AsicModelLine.id == model_line_id)
+            )
+            await session.commit()
+            self.catalog.invalidate()
+            return res.rowcount > 0
+
+    async def delete_asic_model(self, model_id: int) -> bool:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(SellRequest)
+                .where(SellRequest.device_id == model_id)
+                .values(device_id=None)
+            )
+            await session.execute(
+                delete(AsicModelCoin).where(AsicModelCoin.model_id == model_id)
+            )
+            res = await session.execute(
+                delete(AsicModel).where(AsicModel.id == model_id)
+            )
+            await session.commit()
+            self.catalog.invalidate()
+            return res.rowcount > 0
+
+    async def apply_catalog_diff(self, diff: "CatalogDiff") -> None:
+        """Применение результата импорта прайса: все вставки, правки и снятия
+        с продажи пачками в одной транзакции, индекс сбрасывается один раз"""
+        models = AsicModel.__table__
+        async with self.db_session_maker() as session:
+            line_ids = {
+                (line.manufacturer, line.name): line.id
+                for line in await self.catalog.all_lines()
+            }
+            if diff.new_lines:
                 res = await session.execute(
-                    select(AsicModelLine).where(AsicModelLine.id == model_line_id)
+                    insert(AsicModelLine).returning(
+                        AsicModelLine.id, sort_by_parameter_order=True
+                    ),
+                    [
+                        {"name": name, "manufacturer": manufacturer, "algorithm": algorithm}
+                        for manufacturer, name, algorithm in diff.new_lines
+                    ],
+                )
+                for (manufacturer, name, _), line_id in zip(diff.new_lines, res.scalars()):
+                    line_ids[(manufacturer, name)] = line_id
+            if diff.line_updates:
+                lines = AsicModelLine.__table__
+                await session.execute(
+                    update(lines)
+                    .where(lines.c.id == bindparam("b_id"))
+                    .values(algorithm=bindparam("b_algorithm")),
+                    [
+                        {"b_id": line_id, "b_algorithm": algorithm}
+                        for line_id, algorithm in diff.line_updates
+                    ],
                 )
-                model_line = res.scalar()
-                if model_line:
-                    await session.delete(model_line)
-                    await session.commit()
-                    return True
-                return False
 
-    async def delete_asic_model(self, model_id: int) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
+            coin_links: List[Tuple[int, str]] = []
+            if diff.inserts:
                 res = await session.execute(
-                    select(AsicModel).where(AsicModel.id == model_id)
+                    insert(AsicModel).returning(AsicModel.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "name": row.name,
+                            "model_line_id": line_ids[(row.manufacturer, row.line)],
+                            "hash_rate": row.hash_rate,
+                            "power_consumption": row.power_consumption,
+                            "get_coin": row.get_coin,
+                            "is_active": True,
+                        }
+                        for row in diff.inserts
+                    ],
                 )
-                model = res.scalar()
-                if model:
-                    await session.delete(model)
-                    await session.commit()
-                    return True
-                return False
+                coin_links.extend(
+                    (model_id, row.get_coin)
+                    for row, model_id in zip(diff.inserts, res.scalars())
+                )
+            if diff.updates:
+                await session.execute(
+                    update(models)
+                    .where(models.c.id == bindparam("b_id"))
+                    .values(
+                        hash_rate=bindparam("b_hash_rate"),
+                        power_consumption=bindparam("b_power"),
+                        get_coin=bindparam("b_get_coin"),
+                        is_active=True,
+                    ),
+                    [
+                        {
+                            "b_id": model_id,
+                            "b_hash_rate": row.hash_rate,
+                            "b_power": row.power_consumption,
+                            "b_get_coin": row.get_coin,
+                        }
+                        for model_id, row, _ in diff.updates
+                    ],
+                )
+                relinked = [
+                    (model_id, row.get_coin)
+                    for model_id, row, coins_changed in diff.updates
+                    if coins_changed
+                ]
+                if relinked:
+                    await session.execute(
+                        delete(AsicModelCoin).where(
+                            AsicModelCoin.model_id.in_([model_id for model_id, _ in relinked])
+                        )
+                    )
+                    coin_links.extend(relinked)
+            if coin_links:
+                await session.execute(
+                    insert(AsicModelCoin),
+                    [
+                        {"model_id": model_id, "coin_symbol": symbol, "position": position}
+                        for model_id, get_coin in coin_links
+                        for position, symbol in enumerate(parse_coin_symbols(get_coin))
+                    ],
+                )
+            if diff.deactivations:
+                await session.execute(
+                    update(AsicModel)
+                    .where(AsicModel.id.in_([model.id for model in diff.deactivations]))
+                    .values(is_active=False)
+                )
+            await session.commit()
+        self.catalog.invalidate()
 
     async def get_algorithms(self) -> List[Algorithm]:
-        # Чтение - блокировка не нужна
         return list(Algorithm)
 
-    async def get_algorithm_data(self, algorithm: Algorithm) -> Optional[AlgorithmData]:
-        # Чтение - блокировка не нужна
+    async def get_algorithm_data(self, algorithm: Algorithm) -> Optional[AlgorithmDataRow]:
         async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AlgorithmData).where(AlgorithmData.algorithm == algorithm)
-                )
-                return res.scalar()
+            res = await session.execute(
+                select(*_ALGORITHM_DATA_COLUMNS).where(AlgorithmData.algorithm == algorithm)
+            )
+            row = res.first()
+            return AlgorithmDataRow._make(row) if row else None
 
-    async def get_algorithm_data_all(self) -> List[AlgorithmData]:
-        # Чтение - блокировка не нужна
+    async def get_algorithm_data_all(self) -> List[AlgorithmDataRow]:
         async with self.db_session_maker() as session:
-            res = await session.execute(select(AlgorithmData))
-            return list(res.scalars().all())
+            res = await session.execute(select(*_ALGORITHM_DATA_COLUMNS))
+            return [AlgorithmDataRow._make(row) for row in res]
     
-    async def get_algorithm_data_batch(self, algorithms: Set[Algorithm]) -> Dict[Algorithm, AlgorithmData]:
+    async def get_algorithm_data_batch(self, algorithms: Set[Algorithm]) -> Dict[Algorithm, AlgorithmDataRow]:
         """Получить данные алгоритмов одним запросом"""
-        # Чтение - блокировка не нужна
         if not algorithms:
             return {}
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(AlgorithmData).where(AlgorithmData.algorithm.in_(algorithms))
+                select(*_ALGORITHM_DATA_COLUMNS).where(AlgorithmData.algorithm.in_(algorithms))
             )
-            algo_data_list = res.scalars().all()
+            algo_data_list = [AlgorithmDataRow._make(row) for row in res]
             return {data.algorithm: data for data in algo_data_list}
 
     async def update_algorithm_data(
@@ -266,50 +493,115 @@ class CalculatorReq:
         network_hashrate: float,
         block_reward: float,
     ) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(AlgorithmData).where(AlgorithmData.algorithm == algorithm)
-                )
-                data = res.scalar()
-                if data:
-                    data.default_coin = default_coin
-                    data.difficulty = difficulty
-                    data.network_hashrate = network_hashrate
-                    data.block_reward = block_reward
-                    data.last_updated = datetime.now()
-                else:
-                    data = AlgorithmData(
-                        algorithm=algorithm,
-                        default_coin=default_coin,
-                        difficulty=difficulty,
-                        network_hashrate=network_hashrate,
-                        block_reward=block_reward,
-                    )
-                    session.add(data)
-                await session.commit()
-                return True
+        values = dict(
+            default_coin=default_coin,
+            difficulty=difficulty,
+            network_hashrate=network_hashrate,
+            block_reward=block_reward,
+            last_updated=datetime.now(),
+        )
+        async with self.db_session_maker() as session:
+            await session.execute(
+                _insert(session, AlgorithmData)
+                .values(algorithm=algorithm, **values)
+                .on_conflict_do_update(
+                    index_elements=[AlgorithmData.algorithm], set_=values
+                )
+            )
+            await session.commit()
+            return True
 
-    async def update_link(self, link: str) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                # Пытаемся найти существующую запись с ссылкой
-                res = await session.execute(select(Link).order_by(Link.id.desc()))
-                data = res.scalars().first()
+    async def update_network_stats(self, rows: List[AlgorithmDataRow]) -> None:
+        """Сложность, хешрейт сети и награда для нескольких алгоритмов одним executemany"""
+        if not rows:
+            return
+        table = AlgorithmData.__table__
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(table)
+                .where(table.c.algorithm == bindparam("b_algorithm"))
+                .values(
+                    difficulty=bindparam("b_difficulty"),
+                    network_hashrate=bindparam("b_network_hashrate"),
+                    block_reward=bindparam("b_block_reward"),
+                    last_updated=bindparam("b_last_updated"),
+                    refreshed_at=bindparam("b_refreshed_at"),
+                ),
+                [
+                    {
+                        "b_algorithm": row.algorithm,
+                        "b_difficulty": row.difficulty,
+                        "b_network_hashrate": row.network_hashrate,
+                        "b_block_reward": row.block_reward,
+                        "b_last_updated": row.last_updated,
+                        "b_refreshed_at": row.refreshed_at,
+                    }
+                    for row in rows
+                ],
+            )
+            await session.commit()
 
-                if data:
-                    # Обновляем существующую ссылку
-                    data.link = link
-                else:
-                    # Если записи нет — создаем новую
-                    data = Link(link=link)
-                    session.add(data)
+    async def get_coin_params(self, symbol: str) -> Optional[CoinParamsRow]:
+        """Параметры сети монеты из индекса в памяти"""
+        return await self.coin_params.get(symbol)
 
-                await session.commit()
-                return True
+    async def get_merged_coins(self, symbols: List[str]) -> List[str]:
+        """Монеты совместного майнинга для symbols (DOGE для LTC)"""
+        return await self.coin_params.merged_coins(symbols)
+
+    async def get_coin_params_all(self) -> List[CoinParamsRow]:
+        async with self.db_session_maker() as session:
+            res = await session.execute(select(*COIN_PARAMS_COLUMNS))
+            return [CoinParamsRow._make(row) for row in res]
+
+    async def update_coin_params(self, rows: List[CoinParamsRow]) -> None:
+        """Хешрейт сети и награда для нескольких монет одним executemany"""
+        if not rows:
+            return
+        table = CoinNetworkParams.__table__
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(table)
+                .where(table.c.symbol == bindparam("b_symbol"))
+                .values(
+                    block_time=bindparam("b_block_time"),
+                    block_reward=bindparam("b_block_reward"),
+                    network_hashrate=bindparam("b_network_hashrate"),
+                    updated_at=bindparam("b_updated_at"),
+                    refreshed_at=bindparam("b_refreshed_at"),
+                ),
+                [
+                    {
+                        "b_symbol": row.symbol,
+                        "b_block_time": row.block_time,
+                        "b_block_reward": row.block_reward,
+                        "b_network_hashrate": row.network_hashrate,
+                        "b_updated_at": row.updated_at,
+                        "b_refreshed_at": row.refreshed_at,
+                    }
+                    for row in rows
+                ],
+            )
+            await session.commit()
+        self.coin_params.invalidate()
+
+    async def update_link(self, link: str) -> bool:
+        async with self.db_session_maker() as session:
+            # Обновляем последнюю запись одним UPDATE
+            res = await session.execute(
+                update(Link)
+                .where(Link.id == select(func.max(Link.id)).scalar_subquery())
+                .values(link=link)
+            )
+            if res.rowcount == 0:
+                # Если записи нет — создаем новую. Параллельная вставка из другого
+                # процесса безопасна: get_link всё равно берёт последнюю запись
+                session.add(Link(link=link))
+
+            await session.commit()
+            return True
 
     async def get_link(self) -> str:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
                 # Берем последнюю (или единственную) запись из таблицы link
                 res = await session.execute(select(Link).order_by(Link.id.desc()))
@@ -321,75 +613,88 @@ class CalculatorReq:
 
                 return data.link
 
-    async def get_coin_by_symbol(self, symbol: str) -> Optional[Coin]:
-        # Чтение - блокировка не нужна
+    async def get_coin_by_symbol(self, symbol: str) -> Optional[CoinRow]:
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(Coin).where(Coin.symbol == symbol.upper())
+                select(*_COIN_COLUMNS).where(Coin.symbol == symbol.upper())
             )
-            return res.scalar()
+            row = res.first()
+            return CoinRow._make(row) if row else None
 
 
+@instrumented
 class CoinReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
 
     async def update_coin_prices(self, prices: Dict[str, Dict]) -> None:
         """Обновление цен монет с данными из CoinGecko"""
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                for symbol, price_data in prices.items():
-                    res = await session.execute(
-                        select(Coin).where(Coin.symbol == symbol.upper())
-                    )
-                    coin = res.scalar()
-                    if coin:
-                        coin.current_price_usd = price_data.get("price_usd", 0.0)
-                        coin.current_price_rub = price_data.get("price_rub", 0.0)
-                        coin.price_change_24h = price_data.get("price_change", 0.0)
-                        coin.last_updated = datetime.now()
-                await session.commit()
+        if not prices:
+            return
+        now = datetime.now()
+        coins = Coin.__table__
+        params = [
+            {
+                "b_symbol": symbol.upper(),
+                "b_usd": price_data.get("price_usd", 0.0),
+                "b_rub": price_data.get("price_rub", 0.0),
+                "b_change": price_data.get("price_change", 0.0),
+                "b_updated": now,
+            }
+            for symbol, price_data in prices.items()
+        ]
+        # Один UPDATE на все монеты (executemany) в одной транзакции
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(coins)
+                .where(coins.c.symbol == bindparam("b_symbol"))
+                .values(
+                    current_price_usd=bindparam("b_usd"),
+                    current_price_rub=bindparam("b_rub"),
+                    price_change_24h=bindparam("b_change"),
+                    last_updated=bindparam("b_updated"),
+                ),
+                params,
+            )
+            await session.commit()
 
-    async def get_all_coins(self) -> List[Coin]:
-        # Чтение - блокировка не нужна
+    async def get_all_coins(self) -> List[CoinRow]:
         async with self.db_session_maker() as session:
-            res = await session.execute(select(Coin))
-            return list(res.scalars().all())
+            res = await session.execute(select(*_COIN_COLUMNS))
+            return [CoinRow._make(row) for row in res]
 
-    async def get_coin_by_symbol(self, symbol: str) -> Optional[Coin]:
-        # Чтение - блокировка не нужна
+    async def get_coin_by_symbol(self, symbol: str) -> Optional[CoinRow]:
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(Coin).where(Coin.symbol == symbol.upper())
+                select(*_COIN_COLUMNS).where(Coin.symbol == symbol.upper())
             )
-            return res.scalar()
+            row = res.first()
+            return CoinRow._make(row) if row else None
 
-    async def get_coin_by_gecko_id(self, gecko_id: str) -> Optional[Coin]:
-        # Чтение - блокировка не нужна
+    async def get_coin_by_gecko_id(self, gecko_id: str) -> Optional[CoinRow]:
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(Coin).where(Coin.coin_gecko_id == gecko_id.lower())
+                select(*_COIN_COLUMNS).where(Coin.coin_gecko_id == gecko_id.lower())
             )
-            return res.scalar()
+            row = res.first()
+            return CoinRow._make(row) if row else None
     
-    async def get_coins_by_symbols(self, symbols: List[str]) -> Dict[str, Coin]:
+    async def get_coins_by_symbols(self, symbols: List[str]) -> Dict[str, CoinRow]:
         """Получить несколько монет одним запросом"""
-        # Чтение - блокировка не нужна
         if not symbols:
             return {}
         async with self.db_session_maker() as session:
             res = await session.execute(
-                select(Coin).where(Coin.symbol.in_([s.upper() for s in symbols]))
+                select(*_COIN_COLUMNS).where(Coin.symbol.in_([s.upper() for s in symbols]))
             )
-            coins = res.scalars().all()
+            coins = [CoinRow._make(row) for row in res]
             return {coin.symbol: coin for coin in coins}
 
 
+@instrumented
 class SellRequestReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
 
     async def create_sell_request(
         self,
@@ -400,22 +705,20 @@ class SellRequestReq:
         description: str,
         contact_info: str,
     ) -> int:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                request = SellRequest(
-                    user_id=user_id,
-                    device_id=device_id,
-                    price=price,
-                    condition=condition,
-                    description=description,
-                    contact_info=contact_info,
-                )
-                session.add(request)
-                await session.commit()
-                return request.id
+        async with self.db_session_maker() as session:
+            request = SellRequest(
+                user_id=user_id,
+                device_id=device_id,
+                price=price,
+                condition=condition,
+                description=description,
+                contact_info=contact_info,
+            )
+            session.add(request)
+            await session.commit()
+            return request.id
 
     async def get_pending_requests(self) -> List[SellRequest]:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(
                 select(SellRequest)
@@ -425,44 +728,199 @@ class SellRequestReq:
             return list(res.scalars().all())
 
     async def update_request_status(self, request_id: int, status: str) -> bool:
-        async with self.lock:
-            async with self.db_session_maker() as session:
-                res = await session.execute(
-                    select(SellRequest).where(SellRequest.id == request_id)
-                )
-                request = res.scalar()
-                if request:
-                    request.status = status
-                    await session.commit()
-                    return True
-                return False
+        """Смена статуса заявки. Версия увеличивается, чтобы ORM-сессия,
+        загрузившая заявку раньше, получила StaleDataError при своей записи"""
+        stmt = (
+            update(SellRequest)
+            .where(SellRequest.id == request_id)
+            .values(status=status, version=SellRequest.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.db_session_maker() as session:
+            res = await session.execute(stmt)
+            await session.commit()
+            return res.rowcount > 0
 
 
+@instrumented
 class BroadcastReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
 
-    async def save_broadcast(
-        self, message_text: str, photo_url: str, sent_by: int
+    async def create_broadcast(
+        self, message_text: str, photo_url: Optional[str], chat_id: int, total: int
     ) -> int:
-        async with self.lock:
+        async with self.db_session_maker() as session:
+            broadcast = BroadcastMessage(
+                message_text=message_text,
+                photo_url=photo_url,
+                sent_by=select(User.id).where(User.uid == chat_id).scalar_subquery(),
+                status="running",
+                chat_id=chat_id,
+                total=total,
+            )
+            session.add(broadcast)
+            await session.commit()
+            return broadcast.id
+
+    async def get_broadcast(self, broadcast_id: int) -> Optional[BroadcastMessage]:
+        with primary_reads():
             async with self.db_session_maker() as session:
-                broadcast = BroadcastMessage(
-                    message_text=message_text, photo_url=photo_url, sent_by=sent_by
+                return await session.get(BroadcastMessage, broadcast_id)
+
+    async def get_unfinished_broadcasts(self) -> List[BroadcastMessage]:
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                res = await session.execute(
+                    select(BroadcastMessage)
+                    .where(BroadcastMessage.status.in_(("running", "paused")))
+                    .order_by(BroadcastMessage.id)
+                )
+                return list(res.scalars().all())
+
+    async def set_status_message(self, broadcast_id: int, message_id: int) -> None:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(BroadcastMessage)
+                .where(BroadcastMessage.id == broadcast_id)
+                .values(status_message_id=message_id)
+            )
+            await session.commit()
+
+    async def set_broadcast_status(
+        self, broadcast_id: int, status: str, expected: Optional[str] = None
+    ) -> bool:
+        """Смена статуса; expected - только если текущий статус такой"""
+        stmt = update(BroadcastMessage).where(BroadcastMessage.id == broadcast_id)
+        if expected is not None:
+            stmt = stmt.where(BroadcastMessage.status == expected)
+        values = {"status": status}
+        if status in ("done", "cancelled"):
+            values["finished_at"] = datetime.now()
+        async with self.db_session_maker() as session:
+            res = await session.execute(stmt.values(**values))
+            await session.commit()
+            return res.rowcount > 0
+
+    async def claim_recipients(self, broadcast_id: int, limit: int = 200) -> List[int]:
+        """Следующая пачка получателей после контрольной точки.
+
+        Получатели записываются как pending и контрольная точка сдвигается в
+        одной транзакции до отправки: после перезапуска эти uid не будут
+        выданы повторно. Сначала возвращаются получатели requeued.
+        """
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                res = await session.execute(
+                    select(BroadcastMessage.last_uid).where(
+                        BroadcastMessage.id == broadcast_id,
+                        BroadcastMessage.status == "running",
+                    )
+                )
+                row = res.first()
+                if row is None:
+                    return []
+                res = await session.execute(
+                    select(BroadcastDelivery.uid)
+                    .where(
+                        BroadcastDelivery.broadcast_id == broadcast_id,
+                        BroadcastDelivery.status == "requeued",
+                    )
+                    .limit(limit)
+                )
+                requeued = list(res.scalars().all())
+                if requeued:
+                    await session.execute(
+                        update(BroadcastDelivery)
+                        .where(
+                            BroadcastDelivery.broadcast_id == broadcast_id,
+                            BroadcastDelivery.uid.in_(requeued),
+                        )
+                        .values(status="pending")
+                    )
+                    await session.commit()
+                    return requeued
+                stmt = (
+                    select(User.uid)
+                    .where(User.is_reachable == True)
+                    .order_by(User.uid)
+                    .limit(limit)
+                )
+                if row.last_uid is not None:
+                    stmt = stmt.where(User.uid > row.last_uid)
+                uids = list((await session.execute(stmt)).scalars().all())
+                if not uids:
+                    return []
+                await session.execute(
+                    _insert(session, BroadcastDelivery).on_conflict_do_nothing(
+                        index_elements=["broadcast_id", "uid"]
+                    ),
+                    [{"broadcast_id": broadcast_id, "uid": uid, "status": "pending"} for uid in uids],
+                )
+                await session.execute(
+                    update(BroadcastMessage)
+                    .where(BroadcastMessage.id == broadcast_id)
+                    .values(last_uid=uids[-1])
                 )
-                session.add(broadcast)
                 await session.commit()
-                return broadcast.id
+                return uids
+
+    async def save_outcomes(
+        self,
+        broadcast_id: int,
+        outcomes: Dict[int, str],
+        sent: int,
+        failed: int,
+    ) -> None:
+        """Статусы доставки пачкой (executemany) и счётчики рассылки"""
+        deliveries = BroadcastDelivery.__table__
+        async with self.db_session_maker() as session:
+            if outcomes:
+                await session.execute(
+                    update(deliveries)
+                    .where(
+                        deliveries.c.broadcast_id == broadcast_id,
+                        deliveries.c.uid == bindparam("b_uid"),
+                    )
+                    .values(status=bindparam("b_status")),
+                    [{"b_uid": uid, "b_status": status} for uid, status in outcomes.items()],
+                )
+            await session.execute(
+                update(BroadcastMessage)
+                .where(BroadcastMessage.id == broadcast_id)
+                .values(sent=sent, failed=failed)
+            )
+            await session.commit()
+
+    async def mark_unknown(self, broadcast_id: int) -> int:
+        """Получатели, взятые в работу до остановки бота, но без итога отправки.
+        Повторно им не отправляем: сообщение могло уйти"""
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                update(BroadcastDelivery)
+                .where(
+                    BroadcastDelivery.broadcast_id == broadcast_id,
+                    BroadcastDelivery.status == "pending",
+                )
+                .values(status="unknown")
+            )
+            count = res.rowcount
+            if count:
+                await session.execute(
+                    update(BroadcastMessage)
+                    .where(BroadcastMessage.id == broadcast_id)
+                    .values(unknown=BroadcastMessage.unknown + count)
+                )
+            await session.commit()
+            return count
 
 
+@instrumented
 class UsedDeviceGuideReq:
     def __init__(self, db_session_maker: async_sessionmaker) -> None:
         self.db_session_maker = db_session_maker
-        self.lock = Lock()
 
     async def get_guide(self) -> Optional[UsedDeviceGuide]:
-        # Чтение - блокировка не нужна
         async with self.db_session_maker() as session:
             res = await session.execute(
                 select(UsedDeviceGuide).order_by(
@@ -472,11 +930,314 @@ class UsedDeviceGuideReq:
             return res.scalar()
 
     async def update_guide(self, title: str, content: str, updated_by: int) -> int:
-        async with self.lock:
+        async with self.db_session_maker() as session:
+            guide = UsedDeviceGuide(
+                title=title, content=content, updated_by=updated_by
+            )
+            session.add(guide)
+            await session.commit()
+            return guide.id
+
+
+@instrumented
+class AiConversationReq:
+    def __init__(self, db_session_maker: async_sessionmaker) -> None:
+        self.db_session_maker = db_session_maker
+
+    async def get_conversation(self, uid: int) -> Optional[Tuple[str, datetime]]:
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                select(
+                    AiConversation.conversation_id, AiConversation.created_at
+                ).where(AiConversation.uid == uid)
+            )
+            row = res.first()
+            return (row.conversation_id, row.created_at) if row else None
+
+    async def save_conversation(
+        self, uid: int, conversation_id: str, created_at: datetime
+    ) -> None:
+        values = dict(conversation_id=conversation_id, created_at=created_at)
+        async with self.db_session_maker() as session:
+            await session.execute(
+                _insert(session, AiConversation)
+                .values(uid=uid, **values)
+                .on_conflict_do_update(index_elements=[AiConversation.uid], set_=values)
+            )
+            await session.commit()
+
+
+@instrumented
+class MediaReq:
+    def __init__(self, db_session_maker: async_sessionmaker) -> None:
+        self.db_session_maker = db_session_maker
+
+    async def get_file_id(self, content_hash: str) -> Optional[str]:
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                select(MediaFile.file_id).where(MediaFile.content_hash == content_hash)
+            )
+            return res.scalar()
+
+    async def save_file_id(
+        self, content_hash: str, kind: str, file_id: str, path: str
+    ) -> None:
+        values = dict(kind=kind, file_id=file_id, path=path, updated_at=datetime.now())
+        async with self.db_session_maker() as session:
+            await session.execute(
+                _insert(session, MediaFile)
+                .values(content_hash=content_hash, **values)
+                .on_conflict_do_update(
+                    index_elements=[MediaFile.content_hash], set_=values
+                )
+            )
+            await session.commit()
+
+    async def forget_file_id(self, content_hash: str) -> None:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                delete(MediaFile).where(MediaFile.content_hash == content_hash)
+            )
+            await session.commit()
+
+
+@instrumented
+class StatsReq:
+    def __init__(self, db_session_maker: async_sessionmaker) -> None:
+        self.db_session_maker = db_session_maker
+
+    async def add_counters(self, deltas: Dict[Tuple[date, str], int]) -> None:
+        """Прибавляет накопленные приращения одним executemany upsert"""
+        if not deltas:
+            return
+        async with self.db_session_maker() as session:
+            stmt = _insert(session, DailyStat)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DailyStat.day, DailyStat.metric],
+                set_={"value": DailyStat.value + stmt.excluded.value},
+            )
+            await session.execute(
+                stmt,
+                [
+                    {"day": day, "metric": metric, "value": value}
+                    for (day, metric), value in deltas.items()
+                ],
+            )
+            await session.commit()
+
+    async def get_daily(self, since: date) -> Dict[date, Dict[str, int]]:
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                select(DailyStat.day, DailyStat.metric, DailyStat.value).where(
+                    DailyStat.day >= since
+                )
+            )
+            daily: Dict[date, Dict[str, int]] = {}
+            for day, metric, value in res.all():
+                daily.setdefault(day, {})[metric] = value
+            return daily
+
+    async def get_totals(self) -> Dict[str, int]:
+        # Строк - дни x метрики, размер users/sell_requests не влияет
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                select(DailyStat.metric, func.sum(DailyStat.value)).group_by(
+                    DailyStat.metric
+                )
+            )
+            return {metric: int(total or 0) for metric, total in res.all()}
+
+    async def backfill(self, users_metric: str, sell_metric: str) -> bool:
+        """Первый запуск: счётчики по существующим users и sell_requests
+        (один раз, пока daily_stats пуста)"""
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                if await session.scalar(select(DailyStat.id).limit(1)) is not None:
+                    return False
+                columns = [DailyStat.day, DailyStat.metric, DailyStat.value]
+                for model, metric in ((User, users_metric), (SellRequest, sell_metric)):
+                    day = func.coalesce(func.date(model.created_at), func.current_date())
+                    await session.execute(
+                        insert(DailyStat).from_select(
+                            columns,
+                            select(day, literal(metric), func.count()).group_by(day),
+                        )
+                    )
+                await session.commit()
+                return True
+
+
+@instrumented
+class OutboxReq:
+    def __init__(self, db_session_maker: async_sessionmaker) -> None:
+        self.db_session_maker = db_session_maker
+
+    async def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        photo: Optional[str] = None,
+        fallback_text: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+    ) -> int:
+        async with self.db_session_maker() as session:
+            message = OutboxMessage(
+                chat_id=chat_id,
+                message_text=text,
+                photo=photo,
+                fallback_text=fallback_text,
+                parse_mode=parse_mode,
+            )
+            session.add(message)
+            await session.flush()
+            message_id = message.id
+            await session.commit()
+            return message_id
+
+    async def claim_due(self, limit: int, lease: float) -> List[OutboxRow]:
+        """Сообщения, которым пора уйти. Следующая попытка сразу сдвигается
+        на lease секунд: если бот упадёт во время отправки, сообщение
+        будет отправлено повторно после перезапуска, а не потеряно"""
+        now = datetime.now()
+        with primary_reads():
             async with self.db_session_maker() as session:
-                guide = UsedDeviceGuide(
-                    title=title, content=content, updated_by=updated_by
+                res = await session.execute(
+                    select(
+                        OutboxMessage.id,
+                        OutboxMessage.chat_id,
+                        OutboxMessage.message_text,
+                        OutboxMessage.photo,
+                        OutboxMessage.fallback_text,
+                        OutboxMessage.parse_mode,
+                        OutboxMessage.attempts,
+                    )
+                    .where(
+                        OutboxMessage.status == "pending",
+                        OutboxMessage.next_attempt_at <= now,
+                    )
+                    .order_by(OutboxMessage.id)
+                    .limit(limit)
+                )
+                rows = [OutboxRow._make(row) for row in res]
+                if not rows:
+                    return []
+                await session.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id.in_([row.id for row in rows]))
+                    .values(
+                        attempts=OutboxMessage.attempts + 1,
+                        next_attempt_at=now + timedelta(seconds=lease),
+                    )
                 )
-                session.add(guide)
                 await session.commit()
-                return guide.id
+        return [row._replace(attempts=row.attempts + 1) for row in rows]
+
+    async def mark_sent(self, message_id: int) -> None:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message_id)
+                .values(status="sent", sent_at=datetime.now(), last_error=None)
+            )
+            await session.commit()
+
+    async def retry_later(self, message_id: int, delay: float, error: str) -> None:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message_id)
+                .values(
+                    next_attempt_at=datetime.now() + timedelta(seconds=delay),
+                    last_error=error[:255],
+                )
+            )
+            await session.commit()
+
+    async def mark_failed(self, message_id: int, error: str) -> None:
+        async with self.db_session_maker() as session:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message_id)
+                .values(status="failed", last_error=error[:255])
+            )
+            await session.commit()
+
+    async def next_due_at(self) -> Optional[datetime]:
+        """Время ближайшей попытки среди ожидающих сообщений"""
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                return await session.scalar(
+                    select(func.min(OutboxMessage.next_attempt_at)).where(
+                        OutboxMessage.status == "pending"
+                    )
+                )
+
+    async def purge_sent(self, before: datetime) -> int:
+        """Удалить отправленные сообщения старше before"""
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.status == "sent", OutboxMessage.sent_at < before
+                )
+            )
+            await session.commit()
+            return res.rowcount
+
+
+@instrumented
+class FsmReq:
+    def __init__(self, db_session_maker: async_sessionmaker) -> None:
+        self.db_session_maker = db_session_maker
+
+    async def get(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], datetime]]:
+        """(state, data JSON, updated_at) или None"""
+        # Состояние только что мог записать другой апдейт этого чата
+        with primary_reads():
+            async with self.db_session_maker() as session:
+                res = await session.execute(
+                    select(FsmState.state, FsmState.data, FsmState.updated_at).where(
+                        FsmState.key == key
+                    )
+                )
+                row = res.first()
+                return tuple(row) if row else None
+
+    async def save_many(
+        self,
+        rows: List[Tuple[str, Optional[str], Optional[str], datetime]],
+        deleted: List[str],
+    ) -> None:
+        """Записать (key, state, data, updated_at) одним executemany upsert
+        и удалить опустевшие ключи - в одной транзакции"""
+        if not rows and not deleted:
+            return
+        async with self.db_session_maker() as session:
+            if rows:
+                stmt = _insert(session, FsmState)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FsmState.key],
+                    set_={
+                        "state": stmt.excluded.state,
+                        "data": stmt.excluded.data,
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                )
+                await session.execute(
+                    stmt,
+                    [
+                        {"key": key, "state": state, "data": data, "updated_at": updated_at}
+                        for key, state, data, updated_at in rows
+                    ],
+                )
+            if deleted:
+                await session.execute(delete(FsmState).where(FsmState.key.in_(deleted)))
+            await session.commit()
+
+    async def purge(self, before: datetime) -> int:
+        """Удалить брошенные диалоги: не менявшиеся с before"""
+        async with self.db_session_maker() as session:
+            res = await session.execute(
+                delete(FsmState).where(FsmState.updated_at < before)
+            )
+            await session.commit()
+            return res.rowcount
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, Iterator, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+# Ключ согласованности текущей задачи (обычно uid пользователя из апдейта)
+_consistency_key: ContextVar[Optional[Hashable]] = ContextVar(
+    "db_consistency_key", default=None
+)
+_primary_reads: ContextVar[bool] = ContextVar("db_primary_reads", default=False)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Чтения внутри блока идут на primary (например, загрузка кэшей,
+    которые потом долго живут в памяти и не должны брать отставшую реплику)"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+@contextmanager
+def consistency_key(key: Optional[Hashable]) -> Iterator[None]:
+    """Чтения внутри блока видят записи, сделанные под тем же ключом"""
+    token = _consistency_key.set(key)
+    try:
+        yield
+    finally:
+        _consistency_key.reset(token)
+
+
+class ReadRouter:
+    """Выбор движка для запроса: запись - primary, чтение - реплика.
+
+    После записи ключ (пользователь) на sticky_seconds читает с primary,
+    чтобы следующий шаг FSM увидел свои изменения, пока реплика догоняет.
+    """
+
+    def __init__(self, primary: Engine, replica: Engine, sticky_seconds: float = 5.0) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self._sticky_until: Dict[Hashable, float] = {}
+
+    def mark_write(self) -> None:
+        key = _consistency_key.get()
+        if key is None:
+            return
+        now = time.monotonic()
+        self._sticky_until[key] = now + self.sticky_seconds
+        if len(self._sticky_until) > 10000:
+            self._sticky_until = {
+                k: until for k, until in self._sticky_until.items() if until > now
+            }
+
+    def is_sticky(self) -> bool:
+        if _primary_reads.get():
+            return True
+        key = _consistency_key.get()
+        if key is None:
+            return False
+        until = self._sticky_until.get(key)
+        return until is not None and until > time.monotonic()
+
+
+class RoutingSession(Session):
+    """Сессия, которая отправляет чтения на реплику (см. ReadRouter)"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        router: Optional[ReadRouter] = self.info.get("db_router")
+        if router is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+        is_read = (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not self._flushing
+        )
+        if not is_read:
+            # Запись (или неизвестный текстовый запрос): primary до конца сессии
+            self.info["db_wrote"] = True
+            router.mark_write()
+            return router.primary
+        if self.info.get("db_wrote") or router.is_sticky():
+            return router.primary
+        return router.replica
@@ -1,13 +1,17 @@
 """
 Скрипт для заполнения базы данных ASIC-майнерами из SQL-скрипта
+
+Каталог из прайсов производителей (*.txt) импортирует import_catalog.py
 """
 import asyncio
 from database.models import (
     CreateDatabase,
     AsicModelLine,
     AsicModel,
+    AsicModelCoin,
     Algorithm,
     Manufacturer,
+    parse_coin_symbols,
 )
 from config import get_db_url
 from sqlalchemy import select
@@ -317,6 +321,12 @@ async def add_models(session, model_line_id: int, models: list):
                 is_active=True,
             )
             session.add(model)
+            await session.flush()
+            # Монеты модели - в таблице связей, по ним ищет калькулятор
+            session.add_all(
+                AsicModelCoin(model_id=model.id, coin_symbol=symbol, position=position)
+                for position, symbol in enumerate(parse_coin_symbols(get_coin))
+            )
             added_count += 1
         else:
             skipped_count += 1
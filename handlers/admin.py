@@ -1,10 +1,15 @@
-import os
+import io
+import logging
+from typing import List, Optional, Tuple
 
 from aiogram import F, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from config import ADMIN_IDS
+from database.instrumentation import query_stats
 from database.models import (
     Algorithm,
     AlgorithmData,
@@ -13,11 +18,22 @@ from database.models import (
     Coin,
     Manufacturer,
 )
-from database.request import CalculatorReq, CoinReq
 from keyboards.admin_kb import AdminKB
 from signature import Settings
+from utils.catalog_importer import (
+    DOCUMENT_FIELDS,
+    CatalogImporter,
+    CatalogImportError,
+    ImportRow,
+    parse_catalog_document,
+)
+from utils.stats import render_stats
+
 
-ADMIN_IDS = list(map(int, os.getenv("ADMIN_IDS", "").split(",")))
+logger = logging.getLogger(__name__)
+
+# Документ каталога: тысяча моделей в CSV занимает ~100 КБ
+CATALOG_DOCUMENT_MAX_BYTES = 2 * 1024 * 1024
 
 
 class AdminStates(StatesGroup):
@@ -34,6 +50,9 @@ class AdminStates(StatesGroup):
     add_asic_power = State()
     add_asic_get_coin = State()
 
+    catalog_upload = State()
+    catalog_confirm = State()
+
     edit_coin_price = State()
     algo_default_coin = State()
     algo_difficulty = State()
@@ -46,12 +65,17 @@ class Admin:
         self.bot = bot.bot
         self.dp = bot.dp
         self.settings = bot
-        self.calc_req = CalculatorReq(bot.db_manager.async_session)
-        self.coin_req = CoinReq(bot.db_manager.async_session)
+        # Общие экземпляры: правки каталога сбрасывают индекс, который читают клиенты
+        self.calc_req = bot.calculator_req
+        self.coin_req = bot.coin_req
+        self.admin_notifier = bot.admin_notifier
+        self.catalog_importer = CatalogImporter(self.calc_req)
 
     async def register_handler(self):
         self.dp.message(Command("admin"))(self.admin_menu)
+        self.dp.message(Command("dbstats"))(self.db_stats)
         self.dp.callback_query(F.data == "admin_menu")(self.admin_menu)
+        self.dp.callback_query(F.data == "admin_stats")(self.admin_stats)
 
         self.dp.callback_query(F.data == "broadcast_start")(self.broadcast_start)
         self.dp.message(AdminStates.broadcast_text)(self.broadcast_text)
@@ -62,6 +86,12 @@ class Admin:
             self.broadcast_no_photo
         )
 
+        self.dp.callback_query(
+            F.data.startswith("broadcast_pause:")
+            | F.data.startswith("broadcast_resume:")
+            | F.data.startswith("broadcast_cancel:")
+        )(self.broadcast_control)
+
         self.dp.callback_query(F.data == "admin_menu", AdminStates.broadcast_photo)(
             self.admin_menu_from_broadcast
         )
@@ -85,6 +115,15 @@ class Admin:
         self.dp.message(AdminStates.add_asic_power)(self.add_asic_power)
         self.dp.message(AdminStates.add_asic_get_coin)(self.add_asic_get_coin)
 
+        self.dp.callback_query(F.data == "catalog_upload")(self.catalog_upload_start)
+        self.dp.message(AdminStates.catalog_upload, F.content_type == "document")(
+            self.catalog_upload_document
+        )
+        self.dp.callback_query(F.data == "catalog_apply", AdminStates.catalog_confirm)(
+            self.catalog_apply
+        )
+        self.dp.callback_query(F.data == "catalog_cancel")(self.catalog_cancel)
+
         self.dp.callback_query(F.data.startswith("delete_asic:"))(self.delete_asic)
         self.dp.callback_query(F.data.startswith("delete_line:"))(self.delete_line)
 
@@ -121,6 +160,33 @@ class Admin:
         else:
             await event.answer(text, reply_markup=kb)
 
+    async def db_stats(self, message: types.Message):
+        if not self.is_admin(message.from_user.id):
+            return await message.answer("❌ Нет доступа")
+        report = query_stats.report()
+        if message.text and message.text.split()[-1] == "reset":
+            query_stats.reset()
+            report += "\n\n🔄 Статистика сброшена"
+        # Без Markdown: в именах методов и SQL есть символы разметки
+        for start in range(0, len(report), 4000):
+            await message.answer(report[start:start + 4000], parse_mode=None)
+
+    async def admin_stats(self, call: types.CallbackQuery):
+        if not self.is_admin(call.from_user.id):
+            return await call.answer("❌ Нет доступа")
+        await call.answer()
+        totals, daily = await self.settings.stats.snapshot()
+        try:
+            await call.message.edit_text(
+                render_stats(totals, daily),
+                reply_markup=await AdminKB.stats_menu(),
+                parse_mode=None,
+            )
+        except TelegramBadRequest as e:
+            # "Обновить" без новых событий - текст не изменился
+            if "not modified" not in str(e):
+                raise
+
     async def broadcast_start(self, call: types.CallbackQuery, state: FSMContext):
         await call.message.edit_text("📢 Введите текст рассылки:")
         await state.set_state(AdminStates.broadcast_text)
@@ -135,53 +201,44 @@ class Admin:
 
     async def broadcast_photo(self, message: types.Message, state: FSMContext):
         data = await state.get_data()
-        text = data["text"]
-        photo = message.photo[-1].file_id
-        users = await self.settings.user_req.get_all_users()
-
-        success_count = 0
-        fail_count = 0
-
-        for u in users:
-            try:
-                await self.bot.send_photo(u.uid, photo, caption=text)
-                success_count += 1
-            except Exception:
-                fail_count += 1
-
-        await message.answer(
-            f"✅ Рассылка завершена\n"
-            f"✅ Успешно: {success_count}\n"
-            f"❌ Не доставлено: {fail_count}",
-            reply_markup=await AdminKB.admin_menu(),
-        )
+        # Фото рассылается по file_id: Telegram не принимает файл заново для каждого получателя
+        await self._start_broadcast(message, data["text"], message.photo[-1].file_id)
         await state.clear()
 
     async def broadcast_no_photo(self, message: types.Message, state: FSMContext):
         if message.text.lower() == "нет":
             data = await state.get_data()
-            text = data["text"]
-            users = await self.settings.user_req.get_all_users()
-
-            success_count = 0
-            fail_count = 0
-
-            for u in users:
-                try:
-                    await self.bot.send_message(u.uid, text)
-                    success_count += 1
-                except Exception:
-                    fail_count += 1
+            await self._start_broadcast(message, data["text"])
+            await state.clear()
+        else:
+            await message.answer("❌ Отправьте фото или напишите 'нет'")
 
+    async def _start_broadcast(
+        self, message: types.Message, text: str, photo: Optional[str] = None
+    ) -> None:
+        # Рассылка идёт в фоне, прогресс - в отдельном сообщении, которое она правит
+        job = await self.settings.broadcasts.start(message.chat.id, text, photo=photo)
+        if job is None:
             await message.answer(
-                f"✅ Рассылка завершена\n"
-                f"✅ Успешно: {success_count}\n"
-                f"❌ Не доставлено: {fail_count}",
+                "⏳ Предыдущая рассылка ещё идёт, дождитесь её завершения",
                 reply_markup=await AdminKB.admin_menu(),
             )
-            await state.clear()
+
+    async def broadcast_control(self, call: types.CallbackQuery):
+        if not self.is_admin(call.from_user.id):
+            return await call.answer("❌ Нет доступа")
+        action, broadcast_id = call.data.split(":")
+        broadcasts = self.settings.broadcasts
+        handlers = {
+            "broadcast_pause": (broadcasts.pause, "⏸ Рассылка будет приостановлена"),
+            "broadcast_resume": (broadcasts.resume, "▶️ Рассылка продолжается"),
+            "broadcast_cancel": (broadcasts.cancel, "✖️ Рассылка отменена"),
+        }
+        handler, done_text = handlers[action]
+        if await handler(int(broadcast_id)):
+            await call.answer(done_text)
         else:
-            await message.answer("❌ Отправьте фото или напишите 'нет'")
+            await call.answer("Рассылка уже завершена или идёт другая", show_alert=True)
 
     async def admin_menu_from_broadcast(
         self, call: types.CallbackQuery, state: FSMContext
@@ -296,6 +353,101 @@ class Admin:
         except Exception as e:
             await message.answer(f"❌ Ошибка: {e}")
 
+    async def catalog_upload_start(self, call: types.CallbackQuery, state: FSMContext):
+        if not self.is_admin(call.from_user.id):
+            return await call.answer("❌ Нет доступа")
+        await call.answer()
+        await call.message.edit_text(
+            "📄 Отправьте каталог документом .csv или .json\n\n"
+            f"Колонки: {', '.join(DOCUMENT_FIELDS)} \n"
+            "unit - необязательно (MH/s, GH/s, TH/s…): хешрейт переводится в "
+            "единицы калькулятора для алгоритма, без unit число берётся как есть\n"
+            "Пример строки CSV:\n"
+            "Bitmain;S21;SHA-256;Bitmain Antminer S21 200 TH/s;200;3500;BTC, BCH\n\n"
+            "Модели ищутся по производителю, линейке и названию: найденные "
+            "обновляются, новые добавляются, остальные не меняются",
+            reply_markup=await AdminKB.catalog_upload_back(),
+            parse_mode=None,
+        )
+        await state.set_state(AdminStates.catalog_upload)
+
+    async def _read_catalog_document(
+        self, file_id: str, filename: str
+    ) -> Tuple[List[ImportRow], List[str]]:
+        content = await self.bot.download(file_id, destination=io.BytesIO())
+        return parse_catalog_document(content.getvalue(), filename)
+
+    async def catalog_upload_document(self, message: types.Message, state: FSMContext):
+        if not self.is_admin(message.from_user.id):
+            return
+        document = message.document
+        if document.file_size and document.file_size > CATALOG_DOCUMENT_MAX_BYTES:
+            return await message.answer("❌ Файл больше 2 МБ")
+        filename = document.file_name or ""
+        try:
+            rows, errors = await self._read_catalog_document(document.file_id, filename)
+        except CatalogImportError as e:
+            return await message.answer(f"❌ {e}", parse_mode=None)
+
+        if errors:
+            shown = "\n".join(errors[:10])
+            more = f"\n… и ещё {len(errors) - 10}" if len(errors) > 10 else ""
+            return await message.answer(
+                f"❌ Ошибки в документе ({len(errors)}), ничего не применено:\n"
+                f"{shown}{more}\n\nИсправьте файл и отправьте его снова",
+                parse_mode=None,
+            )
+        if not rows:
+            return await message.answer("❌ В документе нет моделей")
+
+        diff = await self.catalog_importer.plan(rows, deactivate_missing=False)
+        if diff.is_empty:
+            await state.clear()
+            return await message.answer(
+                f"✅ Каталог уже совпадает с документом ({diff.unchanged} моделей)",
+                reply_markup=await AdminKB.admin_menu(),
+            )
+        # В состоянии только file_id: при подтверждении документ разбирается
+        # заново и сравнивается со свежим каталогом
+        await state.update_data(catalog_file_id=document.file_id, catalog_filename=filename)
+        await state.set_state(AdminStates.catalog_confirm)
+        preview = "\n".join(diff.preview())
+        await message.answer(
+            f"📋 Изменения каталога:\n{diff.summary()}\n\n{preview}",
+            reply_markup=await AdminKB.catalog_upload_confirm(),
+            parse_mode=None,
+        )
+
+    async def catalog_apply(self, call: types.CallbackQuery, state: FSMContext):
+        if not self.is_admin(call.from_user.id):
+            return await call.answer("❌ Нет доступа")
+        data = await state.get_data()
+        await state.clear()
+        await call.answer()
+        try:
+            rows, errors = await self._read_catalog_document(
+                data["catalog_file_id"], data["catalog_filename"]
+            )
+            if errors:
+                raise CatalogImportError(errors[0])
+            diff = await self.catalog_importer.import_rows(rows, deactivate_missing=False)
+        except Exception as e:
+            logger.error(f"Загрузка каталога: {e}")
+            return await call.message.edit_text(
+                f"❌ Каталог не изменён: {e}",
+                reply_markup=await AdminKB.admin_menu(),
+                parse_mode=None,
+            )
+        await call.message.edit_text(
+            f"✅ Каталог обновлён\n{diff.summary()}",
+            reply_markup=await AdminKB.admin_menu(),
+            parse_mode=None,
+        )
+
+    async def catalog_cancel(self, call: types.CallbackQuery, state: FSMContext):
+        await state.clear()
+        await self.manage_asic(call)
+
     async def delete_asic(self, call: types.CallbackQuery):
         model_id = int(call.data.split(":")[1])
         await self.calc_req.delete_asic_model(model_id)
@@ -382,22 +534,18 @@ class Admin:
             await message.answer("❌ Введите число")
 
     async def handle_user_photo(self, message: types.Message):
-        current_state = await self.settings.dp.current_state().get_state()
-        if current_state == AdminStates.broadcast_photo.state:
-            return
-
+        # Админ мог попасть сюда только из своих состояний (например, рассылки),
+        # поэтому состояние FSM не читаем
         if self.is_admin(message.from_user.id):
             return
 
-        for admin_id in ADMIN_IDS:
-            try:
-                await self.bot.forward_message(
-                    admin_id, message.chat.id, message.message_id
-                )
-                await self.bot.send_message(
-                    admin_id,
-                    f"📸 От @{message.from_user.username or message.from_user.id}",
-                    reply_markup=await AdminKB.reply_to_user(message.from_user.id),
-                )
-            except Exception:
-                pass
+        user = message.from_user
+        caption = f"📸 От @{user.username or user.id}"
+        reply_markup = await AdminKB.reply_to_user(user.id)
+
+        async def send(admin_id: int):
+            await self.bot.forward_message(admin_id, message.chat.id, message.message_id)
+            await self.bot.send_message(admin_id, caption, reply_markup=reply_markup)
+
+        await message.answer("📨 Фото передано менеджеру, ответ придёт в этот чат.")
+        self.admin_notifier.spawn(send)
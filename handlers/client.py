@@ -1,12 +1,10 @@
 # [file name]: client.py
 import os
-from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 from aiogram import F, types
 from aiogram.enums import ContentType
 from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
-from aiogram.types import FSInputFile
 from aiogram.filters import Command, Filter
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -16,12 +14,11 @@ from database.models import Algorithm, Manufacturer
 from keyboards.calculator_kb import CalculatorKB
 from keyboards.client_kb import ClientKB
 from signature import Settings
-from utils.ai_service import ask_ishushka, create_chat
+from utils.ai_service import ask_ishushka
 from utils.calculator import MiningCalculator
 from utils.coin_service import CoinGeckoService
 from utils.states import BetterPriceState, CalculatorState, FreeAiState, SellForm
-
-user_chats: Dict[int, str] = {}
+from utils.stats import AI_QUESTIONS, CALCULATIONS, SELL_REQUESTS, USERS_NEW
 
 
 class ChannelFilter(Filter):
@@ -42,6 +39,10 @@ class Client:
         self.coin_req = bot.coin_req
         self.sell_req = bot.sell_req
         self.guide_req = bot.guide_req
+        self.conversations = bot.conversations
+        self.media = bot.media
+        self.stats = bot.stats
+        self.admin_notifier = bot.admin_notifier
         self.latest_price_link = None
 
     def _get_coin_filter_rules(self) -> dict:
@@ -76,29 +77,102 @@ class Client:
             # Нет правила фильтрации - оставляем все монеты
             return all_coins
 
-    def _filter_coin_string_for_miner(
-        self, model_line, coin_string: str
-    ) -> str:
-        """Фильтрует строку монет для майнера согласно правилам (для отображения)"""
-        if not coin_string or not coin_string.strip():
-            return coin_string
-        
+    def _filter_coin_symbols_for_miner(
+        self, model_line, coins: Tuple[str, ...]
+    ) -> Tuple[str, ...]:
+        """Фильтрует монеты майнера согласно правилам (для отображения)"""
         filter_rules = self._get_coin_filter_rules()
-        filter_key = (model_line.manufacturer, model_line.name)
-        
-        if filter_key in filter_rules:
+        target_coin = filter_rules.get((model_line.manufacturer, model_line.name))
+        if target_coin in coins:
             # Оставляем только указанную монету
-            target_coin = filter_rules[filter_key]
-            # Разбиваем строку на монеты и ищем нужную
-            coins = [c.strip().upper() for c in coin_string.split(",")]
-            if target_coin in coins:
-                return target_coin
-            else:
-                # Если целевая монета не найдена, возвращаем исходную строку
-                return coin_string
-        else:
-            # Нет правила фильтрации - возвращаем все монеты
-            return coin_string
+            return (target_coin,)
+        # Нет правила или целевой монеты нет в списке - показываем все монеты
+        return coins
+
+    async def _coin_calc_entry(self, coin, algo_data) -> dict:
+        """Данные монеты для MiningCalculator: параметры её сети из
+        coin_network_params, недостающие - из algorithm_data алгоритма"""
+        entry = {
+            "price": coin.current_price_usd,
+            "network_hashrate": algo_data.network_hashrate,
+            "block_reward": algo_data.block_reward,
+            "algorithm": coin.algorithm.value.lower(),
+        }
+        params = await self.calculator_req.get_coin_params(coin.symbol)
+        if params:
+            if params.network_hashrate is not None:
+                entry["network_hashrate"] = params.network_hashrate
+            if params.block_reward is not None:
+                entry["block_reward"] = params.block_reward
+            if params.block_time:
+                entry["block_time"] = params.block_time
+        return entry
+
+    async def _algorithm_coin_data(
+        self, coin, algo_data
+    ) -> Tuple[Dict[str, dict], List[str]]:
+        """coin_data для расчёта по алгоритму: монета алгоритма и монеты,
+        которые добываются вместе с ней (DOGE с LTC)"""
+        coin_data = {coin.symbol: await self._coin_calc_entry(coin, algo_data)}
+        coin_symbols = [coin.symbol]
+        merged = await self.calculator_req.get_merged_coins(coin_symbols)
+        merged_coins = await self.coin_req.get_coins_by_symbols(merged)
+        for symbol in merged:
+            merged_coin = merged_coins.get(symbol)
+            if merged_coin:
+                coin_data[symbol] = await self._coin_calc_entry(merged_coin, algo_data)
+                coin_symbols.append(symbol)
+        return coin_data, coin_symbols
+
+    async def _build_model_coin_data(
+        self, model, model_line
+    ) -> Tuple[Dict[str, dict], List[str]]:
+        """Данные монет модели для MiningCalculator: (coin_data, порядок символов)"""
+        if not model.coins:
+            algo_data = await self.calculator_req.get_algorithm_data(
+                model_line.algorithm
+            )
+            coin = await self.coin_req.get_coin_by_symbol(algo_data.default_coin)
+            if not (coin and algo_data):
+                return {}, []
+            return await self._algorithm_coin_data(coin, algo_data)
+
+        coin_symbols_list = list(model.coins)
+        # Монеты совместного майнинга (DOGE с LTC) запрашиваем вместе с монетами модели
+        merged = await self.calculator_req.get_merged_coins(coin_symbols_list)
+
+        # Все монеты и данные их алгоритмов - двумя запросами
+        coins_dict = await self.coin_req.get_coins_by_symbols(coin_symbols_list + merged)
+        algorithms_set = {coin.algorithm for coin in coins_dict.values() if coin}
+        algo_data_dict = await self.calculator_req.get_algorithm_data_batch(algorithms_set)
+
+        all_coins = []
+        for coin_symbol in coin_symbols_list + merged:
+            coin = coins_dict.get(coin_symbol)
+            if coin:
+                algo_data = algo_data_dict.get(coin.algorithm)
+                if algo_data:
+                    all_coins.append({
+                        "symbol": coin_symbol,
+                        "coin": coin,
+                        "algo_data": algo_data
+                    })
+
+        # Применяем фильтрацию монет согласно правилам
+        filtered_coins = await self._filter_coins_for_miner(model_line, all_coins)
+        # Монета совместного майнинга остаётся, если осталась основная (DOGE при LTC)
+        kept = [c["symbol"] for c in filtered_coins]
+        for symbol in await self.calculator_req.get_merged_coins(kept):
+            filtered_coins += [c for c in all_coins if c["symbol"] == symbol]
+
+        coin_data = {}
+        coin_symbols = []
+        for coin_info in filtered_coins:
+            coin_data[coin_info["symbol"]] = await self._coin_calc_entry(
+                coin_info["coin"], coin_info["algo_data"]
+            )
+            coin_symbols.append(coin_info["symbol"])
+        return coin_data, coin_symbols
 
     async def register_handlers(self):
         self.dp.message(Command("start"))(self.start_handler)
@@ -236,8 +310,8 @@ class Client:
             user = message.from_user
             message_obj = message
 
-        if not await self.user_req.user_exists(user.id):
-            await self.user_req.add_user(user.id, user.username or user.first_name)
+        if await self.user_req.ensure_user(user.id, user.username or user.first_name):
+            self.stats.incr(USERS_NEW)
 
         text = (
             f"👋 Привет, {user.first_name}!\n\n"
@@ -245,27 +319,34 @@ class Client:
             "Могу провести расчёт потенциальной доходности, помочь с выбором подходящего оборудования "
             "и дать подробные ответы на любые связанные с этим вопросы."
         )
-        # Приветственное фото — локальный image/logo.JPG (Asic Store)
-        project_root = Path(__file__).resolve().parent.parent
-        logo_path = project_root / "image" / "logo.JPG"
-        if logo_path.exists():
-            photo = FSInputFile(logo_path)
-        else:
-            photo = os.getenv("WELCOME_PHOTO_URL") or None
+        # Приветственное фото — локальный image/logo.JPG (Asic Store);
+        # загружается один раз, дальше отправляется по file_id
+        logo_path = self.media.asset_path("logo")
+        has_logo = logo_path.exists()
+        photo_url = None if has_logo else os.getenv("WELCOME_PHOTO_URL")
         kb = await ClientKB.main_menu()
 
         if isinstance(message, types.CallbackQuery):
             await message_obj.delete()
 
-        if photo:
+        if has_logo or photo_url:
             try:
-                await self.bot.send_photo(
-                    chat_id=user.id,
-                    photo=photo,
-                    caption=text,
-                    reply_markup=kb,
-                    request_timeout=30,
-                )
+                if has_logo:
+                    await self.media.send_photo(
+                        user.id,
+                        logo_path,
+                        caption=text,
+                        reply_markup=kb,
+                        request_timeout=30,
+                    )
+                else:
+                    await self.bot.send_photo(
+                        chat_id=user.id,
+                        photo=photo_url,
+                        caption=text,
+                        reply_markup=kb,
+                        request_timeout=30,
+                    )
             except (TelegramNetworkError, OSError, Exception) as e:
                 # Таймаут или сеть — приветствие текстом, бот не падает
                 print(f"Приветственное фото не отправлено ({type(e).__name__}), отправлен текст")
@@ -393,7 +474,7 @@ class Client:
                 pass
             return
 
-        await state.update_data(model_line=model_line)
+        await state.update_data(model_line_id=model_line.id)
         await call.message.edit_text(
             f"🔧 Выберите модель {model_line.manufacturer.value} {model_line.name}:",
             reply_markup=await ClientKB.chars_models(models),
@@ -431,10 +512,10 @@ class Client:
             f"🔌 **Потребление:** {model.power_consumption}W\n"
         )
 
-        if model.get_coin:
+        if model.coins:
             # Применяем фильтрацию монет согласно правилам
-            filtered_coins = self._filter_coin_string_for_miner(model_line, model.get_coin)
-            message += f"🪙 **Добывает:** {filtered_coins}\n"
+            filtered_coins = self._filter_coin_symbols_for_miner(model_line, model.coins)
+            message += f"🪙 **Добывает:** {', '.join(filtered_coins)}\n"
 
         await call.message.edit_text(message, reply_markup=await ClientKB.chars_back())
         try:
@@ -551,25 +632,22 @@ class Client:
         data = await state.get_data()
         user = call.from_user
         try:
-            await self.bot.send_photo(
-                chat_id=ADMIN_ID,
-                photo=data["photo"],
-                caption=(
+            # Отправит фоновый Outbox с повторами: пользователь не ждёт Telegram
+            await self.admin_notifier.enqueue(
+                (
                     f"<b>Заявка «Лучшая цена»</b>\n"
                     f"От: @{user.username or user.first_name}\n"
                     f"ID: <code>{user.id}</code>\n\n"
                     f"{data['comment']}\n\n"
                     f"С вами скоро свяжется менеджер @snooby37."
                 ),
+                photo=data["photo"],
+                fallback_text=(
+                    f"⚠ Заявка «Лучшая цена» (не удалось отправить фото):\n"
+                    f"От: @{user.username or user.first_name}, ID: {user.id}\n\n{data['comment']}"
+                ),
                 parse_mode="HTML",
-                request_timeout=15,
-            )
-        except (TelegramNetworkError, OSError) as e:
-            print(f"Сеть при отправке заявки админу: {e}")
-            await self.bot.send_message(
-                ADMIN_ID,
-                f"⚠ Заявка «Лучшая цена» (не удалось отправить фото):\n"
-                f"От: @{user.username or user.first_name}, ID: {user.id}\n\n{data['comment']}",
+                admin_ids=[ADMIN_ID],
             )
         except Exception as e:
             print(e)
@@ -621,10 +699,9 @@ class Client:
     async def ai_consult_start(self, call: types.CallbackQuery, state: FSMContext):
         await call.message.delete()
         user_id = call.from_user.id
-        # Создаём новый чат в API (старые conversation_id живут 48ч и дают 404)
-        conv_id = await create_chat()
-        if conv_id:
-            user_chats[user_id] = conv_id
+        # Новый чат на каждую консультацию (старые conversation_id живут 48ч и дают 404);
+        # берётся из пула заранее созданных, поэтому лишнего запроса к API нет
+        await self.conversations.new_conversation(user_id)
         await self.bot.send_message(
             user_id,
             "💬 Задайте ваш вопрос по майнингу:",
@@ -685,13 +762,10 @@ class Client:
     async def ai_chat_handler(self, message: types.Message, state: FSMContext):
         context = await self.prepare_ai_context()
         user_id = message.from_user.id
-        # Используем чат пользователя или создаём новый; без id запрос уйдёт в fallback /request/
-        conv_id = user_chats.get(user_id)
-        if not conv_id:
-            conv_id = await create_chat()
-            if conv_id:
-                user_chats[user_id] = conv_id
+        # Используем чат пользователя или выдаём новый; без id запрос уйдёт в fallback /request/
+        conv_id = await self.conversations.get_or_create(user_id)
         response = await ask_ishushka(conv_id or "default", message.text, context)
+        self.stats.incr(AI_QUESTIONS)
         await message.answer(
             response, parse_mode=None, reply_markup=await ClientKB.back_ai()
         )
@@ -766,7 +840,7 @@ class Client:
                 pass
             return
 
-        await state.update_data(model_line=model_line)
+        await state.update_data(model_line_id=model_line.id)
         await call.message.edit_text(
             f"🔧 Выберите модель {model_line.manufacturer.value} {model_line.name}:",
             reply_markup=await CalculatorKB.choose_asic_models_by_line(
@@ -784,8 +858,10 @@ class Client:
         page = int(call.data.split(":")[1])
         data = await state.get_data()
 
-        if "model_line" in data:
-            model_line = data["model_line"]
+        if "model_line_id" in data:
+            model_line = await self.calculator_req.get_model_line_by_id(
+                data["model_line_id"]
+            )
             models = await self.calculator_req.get_asic_models_by_model_line(
                 model_line.id
             )
@@ -820,7 +896,8 @@ class Client:
                 pass
             return
 
-        await state.update_data(model_id=model_id, model=model)
+        # В состоянии FSM храним только id: модель берётся из индекса каталога
+        await state.update_data(model_id=model_id)
         await call.message.edit_text(
             "💡 Введите стоимость электроэнергии (₽/кВт·ч):",
             reply_markup=await CalculatorKB.electricity_input(),
@@ -894,102 +971,17 @@ class Client:
             usd_to_rub = await coin_service.get_usd_rub_rate()
 
             if data.get("method") == "asic":
-                model = data["model"]
+                model = await self.calculator_req.get_asic_model_by_id(data["model_id"])
+                if not model:
+                    await message.answer("❌ Модель не найдена в базе данных")
+                    return
                 model_line = await self.calculator_req.get_model_line_by_id(
                     model.model_line_id
                 )
 
-                coin_data = {}
-                coin_symbols = []
-
-                if model.get_coin and model.get_coin.strip():
-                    # Оптимизация: загружаем все монеты одним запросом вместо цикла
-                    coin_symbols_list = [s.strip().upper() for s in model.get_coin.split(",")]
-                    # Для Scrypt сразу добавляем DOGE, если есть LTC
-                    if model_line.algorithm == Algorithm.SCRYPT and "LTC" in coin_symbols_list and "DOGE" not in coin_symbols_list:
-                        coin_symbols_list.append("DOGE")
-                    
-                    coins_dict = await self.coin_req.get_coins_by_symbols(coin_symbols_list)
-                    
-                    # Загружаем данные алгоритмов одним запросом
-                    algorithms_set = {coin.algorithm for coin in coins_dict.values() if coin}
-                    algo_data_dict = await self.calculator_req.get_algorithm_data_batch(algorithms_set)
-                    
-                    # Формируем список монет с данными алгоритмов
-                    all_coins = []
-                    for coin_symbol in coin_symbols_list:
-                        coin = coins_dict.get(coin_symbol)
-                        if coin:
-                            algo_data = algo_data_dict.get(coin.algorithm)
-                            if algo_data:
-                                all_coins.append({
-                                    "symbol": coin_symbol,
-                                    "coin": coin,
-                                    "algo_data": algo_data
-                                })
-                    
-                    # Применяем фильтрацию монет согласно правилам
-                    filtered_coins = await self._filter_coins_for_miner(model_line, all_coins)
-                    
-                    # Формируем coin_data из отфильтрованных монет
-                    for coin_info in filtered_coins:
-                        coin_symbol = coin_info["symbol"]
-                        coin = coin_info["coin"]
-                        algo_data = coin_info["algo_data"]
-                        coin_data[coin_symbol] = {
-                            "price": coin.current_price_usd,
-                            "network_hashrate": algo_data.network_hashrate,
-                            "block_reward": algo_data.block_reward,
-                            "algorithm": coin.algorithm.value.lower(),
-                        }
-                        coin_symbols.append(coin_symbol)
-                    
-                    # Для Scrypt добавляем DOGE (если есть LTC) - DOGE уже загружен выше
-                    if model_line.algorithm == Algorithm.SCRYPT and "LTC" in [c["symbol"] for c in filtered_coins]:
-                        doge_coin = coins_dict.get("DOGE")
-                        if doge_coin and "DOGE" not in coin_data:
-                            # LTC и DOGE - это разные сети, поэтому у них разные network_hashrate
-                            # Для DOGE используем актуальное значение network_hashrate из capminer.ru тестов
-                            # DOGE network_hashrate: ~2,958,883 GH/s (не зависит от LTC network_hashrate)
-                            doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                            coin_data["DOGE"] = {
-                                "price": doge_coin.current_price_usd,
-                                "network_hashrate": doge_network_hashrate,  # Отдельный network_hashrate для DOGE
-                                "block_reward": 10000,  # Стандартный block_reward для DOGE
-                                "algorithm": model_line.algorithm.value.lower(),
-                            }
-                            coin_symbols.append("DOGE")
-                else:
-                    algo_data = await self.calculator_req.get_algorithm_data(
-                        model_line.algorithm
-                    )
-                    coin = await self.coin_req.get_coin_by_symbol(
-                        algo_data.default_coin
-                    )
-                    if coin and algo_data:
-                        coin_data[coin.symbol] = {
-                            "price": coin.current_price_usd,
-                            "network_hashrate": algo_data.network_hashrate,
-                            "block_reward": algo_data.block_reward,
-                            "algorithm": model_line.algorithm.value.lower(),
-                        }
-                        coin_symbols.append(coin.symbol)
-                        
-                        # Для Scrypt добавляем DOGE (если default_coin LTC)
-                        if model_line.algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                            doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                            if doge_coin:
-                                # LTC и DOGE - это разные сети, поэтому у них разные network_hashrate
-                                # Для DOGE используем актуальное значение network_hashrate из capminer.ru тестов
-                                # DOGE network_hashrate: ~2,958,883 GH/s (не зависит от LTC network_hashrate)
-                                doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                                coin_data["DOGE"] = {
-                                    "price": doge_coin.current_price_usd,
-                                    "network_hashrate": doge_network_hashrate,  # Отдельный network_hashrate для DOGE
-                                    "block_reward": 10000,  # Стандартный block_reward для DOGE
-                                    "algorithm": model_line.algorithm.value.lower(),
-                                }
-                                coin_symbols.append("DOGE")
+                coin_data, coin_symbols = await self._build_model_coin_data(
+                    model, model_line
+                )
 
                 if not coin_symbols:
                     await message.answer("❌ Не удалось найти данные о монетах")
@@ -1028,32 +1020,10 @@ class Client:
                         hashrate = hashrate * 1000  # TH/s -> GH/s
                     # Иначе считаем, что уже в GH/s (как на capminer.ru)
 
-                # Формируем coin_data
-                coin_data_input = {
-                    coin.symbol: {
-                        "price": coin.current_price_usd,
-                        "network_hashrate": algo_data.network_hashrate,
-                        "block_reward": algo_data.block_reward,
-                        "algorithm": algorithm.value.lower(),
-                    }
-                }
-                
-                # Для Scrypt добавляем DOGE (если default_coin LTC)
-                display_symbols = [coin.symbol]
-                if algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                    doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                    if doge_coin:
-                        # LTC и DOGE - это разные сети, поэтому у них разные network_hashrate
-                        # Для DOGE используем актуальное значение network_hashrate из capminer.ru тестов
-                        # DOGE network_hashrate: ~2,958,883 GH/s (не зависит от LTC network_hashrate)
-                        doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                        coin_data_input["DOGE"] = {
-                            "price": doge_coin.current_price_usd,
-                            "network_hashrate": doge_network_hashrate,  # Отдельный network_hashrate для DOGE
-                            "block_reward": 10000,  # Стандартный block_reward для DOGE
-                            "algorithm": algorithm.value.lower(),
-                        }
-                        display_symbols.append("DOGE")
+                # Формируем coin_data: монета алгоритма и монеты совместного майнинга
+                coin_data_input, display_symbols = await self._algorithm_coin_data(
+                    coin, algo_data
+                )
 
                 result = MiningCalculator.calculate_profitability(
                     hash_rate=hashrate,
@@ -1070,6 +1040,8 @@ class Client:
 
             await message.answer(text, reply_markup=await CalculatorKB.result_menu())
             await state.set_state(CalculatorState.show_result)
+            # Пересчёт в USD/RUB (calc_usd/calc_rub) - тот же расчёт, не считаем
+            self.stats.incr(CALCULATIONS)
         except Exception as e:
             print(f"Ошибка в calc_electricity_handler: {e}")
             import traceback
@@ -1114,7 +1086,7 @@ class Client:
         usd_to_rub = await coin_service.get_usd_rub_rate()
 
         if data.get("method") == "asic":
-            # Загружаем модель заново из БД по model_id, так как объект ORM может быть неполным после сериализации
+            # В состоянии FSM только model_id, модель берём из индекса каталога
             model_id = data.get("model_id")
             if not model_id:
                 await call.message.edit_text("❌ Ошибка: данные о модели не найдены. Пожалуйста, начните расчет заново.")
@@ -1127,91 +1099,9 @@ class Client:
                 model.model_line_id
             )
             
-            coin_data = {}
-            coin_symbols = []
-
-            if model.get_coin and model.get_coin.strip():
-                # Оптимизация: загружаем все монеты одним запросом вместо цикла
-                coin_symbols_list = [s.strip().upper() for s in model.get_coin.split(",")]
-                # Для Scrypt сразу добавляем DOGE, если есть LTC
-                if model_line.algorithm == Algorithm.SCRYPT and "LTC" in coin_symbols_list and "DOGE" not in coin_symbols_list:
-                    coin_symbols_list.append("DOGE")
-                
-                coins_dict = await self.coin_req.get_coins_by_symbols(coin_symbols_list)
-                
-                # Загружаем данные алгоритмов одним запросом
-                algorithms_set = {coin.algorithm for coin in coins_dict.values() if coin}
-                algo_data_dict = await self.calculator_req.get_algorithm_data_batch(algorithms_set)
-                
-                # Формируем список монет с данными алгоритмов
-                all_coins = []
-                for coin_symbol in coin_symbols_list:
-                    coin = coins_dict.get(coin_symbol)
-                    if coin:
-                        algo_data = algo_data_dict.get(coin.algorithm)
-                        if algo_data:
-                            all_coins.append({
-                                "symbol": coin_symbol,
-                                "coin": coin,
-                                "algo_data": algo_data
-                            })
-                
-                # Применяем фильтрацию монет согласно правилам
-                filtered_coins = await self._filter_coins_for_miner(model_line, all_coins)
-                
-                # Формируем coin_data из отфильтрованных монет
-                for coin_info in filtered_coins:
-                    coin_symbol = coin_info["symbol"]
-                    coin = coin_info["coin"]
-                    algo_data = coin_info["algo_data"]
-                    coin_data[coin_symbol] = {
-                        "price": coin.current_price_usd,
-                        "network_hashrate": algo_data.network_hashrate,
-                        "block_reward": algo_data.block_reward,
-                        "algorithm": coin.algorithm.value.lower(),
-                    }
-                    coin_symbols.append(coin_symbol)
-                
-                # Для Scrypt добавляем DOGE (если есть LTC) - DOGE уже загружен выше
-                if model_line.algorithm == Algorithm.SCRYPT and "LTC" in [c["symbol"] for c in filtered_coins]:
-                    doge_coin = coins_dict.get("DOGE")
-                    if doge_coin and "DOGE" not in coin_data:
-                        doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                        coin_data["DOGE"] = {
-                            "price": doge_coin.current_price_usd,
-                            "network_hashrate": doge_network_hashrate,
-                            "block_reward": 10000,
-                            "algorithm": model_line.algorithm.value.lower(),
-                        }
-                        coin_symbols.append("DOGE")
-            else:
-                algo_data = await self.calculator_req.get_algorithm_data(
-                    model_line.algorithm
-                )
-                coin = await self.coin_req.get_coin_by_symbol(
-                    algo_data.default_coin
-                )
-                if coin and algo_data:
-                    coin_data[coin.symbol] = {
-                        "price": coin.current_price_usd,
-                        "network_hashrate": algo_data.network_hashrate,
-                        "block_reward": algo_data.block_reward,
-                        "algorithm": model_line.algorithm.value.lower(),
-                    }
-                    coin_symbols.append(coin.symbol)
-                    
-                    # Для Scrypt добавляем DOGE (если default_coin LTC)
-                    if model_line.algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                        doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                        if doge_coin:
-                            doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                            coin_data["DOGE"] = {
-                                "price": doge_coin.current_price_usd,
-                                "network_hashrate": doge_network_hashrate,
-                                "block_reward": 10000,
-                                "algorithm": model_line.algorithm.value.lower(),
-                            }
-                            coin_symbols.append("DOGE")
+            coin_data, coin_symbols = await self._build_model_coin_data(
+                model, model_line
+            )
 
             if not coin_symbols:
                 await call.message.edit_text("❌ Не удалось найти данные о монетах")
@@ -1261,32 +1151,10 @@ class Client:
                 hashrate_unit_display = "TH/s"  # Для kHeavyHash в TH/s
             # Для SHA-256 остается TH/s
 
-            # Формируем coin_data
-            coin_data_input = {
-                coin.symbol: {
-                    "price": coin.current_price_usd,
-                    "network_hashrate": algo_data.network_hashrate,
-                    "block_reward": algo_data.block_reward,
-                    "algorithm": algorithm.value.lower(),
-                }
-            }
-            
-            # Для Scrypt добавляем DOGE (если default_coin LTC)
-            display_symbols = [coin.symbol]
-            if algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                if doge_coin:
-                    # LTC и DOGE - это разные сети, поэтому у них разные network_hashrate
-                    # Для DOGE используем актуальное значение network_hashrate из capminer.ru тестов
-                    # DOGE network_hashrate: ~2,958,883 GH/s (не зависит от LTC network_hashrate)
-                    doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                    coin_data_input["DOGE"] = {
-                        "price": doge_coin.current_price_usd,
-                        "network_hashrate": doge_network_hashrate,  # Отдельный network_hashrate для DOGE
-                        "block_reward": 10000,  # Стандартный block_reward для DOGE
-                        "algorithm": algorithm.value.lower(),
-                    }
-                    display_symbols.append("DOGE")
+            # Формируем coin_data: монета алгоритма и монеты совместного майнинга
+            coin_data_input, display_symbols = await self._algorithm_coin_data(
+                coin, algo_data
+            )
 
             result = MiningCalculator.calculate_profitability(
                 hash_rate=hashrate,
@@ -1338,7 +1206,7 @@ class Client:
         usd_to_rub = await coin_service.get_usd_rub_rate()
 
         if data.get("method") == "asic":
-            # Загружаем модель заново из БД по model_id, так как объект ORM может быть неполным после сериализации
+            # В состоянии FSM только model_id, модель берём из индекса каталога
             model_id = data.get("model_id")
             if not model_id:
                 await call.message.edit_text("❌ Ошибка: данные о модели не найдены. Пожалуйста, начните расчет заново.")
@@ -1351,91 +1219,9 @@ class Client:
                 model.model_line_id
             )
             
-            coin_data = {}
-            coin_symbols = []
-
-            if model.get_coin and model.get_coin.strip():
-                # Оптимизация: загружаем все монеты одним запросом вместо цикла
-                coin_symbols_list = [s.strip().upper() for s in model.get_coin.split(",")]
-                # Для Scrypt сразу добавляем DOGE, если есть LTC
-                if model_line.algorithm == Algorithm.SCRYPT and "LTC" in coin_symbols_list and "DOGE" not in coin_symbols_list:
-                    coin_symbols_list.append("DOGE")
-                
-                coins_dict = await self.coin_req.get_coins_by_symbols(coin_symbols_list)
-                
-                # Загружаем данные алгоритмов одним запросом
-                algorithms_set = {coin.algorithm for coin in coins_dict.values() if coin}
-                algo_data_dict = await self.calculator_req.get_algorithm_data_batch(algorithms_set)
-                
-                # Формируем список монет с данными алгоритмов
-                all_coins = []
-                for coin_symbol in coin_symbols_list:
-                    coin = coins_dict.get(coin_symbol)
-                    if coin:
-                        algo_data = algo_data_dict.get(coin.algorithm)
-                        if algo_data:
-                            all_coins.append({
-                                "symbol": coin_symbol,
-                                "coin": coin,
-                                "algo_data": algo_data
-                            })
-                
-                # Применяем фильтрацию монет согласно правилам
-                filtered_coins = await self._filter_coins_for_miner(model_line, all_coins)
-                
-                # Формируем coin_data из отфильтрованных монет
-                for coin_info in filtered_coins:
-                    coin_symbol = coin_info["symbol"]
-                    coin = coin_info["coin"]
-                    algo_data = coin_info["algo_data"]
-                    coin_data[coin_symbol] = {
-                        "price": coin.current_price_usd,
-                        "network_hashrate": algo_data.network_hashrate,
-                        "block_reward": algo_data.block_reward,
-                        "algorithm": coin.algorithm.value.lower(),
-                    }
-                    coin_symbols.append(coin_symbol)
-                
-                # Для Scrypt добавляем DOGE (если есть LTC) - DOGE уже загружен выше
-                if model_line.algorithm == Algorithm.SCRYPT and "LTC" in [c["symbol"] for c in filtered_coins]:
-                    doge_coin = coins_dict.get("DOGE")
-                    if doge_coin and "DOGE" not in coin_data:
-                        doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                        coin_data["DOGE"] = {
-                            "price": doge_coin.current_price_usd,
-                            "network_hashrate": doge_network_hashrate,
-                            "block_reward": 10000,
-                            "algorithm": model_line.algorithm.value.lower(),
-                        }
-                        coin_symbols.append("DOGE")
-            else:
-                algo_data = await self.calculator_req.get_algorithm_data(
-                    model_line.algorithm
-                )
-                coin = await self.coin_req.get_coin_by_symbol(
-                    algo_data.default_coin
-                )
-                if coin and algo_data:
-                    coin_data[coin.symbol] = {
-                        "price": coin.current_price_usd,
-                        "network_hashrate": algo_data.network_hashrate,
-                        "block_reward": algo_data.block_reward,
-                        "algorithm": model_line.algorithm.value.lower(),
-                    }
-                    coin_symbols.append(coin.symbol)
-                    
-                    # Для Scrypt добавляем DOGE (если default_coin LTC)
-                    if model_line.algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                        doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                        if doge_coin:
-                            doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                            coin_data["DOGE"] = {
-                                "price": doge_coin.current_price_usd,
-                                "network_hashrate": doge_network_hashrate,
-                                "block_reward": 10000,
-                                "algorithm": model_line.algorithm.value.lower(),
-                            }
-                            coin_symbols.append("DOGE")
+            coin_data, coin_symbols = await self._build_model_coin_data(
+                model, model_line
+            )
 
             result = MiningCalculator.calculate_profitability(
                 hash_rate=model.hash_rate,
@@ -1483,32 +1269,10 @@ class Client:
                 hashrate_unit_display = "TH/s"  # Для kHeavyHash в TH/s
             # Для SHA-256 остается TH/s
 
-            # Формируем coin_data
-            coin_data_input = {
-                coin.symbol: {
-                    "price": coin.current_price_usd,
-                    "network_hashrate": algo_data.network_hashrate,
-                    "block_reward": algo_data.block_reward,
-                    "algorithm": algorithm.value.lower(),
-                }
-            }
-            
-            # Для Scrypt добавляем DOGE (если default_coin LTC)
-            display_symbols = [coin.symbol]
-            if algorithm == Algorithm.SCRYPT and coin.symbol == "LTC":
-                doge_coin = await self.coin_req.get_coin_by_symbol("DOGE")
-                if doge_coin:
-                    # LTC и DOGE - это разные сети, поэтому у них разные network_hashrate
-                    # Для DOGE используем актуальное значение network_hashrate из capminer.ru тестов
-                    # DOGE network_hashrate: ~2,958,883 GH/s (не зависит от LTC network_hashrate)
-                    doge_network_hashrate = 2_958_883  # GH/s - актуальное значение для DOGE из capminer.ru
-                    coin_data_input["DOGE"] = {
-                        "price": doge_coin.current_price_usd,
-                        "network_hashrate": doge_network_hashrate,  # Отдельный network_hashrate для DOGE
-                        "block_reward": 10000,  # Стандартный block_reward для DOGE
-                        "algorithm": algorithm.value.lower(),
-                    }
-                    display_symbols.append("DOGE")
+            # Формируем coin_data: монета алгоритма и монеты совместного майнинга
+            coin_data_input, display_symbols = await self._algorithm_coin_data(
+                coin, algo_data
+            )
 
             result = MiningCalculator.calculate_profitability(
                 hash_rate=hashrate,
@@ -1566,7 +1330,7 @@ class Client:
     ):
         data = await state.get_data()
         manufacturer = data["manufacturer"]
-        model_line = data["model_line"]
+        model_line = await self.calculator_req.get_model_line_by_id(data["model_line_id"])
         models = await self.calculator_req.get_asic_models_by_model_line(model_line.id)
         await call.message.edit_text(
             f"🔧 Выберите модель {model_line.manufacturer.value} {model_line.name}:",
@@ -1963,9 +1727,8 @@ class Client:
                 message.from_user.username or message.from_user.first_name
             )
 
-            await self.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=(
+            await self.admin_notifier.enqueue(
+                (
                     f"📦 <b>Новая заявка на продажу</b>\n\n"
                     f"👤 От: @{escaped_username}\n"
                     f"ID: <code>{message.from_user.id}</code>\n\n"
@@ -1977,9 +1740,10 @@ class Client:
                     f"С вами скоро свяжется менеджер @snooby37."
                 ),
                 parse_mode="HTML",
+                admin_ids=[ADMIN_ID],
             )
         except Exception as e:
-            print(f"Ошибка при отправке заявки администратору (ID: {ADMIN_ID}): {e}")
+            print(f"Ошибка при сохранении заявки для администратора (ID: {ADMIN_ID}): {e}")
             await message.answer(
                 f"❌ Не удалось отправить заявку администратору. "
                 f"Пожалуйста, свяжитесь с менеджером напрямую: @snooby37"
@@ -1987,6 +1751,7 @@ class Client:
             await state.clear()
             return
 
+        self.stats.incr(SELL_REQUESTS)
         await message.answer(
             "✅ Спасибо! С вами скоро свяжется менеджер @snooby37.", parse_mode=None
         )
@@ -0,0 +1,72 @@
+"""
+Импорт каталога ASIC из прайсов производителей (bitmain.txt, whatsminer.txt,
+iPollo.txt, Goldshell.txt, Ice River.txt).
+
+Сравнивает прайсы с каталогом в БД и одной транзакцией добавляет новые
+модели, обновляет изменившиеся и снимает с продажи пропавшие из прайса.
+
+    python import_catalog.py            # применить
+    python import_catalog.py --dry-run  # только показать изменения
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from config import get_db_url
+from database.models import CreateDatabase
+from database.request import CalculatorReq
+from utils.catalog_importer import CatalogImporter, load_vendor_files
+
+
+async def import_catalog(directory: str, dry_run: bool, verbose: bool) -> None:
+    started = time.perf_counter()
+    rows, errors = load_vendor_files(directory)
+    parsed = time.perf_counter()
+    for error in errors:
+        print(f"Пропущено: {error}")
+
+    db_manager = CreateDatabase(database_url=get_db_url())
+    await db_manager.async_main()
+    importer = CatalogImporter(CalculatorReq(db_manager.async_session))
+    try:
+        diff = await importer.plan(rows)
+        planned = time.perf_counter()
+        if verbose:
+            for row in diff.inserts:
+                print(f"+ {row.line}: {row.name} ({row.hash_rate} {row.unit}, {row.power_consumption:g} W)")
+            for _, row, _ in diff.updates:
+                print(f"~ {row.line}: {row.name}")
+            for model in diff.deactivations:
+                print(f"- {model.name}")
+        print(f"Моделей в прайсах: {len(rows)}")
+        print(diff.summary())
+        if dry_run:
+            print("Пробный запуск (--dry-run): изменения не записаны")
+        else:
+            await importer.apply(diff)
+        finished = time.perf_counter()
+        print(
+            f"Время: разбор {(parsed - started) * 1000:.0f} мс, "
+            f"сравнение {(planned - parsed) * 1000:.0f} мс, "
+            f"запись {(finished - planned) * 1000:.0f} мс"
+        )
+    finally:
+        await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Импорт каталога ASIC из прайсов")
+    parser.add_argument(
+        "--dir",
+        default=os.path.dirname(os.path.abspath(__file__)),
+        help="папка с прайсами (по умолчанию - корень проекта)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="не записывать изменения")
+    parser.add_argument("-v", "--verbose", action="store_true", help="список изменений по моделям")
+    args = parser.parse_args()
+    asyncio.run(import_catalog(args.dir, args.dry_run, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
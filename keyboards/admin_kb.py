@@ -19,6 +19,7 @@ class AdminKB:
         builder.button(text="⚙️ ASIC", callback_data="manage_asic")
         builder.button(text="💰 Монеты", callback_data="manage_coins")
         builder.button(text="⚙️ Алгоритмы", callback_data="manage_algorithms")
+        builder.button(text="📊 Статистика", callback_data="admin_stats")
         builder.button(text="🔙 Главное меню", callback_data="back_main")
         builder.adjust(1)
         return builder.as_markup()
@@ -33,6 +34,7 @@ class AdminKB:
                 callback_data=f"view_line:{line.id}",
             )
         builder.button(text="➕ Добавить ASIC", callback_data="add_asic")
+        builder.button(text="📄 Загрузить каталог (CSV/JSON)", callback_data="catalog_upload")
         builder.button(text="🔙 Назад", callback_data="admin_menu")
         builder.adjust(1)
         return builder.as_markup()
@@ -51,6 +53,20 @@ class AdminKB:
         builder.adjust(1)
         return builder.as_markup()
 
+    @staticmethod
+    async def catalog_upload_back() -> InlineKeyboardMarkup:
+        builder = InlineKeyboardBuilder()
+        builder.button(text="🔙 Назад", callback_data="catalog_cancel")
+        return builder.as_markup()
+
+    @staticmethod
+    async def catalog_upload_confirm() -> InlineKeyboardMarkup:
+        builder = InlineKeyboardBuilder()
+        builder.button(text="✅ Применить", callback_data="catalog_apply")
+        builder.button(text="✖️ Отмена", callback_data="catalog_cancel")
+        builder.adjust(2)
+        return builder.as_markup()
+
     @staticmethod
     async def choose_manufacturer_add() -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
@@ -88,6 +104,25 @@ class AdminKB:
         builder.button(text="🔙 Назад", callback_data="admin_menu")
         return builder.as_markup()
 
+    @staticmethod
+    async def stats_menu() -> InlineKeyboardMarkup:
+        builder = InlineKeyboardBuilder()
+        builder.button(text="🔄 Обновить", callback_data="admin_stats")
+        builder.button(text="🔙 Назад", callback_data="admin_menu")
+        builder.adjust(2)
+        return builder.as_markup()
+
+    @staticmethod
+    async def broadcast_controls(broadcast_id: int, paused: bool) -> InlineKeyboardMarkup:
+        builder = InlineKeyboardBuilder()
+        if paused:
+            builder.button(text="▶️ Продолжить", callback_data=f"broadcast_resume:{broadcast_id}")
+        else:
+            builder.button(text="⏸ Пауза", callback_data=f"broadcast_pause:{broadcast_id}")
+        builder.button(text="✖️ Отменить", callback_data=f"broadcast_cancel:{broadcast_id}")
+        builder.adjust(2)
+        return builder.as_markup()
+
     # ---------- Algorithms ----------
     @staticmethod
     async def list_algorithms(algorithms: list[AlgorithmData]) -> InlineKeyboardMarkup:
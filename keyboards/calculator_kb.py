@@ -54,9 +54,7 @@ class CalculatorKB:
         paginated_lines = model_lines[start_idx:end_idx]
 
         for line in paginated_lines:
-            builder.button(
-                text=f"Модель {line.name}", callback_data=f"calc_line:{line.id}"
-            )
+            builder.button(text=line.label, callback_data=f"calc_line:{line.id}")
 
         if page > 0:
             builder.button(text="⬅️ Назад", callback_data=f"calc_lines_page:{page-1}")
@@ -79,7 +77,7 @@ class CalculatorKB:
         paginated_models = models[start_idx:end_idx]
 
         for model in paginated_models:
-            builder.button(text=model.name, callback_data=f"calc_model:{model.id}")
+            builder.button(text=model.label, callback_data=f"calc_model:{model.id}")
 
         if page > 0:
             builder.button(text="⬅️ Назад", callback_data=f"calc_models_page:{page-1}")
@@ -73,23 +73,9 @@ class ClientKB:
     @staticmethod
     async def chars_model_lines(model_lines: list) -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
-
-        # Создаем функцию для естественной сортировки
-        def natural_sort_key(text):
-            import re
-
-            return [
-                int(part) if part.isdigit() else part.lower()
-                for part in re.split(r"(\d+)", text.name)
-            ]
-
-        # Сортируем модели перед созданием кнопок
-        sorted_lines = sorted(model_lines, key=natural_sort_key)
-
-        for line in sorted_lines:
-            builder.button(
-                text=f"Модель {line.name}", callback_data=f"chars_line:{line.id}"
-            )
+        # Линейки приходят из индекса каталога уже отсортированными
+        for line in model_lines:
+            builder.button(text=line.label, callback_data=f"chars_line:{line.id}")
 
         builder.button(text="🔙 Назад", callback_data="calc_chars")
         builder.button(text="🔙 Главное меню", callback_data="back_main")
@@ -100,7 +86,7 @@ class ClientKB:
     async def chars_models(models: list) -> InlineKeyboardMarkup:
         builder = InlineKeyboardBuilder()
         for model in models:
-            builder.button(text=model.name, callback_data=f"chars_model:{model.id}")
+            builder.button(text=model.label, callback_data=f"chars_model:{model.id}")
         builder.button(text="🔙 Назад к линейкам", callback_data="back_chars_lines")
         builder.button(text="🔙 Главное меню", callback_data="back_main")
         builder.adjust(1)
@@ -0,0 +1,116 @@
+"""
+Нагрузочная проверка webhook-режима: POST синтетических апдейтов.
+
+Без --url поднимает WebhookServer локально с диспетчером, обработчик которого
+имитирует работу (--work мс), и печатает скорость приёма и обработки, задержку
+ответа (p50/p95/p99) и число отказов 503 (очередь заполнена).
+
+    python load_webhook.py --updates 5000 --concurrency 100
+    python load_webhook.py --url http://127.0.0.1:8080/webhook --secret $WEBHOOK_SECRET
+
+Против запущенного бота отправляйте текст, на который он не отвечает:
+чаты синтетические, и ответы бота в них Telegram отклонит.
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+
+from utils.webhook import SECRET_HEADER, WebhookServer
+
+LOCAL_PORT = 8099
+
+
+def _update(update_id: int, text: str) -> dict:
+    uid = 10_000_000 + update_id % 5000
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": {"id": uid, "is_bot": False, "first_name": "Load"},
+            "text": text,
+        },
+    }
+
+
+def _percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def _post_all(url: str, secret: str, updates: int, concurrency: int, text: str):
+    latencies: List[float] = []
+    statuses: dict = {}
+    next_id = iter(range(1, updates + 1))
+
+    async def client(session: aiohttp.ClientSession) -> None:
+        for update_id in next_id:
+            started = time.perf_counter()
+            async with session.post(
+                url, json=_update(update_id, text), headers={SECRET_HEADER: secret}
+            ) as response:
+                await response.read()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return latencies, statuses
+
+
+async def main(args: argparse.Namespace) -> None:
+    server: Optional[WebhookServer] = None
+    bot: Optional[Bot] = None
+    url, secret = args.url, args.secret
+    if url is None:
+        dp = Dispatcher()
+
+        @dp.message()
+        async def on_message(message):
+            await asyncio.sleep(args.work / 1000)
+
+        bot = Bot("42:LOAD")
+        secret = "load-test"
+        server = WebhookServer(
+            dp, bot, secret, queue_size=args.queue_size, workers=args.workers
+        )
+        await server.start("127.0.0.1", LOCAL_PORT)
+        url = f"http://127.0.0.1:{LOCAL_PORT}{server.path}"
+
+    started = time.perf_counter()
+    latencies, statuses = await _post_all(url, secret, args.updates, args.concurrency, args.text)
+    posted = time.perf_counter() - started
+    print(f"Отправлено {args.updates} апдейтов за {posted:.2f} с ({args.updates / posted:.0f}/с)")
+    print(f"Ответы: {dict(sorted(statuses.items()))}")
+    print(
+        f"Задержка ответа, мс: p50 {_percentile(latencies, 0.5):.1f}, "
+        f"p95 {_percentile(latencies, 0.95):.1f}, p99 {_percentile(latencies, 0.99):.1f}"
+    )
+
+    if server is not None:
+        await server.stop()
+        elapsed = time.perf_counter() - started
+        print(
+            f"Обработано {server.processed} апдейтов за {elapsed:.2f} с "
+            f"({server.processed / elapsed:.0f}/с), ошибок {server.failed}"
+        )
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="адрес webhook запущенного бота; без него - локальный сервер")
+    parser.add_argument("--secret", default="", help="WEBHOOK_SECRET запущенного бота")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--text", default="load test")
+    parser.add_argument("--work", type=float, default=5.0, help="мс работы обработчика (локально)")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -1,13 +1,31 @@
 import asyncio
+import signal
 from datetime import datetime, timedelta
 
 import pytz
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from config import (
+    BOT_MODE,
+    NETWORK_STATS_FIXTURE,
+    NETWORK_STATS_MINUTES,
+    NETWORK_STATS_SOURCES,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WEBHOOK_WORKERS,
+)
 from signature import Settings
 from utils.coin_service import CoinGeckoService
+from utils.fsm_storage import SqlStorage
 from utils.logger import setup_logger
+from utils.middlewares import DbConsistencyMiddleware, HandlerTagMiddleware
+from utils.network_stats import NetworkStatsRefresher, make_sources
+from utils.webhook import WebhookServer, make_secret
 
 
 class BotRunner:
@@ -15,14 +33,30 @@ class BotRunner:
         self.bot_instance = Settings()
         self.scheduler = AsyncIOScheduler()
         self.coin_service = CoinGeckoService(self.bot_instance)
+        self.network_stats = NetworkStatsRefresher(
+            self.bot_instance.calculator_req,
+            make_sources(NETWORK_STATS_SOURCES, NETWORK_STATS_FIXTURE),
+        )
 
     async def setup(self):
         await self.bot_instance.db_manager.async_main()
         await self.coin_service.initialize_coins()
+        await self.bot_instance.user_req.load_known_uids()
+        await self.bot_instance.stats.start()
+        await self.bot_instance.calculator_req.catalog.load()
+        await self.bot_instance.calculator_req.coin_params.load()
+        await self.bot_instance.conversations.start()
+        await self.bot_instance.outbox.start()
+        if isinstance(self.bot_instance.fsm_storage, SqlStorage):
+            await self.bot_instance.fsm_storage.start()
         from handlers.admin import Admin
         from handlers.client import Client
 
         await setup_logger(level="DEBUG")
+        dp = self.bot_instance.dp
+        dp.update.outer_middleware(DbConsistencyMiddleware())
+        for observer in (dp.message, dp.callback_query, dp.channel_post):
+            observer.middleware(HandlerTagMiddleware())
         user_client = Client(bot=self.bot_instance)
         admin_client = Admin(bot=self.bot_instance)
         await user_client.register_handlers()
@@ -39,6 +73,74 @@ class BotRunner:
             id="price_update_interval",
             max_instances=1,  # Только один экземпляр задачи может выполняться одновременно
         )
+        # Хешрейт и сложность сети для калькулятора
+        self.scheduler.add_job(
+            self.refresh_network_stats,
+            IntervalTrigger(minutes=NETWORK_STATS_MINUTES),
+            id="network_stats_interval",
+            max_instances=1,
+            next_run_time=datetime.now(),
+        )
+
+    async def refresh_network_stats(self):
+        try:
+            await self.network_stats.refresh()
+        except Exception as e:
+            print(f"Ошибка при обновлении данных сети: {e}")
+
+    async def start_polling(self):
+        # Останавливаем предыдущие webhook/polling соединения
+        try:
+            await self.bot_instance.bot.delete_webhook(drop_pending_updates=True)
+            print("Предыдущие соединения закрыты")
+        except Exception as e:
+            print(f"Предупреждение при закрытии предыдущих соединений: {e}")
+
+        await self.bot_instance.dp.start_polling(
+            self.bot_instance.bot,
+            drop_pending_updates=True
+        )
+
+    async def serve_webhook(self):
+        if not WEBHOOK_URL:
+            raise RuntimeError("BOT_MODE=webhook: не задан WEBHOOK_URL")
+        bot = self.bot_instance.bot
+        dp = self.bot_instance.dp
+        secret = WEBHOOK_SECRET or make_secret()
+        server = WebhookServer(
+            dp,
+            bot,
+            secret,
+            path=WEBHOOK_PATH,
+            queue_size=WEBHOOK_QUEUE_SIZE,
+            workers=WEBHOOK_WORKERS,
+        )
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                # Windows: остановка по KeyboardInterrupt
+                pass
+
+        workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+        await dp.emit_startup(bot=bot, **workflow_data)
+        await server.start(WEBHOOK_HOST, WEBHOOK_PORT)
+        try:
+            await bot.set_webhook(
+                f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+                secret_token=secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                drop_pending_updates=True,
+            )
+            print(f"Webhook установлен: {WEBHOOK_URL}{WEBHOOK_PATH}")
+            await stop.wait()
+        finally:
+            # Новые апдейты не принимаются, принятые дообрабатываются
+            await server.stop()
+            await dp.emit_shutdown(bot=bot, **workflow_data)
 
     async def run(self):
         await self.setup()
@@ -52,21 +154,26 @@ class BotRunner:
         except Exception as e:
             print(f"Ошибка при первоначальном обновлении цен: {e}")
         
-        # Останавливаем предыдущие webhook/polling соединения
-        try:
-            await self.bot_instance.bot.delete_webhook(drop_pending_updates=True)
-            print("Предыдущие соединения закрыты")
-        except Exception as e:
-            print(f"Предупреждение при закрытии предыдущих соединений: {e}")
-        
+        # Рассылка, прерванная остановкой бота, продолжается с контрольной точки
+        await self.bot_instance.broadcasts.resume_unfinished()
+
         try:
-            await self.bot_instance.dp.start_polling(
-                self.bot_instance.bot,
-                drop_pending_updates=True
-            )
+            if BOT_MODE == "webhook":
+                await self.serve_webhook()
+            else:
+                await self.start_polling()
         finally:
+            await self.bot_instance.broadcasts.stop()
+            await self.bot_instance.price_notifier.stop()
+            await self.bot_instance.admin_notifier.stop()
+            await self.bot_instance.outbox.stop()
+            # Dispatcher закрывает хранилище при остановке; повторный close безопасен
+            await self.bot_instance.fsm_storage.close()
+            await self.bot_instance.conversations.stop()
+            await self.bot_instance.stats.stop()
             await self.bot_instance.bot.session.close()
             self.scheduler.shutdown()
+            await self.bot_instance.db_manager.dispose()
 
 
 if __name__ == "__main__":
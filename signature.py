@@ -6,15 +6,47 @@ from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import get_db_url
+from config import (
+    ADMIN_IDS,
+    ADMIN_NOTIFY_CONCURRENCY,
+    AI_CHAT_CACHE_SIZE,
+    AI_CHAT_POOL_SIZE,
+    BOT_SEND_RATE,
+    BROADCAST_PROGRESS_SECONDS,
+    BROADCAST_WORKERS,
+    DATABASE_REPLICA_URL,
+    DB_READ_YOUR_WRITES_SECONDS,
+    FSM_FLUSH_SECONDS,
+    FSM_STORAGE,
+    FSM_TTL_HOURS,
+    OUTBOX_MAX_ATTEMPTS,
+    PRICE_NOTIFICATION_WORKERS,
+    PRICE_NOTIFICATIONS_ENABLED,
+    STATS_FLUSH_SECONDS,
+    get_db_url,
+)
 from database.models import CreateDatabase
 from database.request import (
+    AiConversationReq,
+    BroadcastReq,
     CalculatorReq,
     CoinReq,
+    FsmReq,
+    MediaReq,
+    OutboxReq,
     SellRequestReq,
+    StatsReq,
     UsedDeviceGuideReq,
     UserReq,
 )
+from utils.admin_notifier import AdminNotifier
+from utils.broadcast import BroadcastEngine, RateLimiter
+from utils.conversation_manager import ConversationManager
+from utils.fsm_storage import SqlStorage
+from utils.media_registry import MediaRegistry
+from utils.outbox import Outbox
+from utils.price_notifier import PriceNotifier
+from utils.stats import StatsCounter
 
 
 def _make_bot_session():
@@ -34,10 +66,59 @@ class Settings:
             session=session,
             default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
         )
-        self.dp = Dispatcher(storage=MemoryStorage())
-        self.db_manager = CreateDatabase(database_url=get_db_url())
+        self.db_manager = CreateDatabase(
+            database_url=get_db_url(),
+            replica_url=DATABASE_REPLICA_URL,
+            sticky_seconds=DB_READ_YOUR_WRITES_SECONDS,
+        )
+        if FSM_STORAGE == "memory":
+            self.fsm_storage = MemoryStorage()
+        else:
+            self.fsm_storage = SqlStorage(
+                FsmReq(self.db_manager.async_session),
+                ttl=FSM_TTL_HOURS * 3600,
+                flush_interval=FSM_FLUSH_SECONDS,
+            )
+        self.dp = Dispatcher(storage=self.fsm_storage)
         self.user_req = UserReq(self.db_manager.async_session)
         self.calculator_req = CalculatorReq(self.db_manager.async_session)
         self.coin_req = CoinReq(self.db_manager.async_session)
         self.sell_req = SellRequestReq(self.db_manager.async_session)
         self.guide_req = UsedDeviceGuideReq(self.db_manager.async_session)
+        self.stats_req = StatsReq(self.db_manager.async_session)
+        self.stats = StatsCounter(self.stats_req, flush_interval=STATS_FLUSH_SECONDS)
+        self.ai_conversation_req = AiConversationReq(self.db_manager.async_session)
+        self.conversations = ConversationManager(
+            self.ai_conversation_req,
+            cache_size=AI_CHAT_CACHE_SIZE,
+            pool_size=AI_CHAT_POOL_SIZE,
+        )
+        self.media_req = MediaReq(self.db_manager.async_session)
+        self.media = MediaRegistry(self.bot, self.media_req)
+        self.broadcast_req = BroadcastReq(self.db_manager.async_session)
+        # Один темп на бота: рассылка и курсы, идущие одновременно, делят лимит
+        # Telegram и вместе ждут retry_after
+        self.send_limiter = RateLimiter(BOT_SEND_RATE)
+        self.broadcasts = BroadcastEngine(
+            self.bot,
+            self.user_req,
+            self.broadcast_req,
+            workers=BROADCAST_WORKERS,
+            progress_interval=BROADCAST_PROGRESS_SECONDS,
+            limiter=self.send_limiter,
+        )
+        self.outbox_req = OutboxReq(self.db_manager.async_session)
+        self.outbox = Outbox(self.bot, self.outbox_req, max_attempts=OUTBOX_MAX_ATTEMPTS)
+        self.admin_notifier = AdminNotifier(
+            self.bot,
+            ADMIN_IDS,
+            outbox=self.outbox,
+            concurrency=ADMIN_NOTIFY_CONCURRENCY,
+        )
+        self.price_notifier = PriceNotifier(
+            self.bot,
+            self.user_req,
+            enabled=PRICE_NOTIFICATIONS_ENABLED,
+            workers=PRICE_NOTIFICATION_WORKERS,
+            limiter=self.send_limiter,
+        )
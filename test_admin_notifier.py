@@ -0,0 +1,97 @@
+"""
+Тест уведомлений администраторам: параллельная отправка с ограничением,
+фоновая задача, сбой одного администратора и заявки через Outbox
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from database.models import CreateDatabase, OutboxMessage
+from database.request import OutboxReq
+from utils.admin_notifier import AdminNotifier
+from utils.outbox import Outbox
+
+ADMINS = list(range(100, 110))
+
+
+class FakeBot:
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call(self, admin_id, method):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if admin_id == 103:
+                raise ConnectionError("network")
+            self.calls.append((admin_id, method))
+        finally:
+            self.in_flight -= 1
+
+
+def test_admin_fan_out():
+    async def run():
+        bot = FakeBot(delay=0.05)
+        notifier = AdminNotifier(bot, ADMINS, concurrency=4)
+
+        async def send(admin_id):
+            await bot.call(admin_id, "forward")
+            await bot.call(admin_id, "send")
+
+        started = time.monotonic()
+        task = notifier.spawn(send)
+        # Обработчик не ждёт рассылку
+        assert time.monotonic() - started < 0.01 and not task.done()
+        await notifier.stop()
+        elapsed = time.monotonic() - started
+
+        results = task.result()
+        assert [uid for uid, ok in results.items() if not ok] == [103]
+        assert bot.max_in_flight == 4
+        # 10 администраторов по 2 запроса, 4 параллельно: ~3 волны вместо 20 запросов подряд
+        assert elapsed < 20 * 0.05 / 2
+        for admin_id in ADMINS:
+            if admin_id != 103:
+                calls = [method for uid, method in bot.calls if uid == admin_id]
+                assert calls == ["forward", "send"]
+
+    asyncio.run(run())
+
+
+def test_admin_enqueue():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'admins.db')}"
+            )
+            await db_manager.async_main()
+            outbox = Outbox(None, OutboxReq(db_manager.async_session))
+            notifier = AdminNotifier(None, [1, 2, 3], outbox=outbox)
+
+            await notifier.enqueue("всем")
+            await notifier.enqueue("менеджеру", admin_ids=[7])
+            async with db_manager.async_session() as session:
+                rows = (
+                    await session.execute(
+                        select(OutboxMessage.chat_id, OutboxMessage.message_text).order_by(
+                            OutboxMessage.id
+                        )
+                    )
+                ).all()
+            assert rows == [(1, "всем"), (2, "всем"), (3, "всем"), (7, "менеджеру")]
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_admin_fan_out()
+    test_admin_enqueue()
+    print("[OK] Тест уведомлений администраторам пройден")
@@ -0,0 +1,323 @@
+"""
+Тест фоновой рассылки: темп отправки, пауза по retry_after, повтор временных
+ошибок, итог в сообщении со статусом, продолжение после перезапуска и
+пауза/отмена
+"""
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+from aiogram.methods import SendMessage
+from sqlalchemy import select
+
+from database.models import BroadcastDelivery, CreateDatabase
+from database.request import BroadcastReq, UserReq
+from utils.broadcast import BroadcastEngine, RateLimiter, classify_delivery_error
+
+USERS = 60
+RATE = 100.0
+
+
+class FakeBot:
+    def __init__(self, hang=()) -> None:
+        # Отправка этим uid не завершается (бот остановят во время отправки)
+        self.hang = set(hang)
+        self.sent = []
+        self.sent_at = []
+        self.edits = []
+        self.failures = {
+            1003: [TelegramRetryAfter(SendMessage(chat_id=1003, text=""), "Flood", 1)],
+            1004: [TelegramNetworkError(SendMessage(chat_id=1004, text=""), "timeout")],
+            1005: [TelegramForbiddenError(
+                SendMessage(chat_id=1005, text=""), "Forbidden: bot was blocked by the user"
+            )],
+        }
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == 1:
+            return SimpleNamespace(message_id=42)
+        return self._deliver(chat_id, text)
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        if chat_id in self.hang:
+            await asyncio.Event().wait()
+        return self._deliver(chat_id, (photo, caption))
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.edits.append((chat_id, message_id, text, kwargs.get("reply_markup")))
+
+    def _deliver(self, chat_id, payload):
+        failures = self.failures.get(chat_id)
+        if failures:
+            raise failures.pop(0)
+        self.sent.append((chat_id, payload))
+        self.sent_at.append(time.monotonic())
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+def test_rate_limiter_pause():
+    async def run():
+        limiter = RateLimiter(rate=1000, per_chat_interval=0.2)
+        started = time.monotonic()
+        await limiter.acquire(1)
+        await limiter.acquire(1)  # второй раз в тот же чат - не раньше per_chat_interval
+        assert time.monotonic() - started >= 0.19
+
+        limiter.pause(0.3)
+        started = time.monotonic()
+        await limiter.acquire(2)
+        assert time.monotonic() - started >= 0.29
+
+    asyncio.run(run())
+
+
+def test_classify_delivery_error():
+    method = SendMessage(chat_id=1, text="")
+    assert classify_delivery_error(
+        TelegramForbiddenError(method, "Forbidden: bot was blocked by the user")
+    ) == "blocked"
+    assert classify_delivery_error(
+        TelegramForbiddenError(method, "Forbidden: user is deactivated")
+    ) == "inactive"
+    assert classify_delivery_error(
+        TelegramBadRequest(method, "Bad Request: chat not found")
+    ) == "not_found"
+    assert classify_delivery_error(
+        TelegramBadRequest(method, "Bad Request: message is too long")
+    ) == "failed"
+
+
+async def _make_db(tmp):
+    db_manager = CreateDatabase(
+        database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'broadcast.db')}"
+    )
+    await db_manager.async_main()
+    user_req = UserReq(db_manager.async_session)
+    for i in range(USERS):
+        await user_req.add_user(1000 + i, f"user{i}")
+    return db_manager, user_req, BroadcastReq(db_manager.async_session)
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def test_broadcast_engine():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req, broadcast_req = await _make_db(tmp)
+
+            bot = FakeBot()
+            engine = BroadcastEngine(
+                bot, user_req, broadcast_req, rate=RATE, workers=8,
+                progress_interval=0.2, claim_size=16,
+            )
+            started = time.monotonic()
+            job = await engine.start(1, "Новости", photo="file-id")
+            assert job is not None and job.total == USERS
+            # Пока идёт рассылка, вторую не запустить
+            assert await engine.start(1, "Ещё") is None
+
+            await job.task
+            elapsed = time.monotonic() - started
+
+            delivered = [chat_id for chat_id, _ in bot.sent]
+            assert sorted(delivered) == [1000 + i for i in range(USERS) if i != 5]
+            assert bot.sent[0][1] == ("file-id", "Новости")
+            assert (job.sent, job.failed, job.retries) == (USERS - 1, 1, 2)
+
+            # Темп не выше RATE, после retry_after все ждали секунду
+            assert elapsed >= (USERS - 1) / RATE
+            assert elapsed >= 1.0
+            window = [t for t in bot.sent_at if t - bot.sent_at[0] < 0.5]
+            assert len(window) <= RATE * 0.5 + 1
+
+            chat_id, message_id, text, markup = bot.edits[-1]
+            assert (chat_id, message_id) == (1, 42)
+            assert markup.inline_keyboard[0][0].callback_data == "broadcast_start"
+            assert "Рассылка завершена" in text and f"Успешно: {USERS - 1}" in text
+            assert "удалили аккаунт: 1" in text
+            assert engine.active is None
+
+            row = await broadcast_req.get_broadcast(job.id)
+            assert (row.status, row.sent, row.failed, row.last_uid) == (
+                "done", USERS - 1, 1, 1000 + USERS - 1
+            )
+            assert row.finished_at is not None
+
+            # Заблокировавший бота исключён из следующих рассылок
+            assert job.unreachable == 1
+            assert await user_req.count_uids() == USERS - 1
+            assert 1005 not in [uid async for uid in user_req.iter_uids()]
+            async with db_manager.async_session() as session:
+                status = (
+                    await session.execute(
+                        select(BroadcastDelivery.status).where(BroadcastDelivery.uid == 1005)
+                    )
+                ).scalar()
+            assert status == "blocked"
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_broadcast_resume_after_restart():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req, broadcast_req = await _make_db(tmp)
+
+            # Первый процесс: останавливается, пока отправка 1010 ещё идёт
+            bot = FakeBot(hang={1010})
+            del bot.failures[1003], bot.failures[1004]
+            engine = BroadcastEngine(
+                bot, user_req, broadcast_req, rate=RATE, workers=4, claim_size=16
+            )
+            job = await engine.start(1, "Новости", photo="file-id")
+            await _wait_for(lambda: len(bot.sent) >= 20)
+            await engine.stop()
+            first = {chat_id for chat_id, _ in bot.sent}
+            assert len(first) < USERS - 2
+
+            # Второй процесс: продолжает с контрольной точки
+            bot2 = FakeBot()
+            bot2.failures = {}
+            engine2 = BroadcastEngine(
+                bot2, user_req, broadcast_req, rate=RATE, workers=4, claim_size=16
+            )
+            await engine2.resume_unfinished()
+            resumed = engine2.active
+            assert resumed is not None and resumed.id == job.id
+            await resumed.task
+
+            second = [chat_id for chat_id, _ in bot2.sent]
+            # Никто не получил сообщение дважды; 1010 без итога, 1005 заблокировал бота
+            assert not first & set(second) and len(second) == len(set(second))
+            assert first | set(second) == {
+                1000 + i for i in range(USERS) if i not in (5, 10)
+            }
+            row = await broadcast_req.get_broadcast(job.id)
+            assert (row.status, row.sent, row.failed, row.unknown) == (
+                "done", USERS - 2, 1, 1
+            )
+            async with db_manager.async_session() as session:
+                statuses = (
+                    await session.execute(
+                        select(BroadcastDelivery.status).where(
+                            BroadcastDelivery.uid == 1010
+                        )
+                    )
+                ).scalar()
+            assert statuses == "unknown"
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+class FlakyBroadcastReq(BroadcastReq):
+    """Один раз падает на n-м вызове метода (например, БД недоступна)"""
+
+    def __init__(self, session_maker, method: str, n: int) -> None:
+        super().__init__(session_maker)
+        self.calls = 0
+        original = getattr(self, method)
+
+        async def flaky(*args, **kwargs):
+            self.calls += 1
+            if self.calls == n:
+                raise ConnectionError("database is unavailable")
+            return await original(*args, **kwargs)
+
+        setattr(self, method, flaky)
+
+
+def test_broadcast_error_pause_then_resume():
+    async def run():
+        for method in ("claim_recipients", "save_outcomes"):
+            with tempfile.TemporaryDirectory() as tmp:
+                db_manager, user_req, _ = await _make_db(tmp)
+                broadcast_req = FlakyBroadcastReq(db_manager.async_session, method, 3)
+                bot = FakeBot()
+                bot.failures = {}
+                engine = BroadcastEngine(
+                    bot, user_req, broadcast_req, rate=RATE, workers=4, claim_size=8
+                )
+
+                # Ошибка посреди рассылки ставит её на паузу
+                job = await engine.start(1, "Новости")
+                await job.task
+                assert (await broadcast_req.get_broadcast(job.id)).status == "paused"
+                assert len(bot.sent) < USERS
+                async with db_manager.async_session() as session:
+                    pending = (
+                        await session.execute(
+                            select(BroadcastDelivery.uid).where(
+                                BroadcastDelivery.status == "pending"
+                            )
+                        )
+                    ).scalars().all()
+                assert pending == []
+
+                # Администратор продолжает: каждый получает сообщение ровно один раз
+                assert await engine.resume(job.id)
+                await engine.active.task
+                delivered = [chat_id for chat_id, _ in bot.sent]
+                assert sorted(delivered) == [1000 + i for i in range(USERS)], method
+                row = await broadcast_req.get_broadcast(job.id)
+                assert (row.status, row.sent, row.failed) == ("done", USERS, 0)
+
+                await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_broadcast_pause_resume_cancel():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req, broadcast_req = await _make_db(tmp)
+            bot = FakeBot()
+            bot.failures = {}
+            engine = BroadcastEngine(
+                bot, user_req, broadcast_req, rate=RATE, workers=4, claim_size=8
+            )
+
+            job = await engine.start(1, "Новости")
+            await _wait_for(lambda: len(bot.sent) >= 10)
+            assert await engine.pause(job.id)
+            await job.task
+            paused_at = len(bot.sent)
+            assert paused_at < USERS and engine.active is None
+            assert (await broadcast_req.get_broadcast(job.id)).status == "paused"
+            assert bot.edits[-1][3].inline_keyboard[0][0].callback_data == (
+                f"broadcast_resume:{job.id}"
+            )
+
+            assert await engine.resume(job.id)
+            assert not await engine.resume(job.id)
+            await _wait_for(lambda: len(bot.sent) >= paused_at + 10)
+            resumed = engine.active
+            assert await engine.cancel(job.id)
+            await resumed.task
+            cancelled_at = len(bot.sent)
+            assert cancelled_at < USERS
+
+            row = await broadcast_req.get_broadcast(job.id)
+            assert row.status == "cancelled" and row.sent == cancelled_at
+            assert len({chat_id for chat_id, _ in bot.sent}) == cancelled_at
+            assert not await engine.resume(job.id)
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
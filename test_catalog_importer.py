@@ -0,0 +1,189 @@
+"""
+Тест импорта каталога из прайсов: разбор строк, повторный импорт без изменений,
+обновление и снятие с продажи одной транзакцией
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from database.models import Algorithm, CreateDatabase, Manufacturer
+from database.request import CalculatorReq
+from utils.catalog_importer import (
+    VENDOR_FILES,
+    CatalogImportError,
+    CatalogImporter,
+    load_vendor_files,
+    parse_catalog_document,
+    parse_vendor_line,
+)
+
+VENDORS = {vendor.manufacturer: vendor for vendor in VENDOR_FILES}
+
+
+def test_parse_vendor_line():
+    bitmain = VENDORS[Manufacturer.BITMAIN]
+    row = parse_vendor_line("Bitmain Antminer S19 PRO 110TH/s 3250W\n", bitmain)
+    assert (row.line, row.name, row.hash_rate, row.unit, row.power_consumption) == (
+        "S19", "Bitmain Antminer S19 PRO 110TH/s", 110, "TH/s", 3250
+    )
+    row = parse_vendor_line("Bitmain Antminer L9 17,6 GH/s 3260W", bitmain)
+    assert (row.line, row.algorithm, row.hash_rate, row.get_coin) == (
+        "L9", Algorithm.SCRYPT, 17.6, "LTC, DOGE"
+    )
+    # Хешрейта в прайсе нет - паспортное значение
+    row = parse_vendor_line("Bitmain Antminer KAS Miner KS5 Pro 3150W", bitmain)
+    assert (row.line, row.hash_rate) == ("KAS", 21)
+
+    # Кириллическая "М" в названии
+    row = parse_vendor_line("Whatsminer М61 200 TH/s   3980W", VENDORS[Manufacturer.WHATSMINER])
+    assert (row.line, row.name) == ("M61", "Whatsminer M61 200 TH/s")
+
+    # kHeavyHash хранится в TH/s, бренд дописывается
+    row = parse_vendor_line("KS0 ultra 400 GH/s  100W", VENDORS[Manufacturer.ICERIVER])
+    assert (row.name, row.hash_rate, row.unit) == ("IceRiver KS0 ultra", 0.4, "TH/s")
+
+    goldshell = VENDORS[Manufacturer.GOLDSHELL]
+    row = parse_vendor_line("Goldshell AL BOX 360G  360 GH/s  180W", goldshell)
+    assert (row.name, row.hash_rate, row.get_coin) == ("Goldshell AL BOX 360G", 360, "KLS")
+    row = parse_vendor_line("Goldshell KA BOX 1.18TH 400W", goldshell)
+    assert (row.name, row.hash_rate, row.get_coin) == ("Goldshell KA BOX 1.18TH", 1.18, "KDA")
+
+    row = parse_vendor_line("iPollo V1H 850mh   690W", VENDORS[Manufacturer.IPOLLO])
+    assert (row.name, row.hash_rate, row.unit) == ("iPollo V1H 850mh", 850, "MH/s")
+
+    for bad in ("Bitmain Antminer S19 82 TH/s", "Bitmain Antminer X1 3000W"):
+        try:
+            parse_vendor_line(bad, bitmain)
+        except CatalogImportError:
+            continue
+        raise AssertionError(f"строка разобрана: {bad}")
+
+
+def test_parse_catalog_document():
+    csv_document = (
+        "\ufeffmanufacturer;line;algorithm;name;hash_rate;power;coins\n"
+        "Bitmain;S21;SHA-256;Bitmain Antminer S21 200 TH/s;200;3500;btc, bch\n"
+        "\n"
+        "WHATSMINER;M60;SHA256;Whatsminer М60 172 TH/s;172;3422;BTC\n"
+        "Bitmain;S21;SHA-256;Bitmain Antminer S21 Pro;abc;3500;BTC\n"
+        "Canaan;A14;SHA-256;Avalon A1466;150;3230;BTC\n"
+        "Bitmain;L9;Scrypt;Bitmain Antminer L9 16 GH/s;16;3360;\n"
+    ).encode("utf-8")
+    rows, errors = parse_catalog_document(csv_document, "catalog.csv")
+    assert [(row.manufacturer, row.line, row.name, row.get_coin) for row in rows] == [
+        (Manufacturer.BITMAIN, "S21", "Bitmain Antminer S21 200 TH/s", "BTC, BCH"),
+        (Manufacturer.WHATSMINER, "M60", "Whatsminer M60 172 TH/s", "BTC"),
+    ]
+    assert [error.split(":")[0] for error in errors] == ["строка 5", "строка 6", "строка 7"]
+
+    json_document = json.dumps({"models": [
+        {"manufacturer": "Ice River", "line": "Ice River", "algorithm": "kHeavyHash",
+         "name": "IceRiver KS0 ultra", "hash_rate": 0.4, "power": 100, "coins": "KASPA"},
+    ]}).encode("utf-8")
+    rows, errors = parse_catalog_document(json_document, "catalog.json")
+    assert not errors and rows[0].hash_rate == 0.4 and rows[0].algorithm == Algorithm.KHEAVYHASH
+
+    # unit переводит хешрейт в единицы калькулятора для алгоритма
+    csv_document = (
+        "manufacturer,line,algorithm,name,hash_rate,power,coins,unit\n"
+        "Bitmain,KAS,kHeavyHash,Bitmain Antminer KS3,200,3500,KASPA,GH/s\n"
+        "Bitmain,L9,Scrypt,Bitmain Antminer L9,16000,3360,LTC,mh\n"
+        "Bitmain,S21,SHA-256,Bitmain Antminer S21,200,3500,BTC,\n"
+        "Bitmain,S21,SHA-256,Bitmain Antminer S21+,220,3500,BTC,W\n"
+    ).encode("utf-8")
+    rows, errors = parse_catalog_document(csv_document, "catalog.csv")
+    assert [(row.hash_rate, row.unit) for row in rows] == [
+        (0.2, "TH/s"), (16.0, "GH/s"), (200.0, "TH/s"),
+    ]
+    assert len(errors) == 1 and errors[0].startswith("строка 5: unit")
+
+    for content, filename in ((b"name;line\n", "a.csv"), (b"{}", "a.json"), (b"", "a.xlsx")):
+        try:
+            parse_catalog_document(content, filename)
+        except CatalogImportError:
+            continue
+        raise AssertionError(f"документ разобран: {filename}")
+
+
+def test_import_catalog():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'import.db')}"
+            )
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+            importer = CatalogImporter(calc_req)
+
+            rows, errors = load_vendor_files(os.path.dirname(os.path.abspath(__file__)))
+            assert not errors and len(rows) > 100
+
+            # Пробный запуск ничего не пишет
+            diff = await importer.import_rows(rows, dry_run=True)
+            assert len(diff.inserts) == len(rows) and not await calc_req.get_all_asic_models()
+
+            await importer.import_rows(rows)
+            models = await calc_req.get_all_asic_models()
+            assert len(models) == len(rows)
+            s19 = next(m for m in models if m.name == "Bitmain Antminer S19 82 TH/s")
+            assert s19.coins[:2] == ("BTC", "BCH")
+            lines = await calc_req.get_model_lines_by_manufacturer(Manufacturer.BITMAIN)
+            assert [line.name for line in lines][:3] == ["E9", "KA3", "KAS"]
+
+            # Повторный импорт - без изменений
+            diff = await importer.import_rows(rows)
+            assert diff.is_empty and diff.unchanged == len(rows)
+
+            # Модель пропала из прайса, у другой поменялись данные
+            changed = [
+                row._replace(power_consumption=3300, get_coin="BTC")
+                if row.name == s19.name else row
+                for row in rows
+                if row.name != "Bitmain Antminer S19 86 TH/s"
+            ]
+            diff = await importer.import_rows(changed)
+            assert [m.name for m in diff.deactivations] == ["Bitmain Antminer S19 86 TH/s"]
+            assert [row.name for _, row, _ in diff.updates] == [s19.name]
+
+            model = await calc_req.get_asic_model_by_id(s19.id)
+            assert model.power_consumption == 3300 and model.coins == ("BTC",)
+            assert await calc_req.get_model_coins(s19.id) == ["BTC"]
+            assert len(await calc_req.get_all_asic_models()) == len(rows) - 1
+
+            # Вернувшаяся в прайс модель снова активна
+            diff = await importer.import_rows(rows)
+            assert len(diff.updates) == 2 and not diff.inserts
+            assert len(await calc_req.get_all_asic_models()) == len(rows)
+
+            # Документ администратора: 500 строк - обновление и новые модели,
+            # модели не из документа остаются в продаже
+            lines = ["manufacturer,line,algorithm,name,hash_rate,power,coins"]
+            lines += [
+                f'Bitmain,S19,SHA-256,"{row.name}",{row.hash_rate},{row.power_consumption + 10},"{row.get_coin}"'
+                for row in rows if row.line == "S19"
+            ]
+            lines += [
+                f"Bitmain,S23,SHA-256,Bitmain Antminer S23 {i} TH/s,{i},3500,BTC"
+                for i in range(1, 500 - len(lines) + 2)
+            ]
+            document_rows, errors = parse_catalog_document(
+                "\n".join(lines).encode("utf-8"), "bulk.csv"
+            )
+            assert not errors and len(document_rows) == 500
+            started = time.monotonic()
+            diff = await importer.import_rows(document_rows, deactivate_missing=False)
+            assert time.monotonic() - started < 5
+            s19_count = sum(1 for row in rows if row.line == "S19")
+            assert (len(diff.updates), len(diff.inserts), diff.deactivations) == (
+                s19_count, 500 - s19_count, []
+            )
+            assert diff.new_lines == [(Manufacturer.BITMAIN, "S23", Algorithm.SHA256)]
+            assert len(await calc_req.get_all_asic_models()) == len(rows) + 500 - s19_count
+            model = await calc_req.get_asic_model_by_id(s19.id)
+            assert model.power_consumption == s19.power_consumption + 10
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
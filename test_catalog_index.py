@@ -0,0 +1,99 @@
+"""
+Тест индекса каталога ASIC: естественная сортировка, фильтр активных моделей, сброс после правок
+"""
+import asyncio
+import os
+import tempfile
+
+from database.models import Algorithm, AsicModel, CreateDatabase, Manufacturer
+from database.request import CalculatorReq
+from fill_asic_models import add_models
+
+
+def test_catalog_index():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'catalog.db')}"
+            )
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+
+            line_ids = {}
+            for name in ("S21", "S9", "S19"):
+                line_ids[name] = await calc_req.add_model_line(
+                    name, Manufacturer.BITMAIN, Algorithm.SHA256
+                )
+                await calc_req.add_asic_model(f"{name} B", line_ids[name], 100, 3000, "BTC")
+                await calc_req.add_asic_model(f"{name} A", line_ids[name], 90, 3000, "BTC")
+
+            # Линейка только с неактивными моделями в меню не попадает
+            hidden = await calc_req.add_model_line("T1", Manufacturer.BITMAIN, Algorithm.SHA256)
+            async with db_manager.async_session() as session:
+                session.add(
+                    AsicModel(name="T1", model_line_id=hidden, hash_rate=1,
+                              power_consumption=1, is_active=False)
+                )
+                await session.commit()
+
+            await calc_req.catalog.load()
+            lines = await calc_req.get_model_lines_by_manufacturer(Manufacturer.BITMAIN)
+            assert [line.name for line in lines] == ["S9", "S19", "S21"]
+            assert lines[0].label == "Модель S9"
+
+            models = await calc_req.get_asic_models_by_model_line(line_ids["S19"])
+            assert [m.name for m in models] == ["S19 A", "S19 B"]
+            model = await calc_req.get_asic_model_by_id(models[0].id)
+            assert model.hash_rate == 90 and model.model_line_id == line_ids["S19"]
+
+            # Правка через репозиторий сбрасывает индекс
+            await calc_req.add_asic_model("S19 C", line_ids["S19"], 110, 3000, "BTC")
+            models = await calc_req.get_asic_models_by_model_line(line_ids["S19"])
+            assert [m.name for m in models] == ["S19 A", "S19 B", "S19 C"]
+
+            await calc_req.delete_asic_model(models[0].id)
+            models = await calc_req.get_asic_models_by_model_line(line_ids["S19"])
+            assert [m.name for m in models] == ["S19 B", "S19 C"]
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_model_coins():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "coins.db")
+            db_manager = CreateDatabase(database_url=f"sqlite+aiosqlite:///{db_path}")
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+
+            line_id = await calc_req.add_model_line("L7", Manufacturer.BITMAIN, Algorithm.SCRYPT)
+            l7 = await calc_req.add_asic_model("L7", line_id, 9.5, 3400, "ltc, DOGE,  bel,ltc")
+            assert await calc_req.get_model_coins(l7) == ["LTC", "DOGE", "BEL"]
+
+            # Модель, добавленная в обход репозитория (fill_asic_models.py),
+            # тоже получает связи с монетами
+            async with db_manager.async_session() as session:
+                await add_models(session, line_id, [("L9", 16, 3360, "DOGE, LTC")])
+                await session.commit()
+            calc_req.catalog.invalidate()
+
+            models = await calc_req.get_models_by_coin("doge")
+            assert [m.name for m in models] == ["L7", "L9"]
+            assert models[1].coins == ("DOGE", "LTC")
+            assert (await calc_req.get_asic_model_by_id(l7)).coins == ("LTC", "DOGE", "BEL")
+
+            await calc_req.delete_asic_model(l7)
+            assert await calc_req.get_model_coins(l7) == []
+            assert [m.name for m in await calc_req.get_models_by_coin("BEL")] == []
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_catalog_index()
+    test_model_coins()
+    print("[OK] Тест индекса каталога пройден")
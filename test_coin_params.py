@@ -0,0 +1,98 @@
+"""
+Тест параметров сети по монетам: DOGE со своей сетью и временем блока,
+монеты совместного майнинга, обновление BCH отдельно от BTC и сброс индекса
+"""
+import asyncio
+import os
+import tempfile
+
+from database.models import Algorithm, CreateDatabase, Manufacturer
+from database.read_models import AsicModelRow, ModelLineRow
+from database.request import CalculatorReq, CoinReq
+from handlers.client import Client
+from utils.calculator import MiningCalculator
+from utils.network_stats import FixtureSource, NetworkStatsRefresher
+
+
+def _client(calc_req, coin_req) -> Client:
+    client = Client.__new__(Client)
+    client.calculator_req = calc_req
+    client.coin_req = coin_req
+    return client
+
+
+def test_coin_params():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'params.db')}"
+            )
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+            coin_req = CoinReq(db_manager.async_session)
+            await calc_req.coin_params.load()
+
+            doge = await calc_req.get_coin_params("doge")
+            assert (doge.block_time, doge.block_reward, doge.merged_parent) == (60, 10000, "LTC")
+            assert await calc_req.get_merged_coins(["LTC"]) == ["DOGE"]
+            assert await calc_req.get_merged_coins(["LTC", "DOGE"]) == []
+            assert await calc_req.get_merged_coins(["BTC"]) == []
+
+            # Ручной расчёт по Scrypt: DOGE со своей сетью и блоком в 60 секунд
+            client = _client(calc_req, coin_req)
+            ltc_algo = await calc_req.get_algorithm_data(Algorithm.SCRYPT)
+            ltc = await coin_req.get_coin_by_symbol("LTC")
+            coin_data, symbols = await client._algorithm_coin_data(ltc, ltc_algo)
+            assert symbols == ["LTC", "DOGE"]
+            assert coin_data["DOGE"]["network_hashrate"] == 2_958_883
+            assert coin_data["DOGE"]["block_time"] == 60
+            assert coin_data["LTC"]["network_hashrate"] == ltc_algo.network_hashrate
+            assert coin_data["LTC"]["block_time"] == 150
+
+            result = MiningCalculator.calculate_profitability(
+                hash_rate=100,
+                power_consumption=3000,
+                electricity_price_rub=0,
+                coin_data={s: {**v, "price": 1.0} for s, v in coin_data.items()},
+                usd_to_rub=80.0,
+                algorithm="scrypt",
+                pool_fee=0,
+            )
+            coins = result["periods"]["day"]["coins_per_coin"]
+            assert abs(coins["DOGE"] - 100 / 2_958_883 * 1440 * 10000) < 1e-6
+
+            # Правило L7 -> LTC оставляет DOGE, который добывается вместе с LTC
+            line = ModelLineRow(1, "L7", Manufacturer.BITMAIN, Algorithm.SCRYPT, "Модель L7")
+            model = AsicModelRow(1, "L7 9500", 1, 9.5, 3425, ("LTC", "BTC"), True, "L7 9500")
+            coin_data, symbols = await client._build_model_coin_data(model, line)
+            assert symbols == ["LTC", "DOGE"]
+            assert coin_data["DOGE"]["block_reward"] == 10000
+
+            # BCH получает свой хешрейт, BTC и algorithm_data SHA-256 не меняются
+            btc_before = await calc_req.get_algorithm_data(Algorithm.SHA256)
+            bch_before = await calc_req.get_coin_params("BCH")
+            assert bch_before.network_hashrate is None
+            refresher = NetworkStatsRefresher(
+                calc_req,
+                [FixtureSource({"BCH": {"network_hashrate": 4.2e18}, "DOGE": {"network_hashrate": 3.1e15}})],
+            )
+            assert await refresher.refresh() == []
+            assert await calc_req.get_algorithm_data(Algorithm.SHA256) == btc_before
+            bch = await calc_req.get_coin_params("BCH")
+            assert bch.network_hashrate == 4.2e6 and bch.block_reward == 3.125
+            doge = await calc_req.get_coin_params("DOGE")
+            assert doge.network_hashrate == 3.1e6 and doge.merged_parent == "LTC"
+
+            btc_algo = await calc_req.get_algorithm_data(Algorithm.SHA256)
+            bch_coin = await coin_req.get_coin_by_symbol("BCH")
+            coin_data, symbols = await client._algorithm_coin_data(bch_coin, btc_algo)
+            assert symbols == ["BCH"] and coin_data["BCH"]["network_hashrate"] == 4.2e6
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_coin_params()
+    print("[OK] Тест параметров сети монет пройден")
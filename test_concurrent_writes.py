@@ -0,0 +1,75 @@
+"""
+Тест записей без asyncio.Lock: атомарные UPDATE, upsert и версия заявки
+"""
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from database.models import Algorithm, CreateDatabase, SellRequest
+from database.request import CalculatorReq, CoinReq, SellRequestReq, UserReq
+
+
+def test_concurrent_writes():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'writes.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+            calculator_req = CalculatorReq(db_manager.async_session)
+            coin_req = CoinReq(db_manager.async_session)
+            sell_req = SellRequestReq(db_manager.async_session)
+
+            # Нечётное число параллельных переключений меняет флаг
+            await user_req.add_user(1, "user")
+            await asyncio.gather(*(user_req.toggle_notifications(1) for _ in range(21)))
+            assert await user_req.get_user_notifications_status(1) is False
+            assert await user_req.toggle_notifications(404) is False
+
+            # Upsert данных алгоритма и ссылки
+            await calculator_req.update_algorithm_data(Algorithm.SHA256, "BTC", 1, 2, 3)
+            data = await calculator_req.get_algorithm_data(Algorithm.SHA256)
+            assert (data.difficulty, data.network_hashrate) == (1, 2)
+            await calculator_req.update_link("https://a")
+            await calculator_req.update_link("https://b")
+            assert await calculator_req.get_link() == "https://b"
+
+            await coin_req.update_coin_prices({"btc": {"price_usd": 100.0}})
+            assert (await coin_req.get_coin_by_symbol("BTC")).current_price_usd == 100.0
+
+            # Оптимистичная блокировка: сессия с устаревшей версией проигрывает
+            async with db_manager.async_session() as session:
+                request = SellRequest(price=1, condition="new", contact_info="c")
+                session.add(request)
+                await session.commit()
+            async with db_manager.async_session() as first, db_manager.async_session() as second:
+                mine = await first.get(SellRequest, request.id)
+                theirs = await second.get(SellRequest, request.id)
+                mine.status = "approved"
+                await first.commit()
+                theirs.status = "rejected"
+                try:
+                    await second.commit()
+                except StaleDataError:
+                    pass
+                else:
+                    raise AssertionError("устаревшая версия записана")
+            assert await sell_req.update_request_status(request.id, "closed")
+            assert not await sell_req.update_request_status(404, "closed")
+            async with db_manager.async_session() as session:
+                request = await session.get(SellRequest, request.id)
+                assert (request.status, request.version) == ("closed", 3)
+
+            assert not await calculator_req.delete_asic_model(404)
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_concurrent_writes()
+    print("[OK] Тест конкурентных записей пройден")
@@ -0,0 +1,90 @@
+"""
+Тест менеджера чатов AI-сервиса: пул заранее созданных чатов, LRU и хранение в БД
+"""
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from database.models import CreateDatabase
+from database.request import AiConversationReq
+from utils.conversation_manager import CONVERSATION_TTL, ConversationManager
+
+
+class FakeChatFactory:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return f"conv-{self.calls}"
+
+
+async def _make_manager(db_path: str, factory: FakeChatFactory, **kwargs):
+    db_manager = CreateDatabase(database_url=f"sqlite+aiosqlite:///{db_path}")
+    await db_manager.async_main()
+    req = AiConversationReq(db_manager.async_session)
+    return db_manager, ConversationManager(req, chat_factory=factory, **kwargs)
+
+
+def test_pool_and_persistence():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "conv.db")
+            factory = FakeChatFactory()
+            db_manager, manager = await _make_manager(db_path, factory, pool_size=3)
+
+            await manager.start()
+            await manager._refill_task
+            assert manager.pool_available == 3
+            assert factory.calls == 3
+
+            # Первое сообщение берёт чат из пула без запроса к API
+            conv_id = await manager.get_or_create(111)
+            assert conv_id == "conv-1"
+            await manager._refill_task
+            assert manager.pool_available == 3
+            assert factory.calls == 4
+
+            # Повторный запрос отдаёт тот же чат
+            assert await manager.get_or_create(111) == "conv-1"
+
+            # Новый процесс (пустой кэш) находит привязку в БД
+            _, restarted = await _make_manager(db_path, FakeChatFactory(), pool_size=0)
+            assert await restarted.get_conversation(111) == "conv-1"
+
+            await manager.stop()
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_lru_and_expiry():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "conv.db")
+            factory = FakeChatFactory()
+            db_manager, manager = await _make_manager(
+                db_path, factory, pool_size=0, cache_size=2
+            )
+
+            for uid in (1, 2, 3):
+                await manager.new_conversation(uid)
+            assert list(manager._cache) == [2, 3]
+
+            # Истёкший чат не выдаётся, пользователь получает новый
+            expired = datetime.now() - CONVERSATION_TTL - timedelta(minutes=1)
+            await manager.conversation_req.save_conversation(2, "old", expired)
+            manager._cache.pop(2)
+            assert await manager.get_conversation(2) is None
+            assert await manager.get_or_create(2) == "conv-4"
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_pool_and_persistence()
+    test_lru_and_expiry()
+    print("[OK] Все тесты менеджера чатов пройдены")
@@ -0,0 +1,33 @@
+"""
+Тест профиля SQLite: PRAGMA применяются к каждому соединению
+"""
+import asyncio
+import os
+import tempfile
+
+from sqlalchemy import text
+
+from database.models import CreateDatabase
+
+
+def test_sqlite_pragmas():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'profile.db')}"
+            )
+            async with db_manager.engine.connect() as conn:
+                pragma = lambda name: conn.execute(text(f"PRAGMA {name}"))
+                assert (await pragma("journal_mode")).scalar() == "wal"
+                assert (await pragma("synchronous")).scalar() == 1  # NORMAL
+                assert (await pragma("temp_store")).scalar() == 2  # MEMORY
+                assert (await pragma("busy_timeout")).scalar() == 5000
+                assert (await pragma("cache_size")).scalar() == -65536
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_sqlite_pragmas()
+    print("[OK] Тест профиля SQLite пройден")
@@ -0,0 +1,174 @@
+"""
+Тест хранилища FSM в БД: чтение и запись через кэш, запись пачкой,
+восстановление после перезапуска (вместе с перечислениями), очистка и TTL
+"""
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import func, select, update
+
+from database.instrumentation import query_stats
+from database.models import Algorithm, CreateDatabase, FsmState, Manufacturer
+from database.request import FsmReq
+from utils.fsm_storage import SqlStorage, dumps_data, loads_data, storage_key
+from utils.states import CalculatorState
+
+
+def _key(uid: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=uid, user_id=uid)
+
+
+def _calls(method: str) -> int:
+    return sum(
+        latency.count
+        for (_, repo), latency in query_stats.by_source.items()
+        if repo == f"FsmReq.{method}"
+    )
+
+
+async def _rows(db_manager) -> int:
+    async with db_manager.async_session() as session:
+        return await session.scalar(select(func.count()).select_from(FsmState))
+
+
+def test_serialization():
+    data = {"algorithm": Algorithm.SCRYPT, "manufacturer": Manufacturer.BITMAIN, "hashrate": 9.5, "name": "L7 «9500»"}
+    raw = dumps_data(data)
+    assert ", " not in raw and '": ' not in raw and "«9500»" in raw
+    restored = loads_data(raw)
+    assert restored == data and restored["algorithm"] is Algorithm.SCRYPT
+    assert dumps_data({}) is None and loads_data(None) == {}
+
+
+def test_sql_storage():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'fsm.db')}"
+            )
+            await db_manager.async_main()
+            fsm_req = FsmReq(db_manager.async_session)
+            storage = SqlStorage(fsm_req, flush_interval=60)
+
+            query_stats.reset()
+            for uid in range(1, 51):
+                state = FSMContext(storage, _key(uid))
+                await state.set_state(CalculatorState.input_electricity_price)
+                await state.update_data(algorithm=Algorithm.SHA256, hashrate=uid)
+                await state.update_data(electricity_price=5.5)
+                assert await state.get_state() == CalculatorState.input_electricity_price.state
+            # По одному чтению на новый чат, записей в БД ещё нет
+            assert _calls("get") == 50 and _calls("save_many") == 0
+            assert await _rows(db_manager) == 0
+
+            await storage.flush()
+            assert _calls("save_many") == 1 and await _rows(db_manager) == 50
+
+            # Очищенный диалог удаляется из таблицы
+            await FSMContext(storage, _key(50)).clear()
+            await storage.close()
+            assert await _rows(db_manager) == 49
+
+            # Перезапуск: состояние и данные (с перечислениями) из БД
+            restarted = SqlStorage(fsm_req)
+            state = FSMContext(restarted, _key(7))
+            assert await state.get_state() == CalculatorState.input_electricity_price.state
+            data = await state.get_data()
+            assert data == {"algorithm": Algorithm.SHA256, "hashrate": 7, "electricity_price": 5.5}
+            assert data["algorithm"] is Algorithm.SHA256
+            assert await FSMContext(restarted, _key(50)).get_state() is None
+
+            # Брошенный диалог: по TTL начинается заново и удаляется из БД
+            async with db_manager.async_session() as session:
+                await session.execute(
+                    update(FsmState).values(updated_at=datetime.now() - timedelta(days=5))
+                )
+                await session.commit()
+            expiring = SqlStorage(fsm_req, ttl=24 * 3600)
+            assert await expiring.get_state(_key(8)) is None
+            assert await expiring.get_data(_key(8)) == {}
+            await expiring.set_state(_key(9), CalculatorState.input_hashrate)
+            await expiring.flush()
+            assert await expiring.purge() == 48
+            assert await _rows(db_manager) == 1
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_concurrent_load_keeps_newer_write():
+    class SlowReq:
+        async def get(self, key):
+            await asyncio.sleep(0.05)
+            return ("Old:state", '{"step":1}', datetime.now())
+
+    async def run():
+        storage = SqlStorage(SlowReq())
+        key = _key(1)
+        reader = asyncio.create_task(storage.get_data(key))
+        await asyncio.sleep(0.01)
+        # Второй апдейт того же чата пишет, пока первый ждёт БД
+        await storage.set_data(key, {"step": 2})
+        await reader
+        assert await storage.get_data(key) == {"step": 2}
+
+    asyncio.run(run())
+
+
+def test_eviction_during_failed_flush():
+    class FailingReq:
+        def __init__(self):
+            self.saved = {}
+            self.release = asyncio.Event()
+            self.fail = True
+
+        async def get(self, key):
+            return None
+
+        async def save_many(self, rows, deleted):
+            await self.release.wait()
+            if self.fail:
+                raise RuntimeError("database is locked")
+            self.saved.update((row[0], row[1]) for row in rows)
+
+    async def run():
+        fsm_req = FailingReq()
+        storage = SqlStorage(fsm_req, cache_size=2)
+        await storage.set_state(_key(1), CalculatorState.input_hashrate)
+        await storage.set_state(_key(2), CalculatorState.input_hashrate)
+
+        flush = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        # Пока пачка пишется, новые чаты вытесняют старые ключи из кэша
+        for uid in range(3, 6):
+            await storage.get_state(_key(uid))
+        fsm_req.release.set()
+        try:
+            await flush
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("flush должен передать ошибку записи")
+
+        # Записи неудачной пачки не потерялись и уходят со следующей
+        fsm_req.fail = False
+        await storage.flush()
+        assert sorted(fsm_req.saved) == sorted(storage_key(_key(uid)) for uid in (1, 2))
+        # После успешной записи кэш снова ограничен
+        await storage.get_state(_key(6))
+        assert len(storage._cache) == 2
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_serialization()
+    test_sql_storage()
+    test_concurrent_load_keeps_newer_write()
+    test_eviction_during_failed_flush()
+    print("[OK] Тест хранилища FSM пройден")
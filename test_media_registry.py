@@ -0,0 +1,116 @@
+"""
+Тест кэша Telegram file_id для локальных файлов (логотип, документы)
+"""
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+from aiogram.types import FSInputFile
+
+from database.models import CreateDatabase
+from database.request import MediaReq
+from utils.media_registry import MediaRegistry
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.uploads = 0
+        self.errors = []
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        if self.errors:
+            raise TelegramBadRequest(SendPhoto(chat_id=chat_id, photo=photo), self.errors.pop(0))
+        self.sent.append(photo)
+        if isinstance(photo, FSInputFile):
+            self.uploads += 1
+            photo = f"file-{self.uploads}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=photo)], document=None)
+
+
+def test_upload_once_and_reupload_on_change():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'media.db')}"
+            )
+            await db_manager.async_main()
+            media_req = MediaReq(db_manager.async_session)
+
+            logo = Path(tmp) / "logo.jpg"
+            logo.write_bytes(b"first version")
+
+            bot = FakeBot()
+            registry = MediaRegistry(bot, media_req)
+            for chat_id in (1, 2, 3):
+                await registry.send_photo(chat_id, logo, caption="hi")
+            assert bot.uploads == 1
+            assert bot.sent[1:] == ["file-1", "file-1"]
+
+            # После рестарта file_id берётся из БД
+            restarted_bot = FakeBot()
+            restarted = MediaRegistry(restarted_bot, media_req)
+            await restarted.send_photo(4, logo)
+            assert restarted_bot.uploads == 0
+            assert restarted_bot.sent == ["file-1"]
+
+            # Файл изменился — загружаем заново
+            logo.write_bytes(b"second version, longer")
+            await registry.send_photo(5, logo)
+            assert bot.uploads == 2
+            await registry.send_photo(6, logo)
+            assert bot.sent[-1] == "file-2"
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_forget_only_rejected_file_id():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'media.db')}"
+            )
+            await db_manager.async_main()
+            media_req = MediaReq(db_manager.async_session)
+            logo = Path(tmp) / "logo.jpg"
+            logo.write_bytes(b"logo")
+
+            bot = FakeBot()
+            registry = MediaRegistry(bot, media_req)
+            await registry.send_photo(1, logo)
+
+            # Ошибка чата не сбрасывает file_id и не вызывает повторную загрузку
+            for error in ("Bad Request: chat not found", "Bad Request: can't parse entities"):
+                bot.errors = [error]
+                try:
+                    await registry.send_photo(2, logo)
+                except TelegramBadRequest:
+                    pass
+                else:
+                    raise AssertionError(f"ошибка не проброшена: {error}")
+            assert bot.uploads == 1 and await media_req.get_file_id(
+                MediaRegistry._sha256(logo)
+            ) == "file-1"
+
+            # Недействительный file_id забывается, файл загружается заново
+            bot.errors = ["Bad Request: wrong file identifier/HTTP URL specified"]
+            await registry.send_photo(3, logo)
+            assert bot.uploads == 2 and await media_req.get_file_id(
+                MediaRegistry._sha256(logo)
+            ) == "file-2"
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_upload_once_and_reupload_on_change()
+    test_forget_only_rejected_file_id()
+    print("[OK] Тест кэша file_id пройден")
@@ -0,0 +1,110 @@
+"""
+Тест обновления данных сети: перебор источников, перевод единиц, запись только
+изменившихся значений одним запросом и отсев сбоев источника
+"""
+import asyncio
+import logging
+import os
+import tempfile
+
+from database.instrumentation import query_stats
+from database.models import Algorithm, CreateDatabase
+from database.request import CalculatorReq
+from utils.network_stats import FixtureSource, NetworkStatsRefresher, NetworkStatsSource
+
+
+class BrokenSource(NetworkStatsSource):
+    name = "broken"
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def fetch(self, session, coin):
+        self.calls.append(coin)
+        raise TimeoutError("timeout")
+
+
+def _writes() -> int:
+    return sum(
+        latency.count
+        for (_, repo), latency in query_stats.by_source.items()
+        if repo == "CalculatorReq.update_network_stats"
+    )
+
+
+def test_network_stats_refresh(caplog):
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'network.db')}"
+            )
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+            before = {row.algorithm: row for row in await calc_req.get_algorithm_data_all()}
+
+            fixture = {
+                # H/s: 1.1e21 H/s = 1.1e9 TH/s; сложность в сотни раз меньше
+                # начальной - начальные значения исправляются без проверки скачка
+                "BTC": {"network_hashrate": 1.1e21, "difficulty": 1.3e14},
+                "LTC": {"network_hashrate": 2.9e15, "block_reward": 6.25},
+                # Blake2B+SHA3 калькулятор считает в GH/s
+                "KLS": {"network_hashrate": 2.1e11},
+                # Совпадает с начальным: строка лишь помечается обновлённой
+                "KAS": {"network_hashrate": 1.6e18},
+            }
+            broken = BrokenSource()
+            refresher = NetworkStatsRefresher(calc_req, [broken, FixtureSource(fixture)])
+
+            query_stats.reset()
+            with caplog.at_level(logging.WARNING, logger="utils.network_stats"):
+                changed = await refresher.refresh()
+            # Монеты без данных не пропускаются молча
+            assert "ETC" in refresher.missing and "KDA" in refresher.missing
+            assert "KDA (Blake2S)" in caplog.text
+            assert sorted(row.algorithm for row in changed) == [
+                Algorithm.BLAKE2B_SHA3, Algorithm.SHA256, Algorithm.SCRYPT, Algorithm.KHEAVYHASH
+            ]
+            assert all(row.refreshed_at is not None for row in changed)
+            # Каждая монета запрашивается один раз: монеты алгоритмов и coin_network_params
+            assert len(broken.calls) == len(set(broken.calls))
+            assert {row.default_coin for row in before.values()} <= set(broken.calls)
+            assert {"BCH", "BSV", "DOGE"} <= set(broken.calls)
+            assert _writes() == 1
+
+            btc = await calc_req.get_algorithm_data(Algorithm.SHA256)
+            assert (btc.network_hashrate, btc.difficulty) == (1.1e9, 1.3e14)
+            assert btc.block_reward == before[Algorithm.SHA256].block_reward
+            ltc = await calc_req.get_algorithm_data(Algorithm.SCRYPT)
+            assert ltc.network_hashrate == 2.9e6 and ltc.block_reward == 6.25
+            kls = await calc_req.get_algorithm_data(Algorithm.BLAKE2B_SHA3)
+            assert kls.network_hashrate == 210
+            # Алгоритм без данных в источнике остаётся с начальными значениями
+            kda = await calc_req.get_algorithm_data(Algorithm.BLAKE2S)
+            assert kda == before[Algorithm.BLAKE2S] and kda.refreshed_at is None
+
+            # Те же данные - ничего не пишется
+            query_stats.reset()
+            assert await refresher.refresh() == []
+            assert _writes() == 0
+
+            # Изменение меньше порога не считается изменением
+            fixture["BTC"]["network_hashrate"] = 1.1e21 * 1.0005
+            assert await refresher.refresh() == []
+            fixture["BTC"]["network_hashrate"] = 1.2e21
+            assert [row.algorithm for row in await refresher.refresh()] == [Algorithm.SHA256]
+
+            # После обновления из источника скачок в тысячу раз - сбой, не пишется
+            fixture["KAS"]["network_hashrate"] = 1.6e15
+            assert await refresher.refresh() == []
+            kas = await calc_req.get_algorithm_data(Algorithm.KHEAVYHASH)
+            assert kas.network_hashrate == before[Algorithm.KHEAVYHASH].network_hashrate
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
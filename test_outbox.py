@@ -0,0 +1,101 @@
+"""
+Тест очереди сообщений администратору: put не ждёт Telegram, повтор после
+сбоя сети, текст вместо фото, окончательная ошибка и отправка после перезапуска
+"""
+import asyncio
+import os
+import tempfile
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage, SendPhoto
+from sqlalchemy import select
+
+from database.models import CreateDatabase, OutboxMessage
+from database.request import OutboxReq
+from utils.outbox import Outbox
+
+ADMIN = 42
+
+
+class FakeBot:
+    def __init__(self, message_failures: int = 0, photo_fails: bool = False) -> None:
+        self.message_failures = message_failures
+        self.photo_fails = photo_fails
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == 13:
+            raise TelegramForbiddenError(
+                SendMessage(chat_id=chat_id, text=""), "Forbidden: bot was blocked by the user"
+            )
+        if self.message_failures:
+            self.message_failures -= 1
+            raise TelegramNetworkError(SendMessage(chat_id=chat_id, text=""), "timeout")
+        self.sent.append(("message", chat_id, text))
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        if self.photo_fails:
+            raise TelegramNetworkError(SendPhoto(chat_id=chat_id, photo=photo), "timeout")
+        self.sent.append(("photo", chat_id, caption))
+
+
+async def _statuses(db_manager):
+    async with db_manager.async_session() as session:
+        res = await session.execute(
+            select(OutboxMessage.message_text, OutboxMessage.status, OutboxMessage.attempts)
+        )
+        return {text: (status, attempts) for text, status, attempts in res.all()}
+
+
+def test_outbox():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'outbox.db')}"
+            )
+            await db_manager.async_main()
+            outbox_req = OutboxReq(db_manager.async_session)
+
+            # Бот не запущен: сообщения только сохраняются
+            stopped = Outbox(FakeBot(), outbox_req)
+            await stopped.put(ADMIN, "заявка до перезапуска")
+
+            bot = FakeBot(message_failures=2, photo_fails=True)
+            outbox = Outbox(bot, outbox_req, base_delay=0.05, poll_interval=0.05)
+            await outbox.start()
+            await outbox.put(ADMIN, "фото", photo="file-id", fallback_text="текст вместо фото")
+            await outbox.put(13, "заблокирован")
+            for _ in range(100):
+                if len(bot.sent) == 2:
+                    break
+                await asyncio.sleep(0.05)
+            await outbox.stop()
+
+            # Первые две отправки упали по сети и повторены
+            assert sorted(bot.sent) == [
+                ("message", ADMIN, "заявка до перезапуска"),
+                ("message", ADMIN, "текст вместо фото"),
+            ]
+            statuses = await _statuses(db_manager)
+            assert statuses["заявка до перезапуска"][0] == "sent"
+            assert statuses["фото"][0] == "sent"
+            assert statuses["заблокирован"] == ("failed", 1)
+
+            # Исчерпаны попытки - failed
+            bot = FakeBot(message_failures=5)
+            outbox = Outbox(bot, outbox_req, max_attempts=2, base_delay=0.01)
+            await outbox.put(ADMIN, "сеть лежит")
+            await outbox.drain()
+            await asyncio.sleep(0.05)
+            await outbox.drain()
+            assert (await _statuses(db_manager))["сеть лежит"] == ("failed", 2)
+            assert bot.sent == []
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_outbox()
+    print("[OK] Тест очереди сообщений пройден")
@@ -0,0 +1,163 @@
+"""
+Тест рассылки курсов: только подписчики и доступные пользователи, параллельная
+отправка с общим темпом, отмена устаревшей рассылки новым снимком цен
+"""
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from database.models import CreateDatabase
+from database.request import BroadcastReq, UserReq
+from utils.broadcast import BroadcastEngine, RateLimiter
+from utils.price_notifier import PriceNotifier
+
+USERS = 40
+
+
+class FakeBot:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.delay)
+        if chat_id == 1007:
+            raise TelegramForbiddenError(
+                SendMessage(chat_id=chat_id, text=""), "Forbidden: bot was blocked by the user"
+            )
+        self.sent.append((chat_id, text))
+
+
+async def _make_users(tmp):
+    db_manager = CreateDatabase(
+        database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'notify.db')}"
+    )
+    await db_manager.async_main()
+    user_req = UserReq(db_manager.async_session)
+    for i in range(USERS):
+        await user_req.add_user(1000 + i, f"user{i}")
+    for uid in (1001, 1002, 1003):
+        await user_req.toggle_notifications(uid)
+    await user_req.mark_unreachable([1004])
+    return db_manager, user_req
+
+
+def test_price_notifier():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req = await _make_users(tmp)
+
+            # Выключено - ничего не отправляется
+            bot = FakeBot()
+            assert PriceNotifier(bot, user_req).notify("BTC") is None
+
+            notifier = PriceNotifier(bot, user_req, enabled=True, rate=200, workers=8, batch_size=8)
+            started = time.monotonic()
+            cycle = notifier.notify("BTC $100")
+            await cycle.task
+            elapsed = time.monotonic() - started
+
+            expected = {1000 + i for i in range(USERS)} - {1001, 1002, 1003, 1004, 1007}
+            assert sorted(uid for uid, _ in bot.sent) == sorted(expected)
+            assert (cycle.sent, cycle.failed) == (len(expected), 1)
+            assert elapsed >= (len(expected) - 1) / 200
+            assert notifier.current is None
+            # Заблокировавший бота больше не в списке подписчиков
+            assert await user_req.count_uids(notifications=True) == len(expected)
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_new_snapshot_cancels_stale_cycle():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req = await _make_users(tmp)
+            bot = FakeBot(delay=0.05)
+            notifier = PriceNotifier(bot, user_req, enabled=True, rate=50, workers=2, batch_size=8)
+
+            first = notifier.notify("старые цены")
+            while len(bot.sent) < 4:
+                await asyncio.sleep(0.01)
+            second = notifier.notify("новые цены")
+            await second.task
+
+            assert first.task.cancelled()
+            old = [uid for uid, text in bot.sent if text == "старые цены"]
+            new = [uid for uid, text in bot.sent if text == "новые цены"]
+            assert len(old) < USERS - 5
+            assert len(new) == len(set(new)) == USERS - 5
+
+            await notifier.stop()
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+class TimedBot(FakeBot):
+    """Время каждой попытки отправки; один retry_after на рассылке курсов"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.attempts = []
+        self.retry_after_sent = False
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == 1:
+            return SimpleNamespace(message_id=42)
+        self.attempts.append(time.monotonic())
+        if text == "курсы" and chat_id == 1020 and not self.retry_after_sent:
+            self.retry_after_sent = True
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=""), "Flood", 1)
+        return await super().send_message(chat_id, text, **kwargs)
+
+    async def edit_message_text(self, *args, **kwargs):
+        pass
+
+
+def test_shared_limiter_with_broadcast():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager, user_req = await _make_users(tmp)
+            bot = TimedBot()
+            rate = 50
+            limiter = RateLimiter(rate)
+            notifier = PriceNotifier(bot, user_req, enabled=True, workers=8, limiter=limiter)
+            engine = BroadcastEngine(
+                bot, user_req, BroadcastReq(db_manager.async_session), workers=8,
+                progress_interval=10, limiter=limiter,
+            )
+
+            job = await engine.start(1, "новости")
+            cycle = notifier.notify("курсы")
+            await asyncio.gather(job.task, cycle.task)
+
+            # Обе рассылки дошли, но вместе - не быстрее общего темпа
+            assert job.sent == USERS - 2 and cycle.sent == USERS - 5
+            attempts = sorted(bot.attempts)
+            assert len(attempts) == job.sent + cycle.sent + 2 + 1
+            assert attempts[-1] - attempts[0] >= (len(attempts) - 1) / rate
+            for i, started in enumerate(attempts):
+                window = [t for t in attempts[i:] if t - started < 0.5]
+                assert len(window) <= rate * 0.5 + 1
+
+            # retry_after рассылки курсов остановил и рассылку новостей
+            gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+            assert max(gaps) >= 0.9
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_price_notifier()
+    test_new_snapshot_cancels_stale_cycle()
+    test_shared_limiter_with_broadcast()
+    print("[OK] Тест рассылки курсов пройден")
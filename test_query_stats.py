@@ -0,0 +1,101 @@
+"""
+Тест статистики запросов к БД: теги обработчика и репозитория, лог медленных запросов
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database.instrumentation import (
+    handler_scope,
+    normalize_statement,
+    query_stats,
+    redact_parameters,
+)
+from database.models import CreateDatabase
+from database.request import CoinReq, UserReq
+
+
+def test_query_stats(caplog):
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'stats.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+            coin_req = CoinReq(db_manager.async_session)
+
+            query_stats.reset()
+            with handler_scope("Client.start_handler"):
+                await user_req.add_user(555, "secret-name")
+                await coin_req.get_coins_by_symbols(["BTC", "LTC"])
+            uids = [uid async for uid in user_req.iter_uids()]
+            assert uids == [555]
+
+            assert query_stats.by_handler["Client.start_handler"] == [1, 2, 2]
+            sources = query_stats.by_source
+            assert sources[("Client.start_handler", "UserReq.add_user")].count == 1
+            assert sources[("Client.start_handler", "CoinReq.get_coins_by_symbols")].count == 1
+            assert sources[("-", "UserReq.iter_uid_batches")].count == 1
+            assert "UserReq.add_user" in query_stats.report()
+
+            # Лог медленных запросов без значений параметров
+            query_stats.slow_query_ms = 0
+            with caplog.at_level(logging.WARNING, logger="database.instrumentation"):
+                await user_req.add_user(556, "secret-name")
+            query_stats.slow_query_ms = 200
+            assert "Медленный запрос" in caplog.text
+            assert "secret-name" not in caplog.text
+
+            await db_manager.dispose()
+
+    asyncio.run(run())
+
+
+def test_failed_query(caplog):
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'errors.db')}"
+            )
+            await db_manager.async_main()
+            query_stats.reset()
+
+            async with db_manager.async_session() as session:
+                conn = (await session.connection()).sync_connection
+                with handler_scope("Client.broken"):
+                    with caplog.at_level(logging.WARNING, logger="database.instrumentation"):
+                        try:
+                            await session.execute(text("SELECT * FROM no_such_table WHERE uid = :uid"), {"uid": 7})
+                        except OperationalError:
+                            pass
+                        else:
+                            raise AssertionError("запрос не упал")
+                # Время начала упавшего запроса не остаётся на соединении
+                assert conn.info["query_started"] == []
+                assert query_stats.errors == {("Client.broken", "-"): 1}
+                assert "Ошибка запроса" in caplog.text and "no_such_table" in caplog.text
+                assert "Ошибки запросов" in query_stats.report()
+
+                # Следующий запрос на том же соединении меряется от своего начала
+                time.sleep(0.3)
+                await session.execute(text("SELECT 1"))
+                assert query_stats.by_statement["SELECT 1"].max_ms < 200
+
+            await db_manager.dispose()
+
+    asyncio.run(run())
+
+
+def test_normalize_and_redact():
+    assert normalize_statement("SELECT a\n  FROM t WHERE x IN (?, ?, ?)") == (
+        "SELECT a FROM t WHERE x IN (?...)"
+    )
+    assert redact_parameters({"uid": 1, "uname": "bob"}) == "{uid=?, uname=?}"
+    assert redact_parameters((1, "bob")) == "<2 параметров>"
+    assert redact_parameters([(1,), (2,)], executemany=True) == "<2 наборов параметров>"
@@ -0,0 +1,58 @@
+"""
+Тест маршрутизации чтений на реплику: две SQLite-базы вместо primary и реплики
+"""
+import asyncio
+import os
+import tempfile
+
+from database.models import Algorithm, CreateDatabase, Manufacturer
+from database.request import CalculatorReq, UsedDeviceGuideReq
+from database.routing import consistency_key
+
+
+def test_replica_routing_and_read_your_writes():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            primary_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'primary.db')}"
+            replica_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'replica.db')}"
+
+            # «Реплика» отстаёт: в ней своя ссылка, которой нет на primary
+            replica = CreateDatabase(database_url=replica_url)
+            await replica.async_main()
+            await CalculatorReq(replica.async_session).update_link("https://replica")
+            await replica.dispose()
+
+            db_manager = CreateDatabase(
+                database_url=primary_url, replica_url=replica_url, sticky_seconds=60
+            )
+            await db_manager.async_main()
+            calc_req = CalculatorReq(db_manager.async_session)
+            guide_req = UsedDeviceGuideReq(db_manager.async_session)
+
+            # Запись админа идёт на primary, и он сразу читает свою запись
+            with consistency_key(1):
+                await calc_req.update_link("https://primary")
+                assert await calc_req.get_link() == "https://primary"
+                await guide_req.update_guide("Гайд", "текст", 1)
+                assert (await guide_req.get_guide()).title == "Гайд"
+
+            # Остальные пользователи читают с реплики
+            with consistency_key(2):
+                assert await calc_req.get_link() == "https://replica"
+                assert await guide_req.get_guide() is None
+            assert await calc_req.get_link() == "https://replica"
+
+            # Индекс каталога кэшируется надолго, поэтому всегда читается с primary
+            line_id = await calc_req.add_model_line("S21", Manufacturer.BITMAIN, Algorithm.SHA256)
+            await calc_req.add_asic_model("S21 200T", line_id, 200, 3500, "BTC")
+            with consistency_key(2):
+                assert [m.name for m in await calc_req.get_all_asic_models()] == ["S21 200T"]
+
+            await db_manager.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_replica_routing_and_read_your_writes()
+    print("[OK] Тест маршрутизации на реплику пройден")
@@ -0,0 +1,71 @@
+"""
+Тест схемы БД: миграции alembic дают ту же схему, что и модели, а новая
+БД, созданная ботом, помечается последней ревизией
+"""
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+
+from database.models import ALEMBIC_DIR, Base, CreateDatabase
+
+HEAD = ScriptDirectory(str(ALEMBIC_DIR)).get_current_head()
+
+
+def _revision_and_diff(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"compare_type": True})
+        result = context.get_current_revision(), compare_metadata(context, Base.metadata)
+    engine.dispose()
+    return result
+
+
+async def _start_bot(path: str) -> str:
+    db_manager = CreateDatabase(database_url=f"sqlite+aiosqlite:///{path}")
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        await db_manager.async_main()
+    await db_manager.engine.dispose()
+    return output.getvalue()
+
+
+def test_migrations_match_models():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "migrated.db")
+        config = Config(str(ALEMBIC_DIR.parent / "alembic.ini"))
+        config.set_main_option("script_location", str(ALEMBIC_DIR))
+        config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+        command.upgrade(config, "head")
+        assert _revision_and_diff(path) == (HEAD, [])
+
+        # Бот на мигрированной БД схему не трогает и не предупреждает
+        assert "[WARN]" not in asyncio.run(_start_bot(path))
+
+
+def test_fresh_database_is_stamped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fresh.db")
+        asyncio.run(_start_bot(path))
+        assert _revision_and_diff(path) == (HEAD, [])
+
+        # Отставшая БД: схема не меняется при старте, только предупреждение
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE alembic_version SET version_num = 'b9e4c7a1f326'")
+        engine.dispose()
+        assert "alembic upgrade head" in asyncio.run(_start_bot(path))
+
+
+if __name__ == "__main__":
+    test_migrations_match_models()
+    test_fresh_database_is_stamped()
+    print("[OK] Тест схемы БД пройден")
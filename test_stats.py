@@ -0,0 +1,108 @@
+"""
+Тест статистики админки: счётчики в памяти, запись пачкой в daily_stats,
+первичное заполнение по существующим пользователям и вывод по дням
+"""
+import asyncio
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, update
+
+from database.instrumentation import query_stats
+from database.models import CreateDatabase, DailyStat, User
+from database.request import StatsReq, UserReq
+from utils.stats import AI_QUESTIONS, CALCULATIONS, USERS_NEW, StatsCounter, render_stats
+
+
+def test_stats_counter():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'stats.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+            for uid in range(1, 6):
+                await user_req.add_user(uid, f"user{uid}")
+            # Двое зарегистрировались три дня назад
+            async with db_manager.async_session() as session:
+                await session.execute(
+                    update(User)
+                    .where(User.uid.in_([1, 2]))
+                    .values(created_at=datetime.now() - timedelta(days=3))
+                )
+                await session.commit()
+
+            stats = StatsCounter(StatsReq(db_manager.async_session), flush_interval=0.05)
+            await stats.start()
+            totals, daily = await stats.snapshot()
+            assert totals[USERS_NEW] == 5
+            assert daily[date.today()][USERS_NEW] == 3
+            assert daily[date.today() - timedelta(days=3)][USERS_NEW] == 2
+
+            # Сотня событий - в памяти, в БД уходят одной пачкой
+            query_stats.reset()
+            for _ in range(100):
+                stats.incr(CALCULATIONS)
+            stats.incr(AI_QUESTIONS, 3)
+            totals, _ = await stats.snapshot()
+            assert (totals[CALCULATIONS], totals[AI_QUESTIONS]) == (100, 3)
+            await asyncio.sleep(0.2)
+            flushes = sum(
+                latency.count
+                for (_, repo), latency in query_stats.by_source.items()
+                if repo == "StatsReq.add_counters"
+            )
+            assert flushes == 1
+
+            stats.incr(CALCULATIONS)
+            await stats.stop()
+            async with db_manager.async_session() as session:
+                rows = (
+                    await session.execute(
+                        select(DailyStat.metric, DailyStat.value).where(
+                            DailyStat.day == date.today()
+                        )
+                    )
+                ).all()
+            assert dict(rows) == {USERS_NEW: 3, CALCULATIONS: 101, AI_QUESTIONS: 3}
+
+            # Повторный старт не заполняет счётчики заново
+            restarted = StatsCounter(StatsReq(db_manager.async_session))
+            await restarted.start()
+            totals, daily = await restarted.snapshot()
+            await restarted.stop()
+            assert totals[USERS_NEW] == 5
+
+            text = render_stats(totals, daily)
+            assert "Новые пользователи: всего 5, сегодня 3" in text
+            assert "Расчёты доходности: всего 101, сегодня 101" in text
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_stats_flush_failure_keeps_counters():
+    class BrokenReq:
+        async def add_counters(self, deltas):
+            raise ConnectionError("db down")
+
+    async def run():
+        stats = StatsCounter(BrokenReq())
+        stats.incr(CALCULATIONS, 2)
+        try:
+            await stats.flush()
+        except ConnectionError:
+            pass
+        stats.incr(CALCULATIONS)
+        assert stats._pending == {(date.today(), CALCULATIONS): 3}
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_stats_counter()
+    test_stats_flush_failure_keeps_counters()
+    print("[OK] Тест статистики пройден")
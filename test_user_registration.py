@@ -0,0 +1,107 @@
+"""
+Тест регистрации пользователей: атомарный INSERT ... ON CONFLICT и быстрый путь для известных uid
+"""
+import asyncio
+import os
+import tempfile
+
+from database.models import CreateDatabase
+from database.request import UserReq
+
+
+def test_ensure_user_fast_path():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'users.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+
+            # Одновременная регистрация одного пользователя: запись ровно одна
+            results = await asyncio.gather(
+                *(user_req.add_user(42, "tester") for _ in range(5))
+            )
+            assert results.count(True) == 1
+            assert await user_req.user_exists(42)
+
+            assert await user_req.ensure_user(7, "new") is True
+            assert await user_req.ensure_user(7, "new") is False
+
+            # После рестарта известные uid загружаются одним запросом
+            restarted = UserReq(db_manager.async_session)
+            assert await restarted.load_known_uids() == 2
+            assert await restarted.ensure_user(42, "tester") is False
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_iter_uid_batches():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'users.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+            for uid in range(1, 26):
+                await user_req.add_user(uid, f"user{uid}")
+            for uid in (3, 10, 25):
+                await user_req.toggle_notifications(uid)
+
+            batches = [b async for b in user_req.iter_uid_batches(batch_size=10)]
+            assert [len(b) for b in batches] == [10, 10, 5]
+            assert sum(batches, []) == list(range(1, 26))
+
+            off = [uid async for uid in user_req.iter_uids(4, notifications=False)]
+            assert off == [3, 10, 25]
+            on = [uid async for uid in user_req.iter_uids(4, notifications=True)]
+            assert len(on) == 22 and 10 not in on
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_unreachable_users():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            db_manager = CreateDatabase(
+                database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'users.db')}"
+            )
+            await db_manager.async_main()
+            user_req = UserReq(db_manager.async_session)
+            for uid in range(1, 11):
+                await user_req.add_user(uid, f"user{uid}")
+            await user_req.toggle_notifications(4)
+
+            # Бот заблокирован: рассылки пропускают, повторная пометка ничего не меняет
+            assert await user_req.mark_unreachable([3, 4, 7]) == 3
+            assert await user_req.mark_unreachable([3]) == 0
+            assert [uid async for uid in user_req.iter_uids(4)] == [1, 2, 5, 6, 8, 9, 10]
+            assert await user_req.count_uids() == 7
+            assert await user_req.count_uids(notifications=False) == 0
+
+            restarted = UserReq(db_manager.async_session)
+            assert await restarted.load_known_uids() == 7
+
+            # /start снова делает пользователя доступным (это не новая регистрация),
+            # настройки не сбрасываются
+            assert await restarted.ensure_user(4, "user4") is False
+            assert await restarted.ensure_user(4, "user4") is False
+            assert await restarted.count_uids(notifications=False) == 1
+            user = await restarted.get_user_by_uid(4)
+            assert user.is_reachable and user.unreachable_at is None
+
+            await db_manager.engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_ensure_user_fast_path()
+    test_iter_uid_batches()
+    test_unreachable_users()
+    print("[OK] Тест регистрации пользователей пройден")
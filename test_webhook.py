@@ -0,0 +1,81 @@
+"""
+Тест webhook-режима: проверка секрета, ответ 200 до обработки апдейта,
+ограниченная очередь (503 при переполнении) и дообработка очереди при остановке
+"""
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.webhook import SECRET_HEADER, WebhookServer
+
+SECRET = "test-secret"
+
+
+def _update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": 1000 + update_id, "type": "private"},
+            "from": {"id": 1000 + update_id, "is_bot": False, "first_name": "Load"},
+            "text": "привет",
+        },
+    }
+
+
+def test_webhook_server():
+    async def run():
+        release = asyncio.Event()
+        handled = []
+        dp = Dispatcher()
+
+        @dp.message()
+        async def on_message(message):
+            await release.wait()
+            handled.append(message.message_id)
+
+        bot = Bot("42:TEST")
+        server = WebhookServer(dp, bot, SECRET, queue_size=5, workers=1)
+        client = TestClient(TestServer(server.app))
+        await client.start_server()
+        headers = {SECRET_HEADER: SECRET}
+
+        response = await client.post("/webhook", json=_update(1), headers={SECRET_HEADER: "wrong"})
+        assert response.status == 401
+        response = await client.post("/webhook", data="not json", headers=headers)
+        assert response.status == 400
+
+        # Обработчик заблокирован, а ответы 200 приходят сразу; лишнее - 503
+        statuses = []
+        started = time.monotonic()
+        for update_id in range(1, 11):
+            response = await client.post("/webhook", json=_update(update_id), headers=headers)
+            statuses.append(response.status)
+            await asyncio.sleep(0.01)
+        assert time.monotonic() - started < 2
+        accepted = statuses.count(200)
+        assert statuses[:5] == [200] * 5 and 5 <= accepted <= 6
+        assert statuses.count(503) == 10 - accepted == server.rejected
+
+        response = await client.get("/health")
+        assert (await response.json())["received"] == accepted
+
+        # Остановка дожидается обработки принятых апдейтов
+        closing = asyncio.create_task(client.close())
+        await asyncio.sleep(0.1)
+        assert not closing.done() and handled == []
+        release.set()
+        await closing
+        assert sorted(handled) == list(range(1, accepted + 1))
+        assert server.processed == accepted and server.failed == 0
+        await bot.session.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_webhook_server()
+    print("[OK] Тест webhook пройден")
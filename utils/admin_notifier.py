@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set
+
+from aiogram import Bot
+
+from utils.outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+AdminSend = Callable[[int], Awaitable[Any]]
+
+
+class AdminNotifier:
+    """Уведомления администраторам.
+
+    spawn() рассылает всем администраторам в фоне: обработчик пользователя
+    отвечает сразу, а запросы к Telegram для разных администраторов идут
+    параллельно, не больше concurrency одновременно. Сообщения, которые
+    нельзя потерять (заявки), ставятся через enqueue() в Outbox - он
+    повторяет отправку и переживает перезапуск.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        admin_ids: Sequence[int],
+        outbox: Optional[Outbox] = None,
+        concurrency: int = 5,
+    ) -> None:
+        self.bot = bot
+        self.admin_ids = list(admin_ids)
+        self.outbox = outbox
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def fan_out(
+        self, send: AdminSend, admin_ids: Optional[Sequence[int]] = None
+    ) -> Dict[int, bool]:
+        """send(admin_id) для каждого администратора; admin_id -> успех"""
+        admin_ids = self.admin_ids if admin_ids is None else list(admin_ids)
+
+        async def run(admin_id: int) -> bool:
+            async with self._semaphore:
+                try:
+                    await send(admin_id)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Уведомление администратору {admin_id} не отправлено: {e}")
+                    return False
+
+        results = await asyncio.gather(*(run(admin_id) for admin_id in admin_ids))
+        return dict(zip(admin_ids, results))
+
+    def spawn(
+        self, send: AdminSend, admin_ids: Optional[Sequence[int]] = None
+    ) -> asyncio.Task:
+        """fan_out в фоновой задаче; stop() дождётся незавершённых"""
+        task = asyncio.create_task(self.fan_out(send, admin_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def enqueue(
+        self,
+        text: str,
+        photo: Optional[str] = None,
+        fallback_text: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+        admin_ids: Optional[Sequence[int]] = None,
+    ) -> None:
+        """Сообщение каждому администратору через Outbox"""
+        admin_ids = self.admin_ids if admin_ids is None else admin_ids
+        for admin_id in admin_ids:
+            await self.outbox.put(
+                admin_id, text, photo=photo, fallback_text=fallback_text, parse_mode=parse_mode
+            )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
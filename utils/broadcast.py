@@ -0,0 +1,485 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.types import InlineKeyboardMarkup
+
+from database.models import BroadcastMessage
+from database.request import BroadcastReq, UserReq
+from keyboards.admin_kb import AdminKB
+
+logger = logging.getLogger(__name__)
+
+# Итоги, после которых писать пользователю бессмысленно до его следующего /start
+UNREACHABLE_OUTCOMES = ("blocked", "inactive", "not_found")
+
+
+def classify_delivery_error(error: TelegramAPIError) -> str:
+    """Итог неудачной отправки по ошибке Telegram: blocked - бот заблокирован,
+    inactive - аккаунт удалён, not_found - чата нет, failed - прочие ошибки
+    (пользователь остаётся в рассылках)"""
+    message = str(error).lower()
+    if isinstance(error, TelegramForbiddenError):
+        return "inactive" if "deactivated" in message else "blocked"
+    if isinstance(error, (TelegramBadRequest, TelegramNotFound)) and (
+        "chat not found" in message
+        or "user not found" in message
+        or "peer_id_invalid" in message
+    ):
+        return "not_found"
+    return "failed"
+
+
+class RateLimiter:
+    """Темп отправки: не больше rate сообщений в секунду на все отправители
+    и не чаще одного сообщения в per_chat_interval секунд в один чат.
+
+    pause() останавливает всех отправителей - так выполняется retry_after
+    от Telegram: лимит общий на бота, а не на конкретный запрос.
+    """
+
+    def __init__(self, rate: float, per_chat_interval: float = 1.0) -> None:
+        self.interval = 1.0 / rate
+        self.per_chat_interval = per_chat_interval
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_next: Dict[int, float] = {}
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat_id: int) -> None:
+        while True:
+            now = time.monotonic()
+            wait = max(self._paused_until, self._chat_next.get(chat_id, 0.0)) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            self._chat_next[chat_id] = slot + self.per_chat_interval
+            if len(self._chat_next) > 10000:
+                self._chat_next = {
+                    chat: until for chat, until in self._chat_next.items() if until > now
+                }
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            # Пока ждали слот, Telegram мог попросить паузу
+            if self._paused_until <= time.monotonic():
+                return
+
+
+class BroadcastJob:
+    def __init__(
+        self,
+        broadcast_id: int,
+        text: str,
+        photo: Optional[str],
+        chat_id: int,
+        total: int = 0,
+    ) -> None:
+        self.id = broadcast_id
+        self.text = text
+        self.photo = photo
+        self.chat_id = chat_id
+        self.status_message_id: Optional[int] = None
+        # running / paused / cancelled / done
+        self.state = "running"
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.unknown = 0
+        self.retries = 0
+        # Недоступные получатели этой рассылки (учтены и в failed)
+        self.unreachable = 0
+        # Итоги отправки, ещё не записанные в БД: uid -> статус
+        self.outcomes: Dict[int, str] = {}
+        # Недоступные uid, ещё не помеченные в users
+        self.unreachable_uids: List[int] = []
+        # uid, запрос к Telegram для которых уже ушёл и ещё не вернулся
+        self.sending: Set[int] = set()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.flush_lock = asyncio.Lock()
+
+    @classmethod
+    def from_row(cls, row: BroadcastMessage) -> "BroadcastJob":
+        job = cls(row.id, row.message_text, row.photo_url, row.chat_id, row.total)
+        job.status_message_id = row.status_message_id
+        job.state = row.status
+        job.sent = row.sent
+        job.failed = row.failed
+        job.unknown = row.unknown
+        return job
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.unknown
+
+    def record(self, uid: int, status: str) -> None:
+        if status == "sent":
+            self.sent += 1
+        elif status == "failed":
+            self.failed += 1
+        elif status in UNREACHABLE_OUTCOMES:
+            self.failed += 1
+            self.unreachable += 1
+            self.unreachable_uids.append(uid)
+        self.outcomes[uid] = status
+
+    def progress_text(self) -> str:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        speed = (self.sent + self.failed) / elapsed if elapsed > 0 else 0.0
+        title = {
+            "running": "📤 Идёт рассылка",
+            "paused": "⏸ Рассылка на паузе",
+            "cancelled": "✖️ Рассылка отменена",
+            "done": "✅ Рассылка завершена",
+        }[self.state]
+        lines = [
+            title,
+            f"Обработано: {self.processed} из {self.total}",
+            f"✅ Успешно: {self.sent}",
+            f"❌ Не доставлено: {self.failed}",
+        ]
+        if self.unreachable:
+            lines.append(f"🚫 Заблокировали бота или удалили аккаунт: {self.unreachable}")
+        if self.unknown:
+            lines.append(f"❔ Нет итога (бот перезапускался во время отправки): {self.unknown}")
+        if self.state == "running" or self.finished_at:
+            lines.append(f"⏱ {elapsed:.0f} с, {speed:.1f} сообщ./с")
+        if self.retries:
+            lines.append(f"⏳ Повторных попыток: {self.retries}")
+        return "\n".join(lines)
+
+
+class BroadcastEngine:
+    """Рассылка в фоне: пул отправителей с общим темпом (RateLimiter),
+    повтор после retry_after и временных ошибок, прогресс - правкой одного
+    сообщения у администратора.
+
+    Рассылка хранится в broadcast_messages, получатели - в broadcast_deliveries:
+    пачка получателей записывается (claim) до отправки, итоги - пачками после.
+    После перезапуска незавершённая рассылка продолжается с контрольной точки.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        user_req: UserReq,
+        broadcast_req: BroadcastReq,
+        rate: float = 25.0,
+        workers: int = 8,
+        progress_interval: float = 3.0,
+        max_attempts: int = 3,
+        claim_size: int = 200,
+        limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.bot = bot
+        self.user_req = user_req
+        self.broadcast_req = broadcast_req
+        # Общий на бота темп (тот же передаётся рассылке курсов): лимит Telegram
+        # и retry_after действуют на токен, а не на отдельную рассылку
+        self.limiter = limiter or RateLimiter(rate)
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.max_attempts = max_attempts
+        self.claim_size = claim_size
+        self.active: Optional[BroadcastJob] = None
+
+    async def start(
+        self, chat_id: int, text: str, photo: Optional[str] = None
+    ) -> Optional[BroadcastJob]:
+        """Запускает рассылку и сразу возвращает управление (None - уже идёт другая)"""
+        if self.active is not None:
+            return None
+        # Место занимаем до первого await, чтобы две рассылки не стартовали разом
+        self.active = BroadcastJob(0, text, photo, chat_id)
+        try:
+            total = await self.user_req.count_uids()
+            broadcast_id = await self.broadcast_req.create_broadcast(text, photo, chat_id, total)
+            job = BroadcastJob(broadcast_id, text, photo, chat_id, total)
+            status = await self.bot.send_message(
+                chat_id,
+                job.progress_text(),
+                reply_markup=await AdminKB.broadcast_controls(job.id, paused=False),
+                parse_mode=None,
+            )
+            job.status_message_id = status.message_id
+            await self.broadcast_req.set_status_message(job.id, status.message_id)
+        except Exception:
+            self.active = None
+            raise
+        self._launch(job)
+        return job
+
+    async def resume_unfinished(self) -> None:
+        """При старте бота: продолжить прерванную рассылку"""
+        rows = await self.broadcast_req.get_unfinished_broadcasts()
+        running: List[BroadcastJob] = []
+        for row in rows:
+            job = BroadcastJob.from_row(row)
+            job.unknown += await self.broadcast_req.mark_unknown(job.id)
+            if job.state == "running":
+                running.append(job)
+        if not running:
+            return
+        # Одновременно идёт одна рассылка: самую раннюю продолжаем, остальные - на паузу
+        job = running[0]
+        for other in running[1:]:
+            other.state = "paused"
+            await self.broadcast_req.set_broadcast_status(other.id, "paused")
+            await self._edit_status(
+                other,
+                self.limiter,
+                await AdminKB.broadcast_controls(other.id, paused=True),
+            )
+        logger.info(f"Продолжаем рассылку {job.id}: обработано {job.processed} из {job.total}")
+        self._launch(job)
+
+    async def pause(self, broadcast_id: int) -> bool:
+        job = self.active
+        if job is None or job.id != broadcast_id or job.state != "running":
+            return False
+        # Уже взятые получатели дорассылаются, новые не выдаются
+        job.state = "paused"
+        return True
+
+    async def resume(self, broadcast_id: int) -> bool:
+        if self.active is not None:
+            return False
+        row = await self.broadcast_req.get_broadcast(broadcast_id)
+        if row is None or row.status != "paused":
+            return False
+        if not await self.broadcast_req.set_broadcast_status(
+            broadcast_id, "running", expected="paused"
+        ):
+            return False
+        job = BroadcastJob.from_row(row)
+        job.state = "running"
+        self._launch(job)
+        return True
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        job = self.active
+        if job is not None and job.id == broadcast_id:
+            if job.state not in ("running", "paused"):
+                return False
+            # Оставшиеся в очереди получатели помечаются cancelled без отправки
+            job.state = "cancelled"
+            return True
+        if not await self.broadcast_req.set_broadcast_status(
+            broadcast_id, "cancelled", expected="paused"
+        ):
+            return False
+        row = await self.broadcast_req.get_broadcast(broadcast_id)
+        job = BroadcastJob.from_row(row)
+        job.finished_at = job.started_at
+        await self._edit_status(job, self.limiter, await AdminKB.admin_menu())
+        return True
+
+    async def stop(self) -> None:
+        """Остановка бота: рассылка остаётся running и продолжится после старта"""
+        job = self.active
+        if job and job.task and not job.task.done():
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+            await self._flush(job)
+
+    def _launch(self, job: BroadcastJob) -> None:
+        job.started_at = time.monotonic()
+        self.active = job
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: BroadcastJob) -> None:
+        limiter = self.limiter
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.claim_size)
+        workers = [
+            asyncio.create_task(self._worker(job, queue, limiter))
+            for _ in range(self.workers)
+        ]
+        progress = asyncio.create_task(self._report_progress(job, limiter))
+        # Взятые из БД, но ещё не переданные отправителям
+        backlog: Deque[int] = deque()
+        try:
+            while job.state == "running":
+                await self._flush(job)
+                backlog = deque(
+                    await self.broadcast_req.claim_recipients(job.id, self.claim_size)
+                )
+                if not backlog:
+                    job.state = "done"
+                    break
+                while backlog:
+                    await queue.put(backlog[0])
+                    backlog.popleft()
+            await queue.join()
+            await self._flush(job)
+            if job.state in ("done", "cancelled"):
+                job.finished_at = time.monotonic()
+            await self.broadcast_req.set_broadcast_status(job.id, job.state)
+            logger.info(
+                f"Рассылка {job.id} ({job.state}): успешно {job.sent}, "
+                f"не доставлено {job.failed}"
+            )
+        except Exception as e:
+            # Например, БД недоступна: ставим на паузу, администратор продолжит вручную
+            logger.error(f"Рассылка {job.id} прервана ошибкой: {e}")
+            job.state = "paused"
+            try:
+                # Переданные отправителям дорассылаются, как при обычной паузе:
+                # иначе прерванная отправка осталась бы pending без итога
+                await queue.join()
+                await self._flush(job)
+                await self.broadcast_req.set_broadcast_status(job.id, "paused")
+            except Exception:
+                pass
+        finally:
+            for task in (*workers, progress):
+                task.cancel()
+            await asyncio.gather(*workers, progress, return_exceptions=True)
+            # Остановка бота: взятые, но ещё не отправленные получатели
+            # вернутся в работу после перезапуска
+            while not queue.empty():
+                job.outcomes[queue.get_nowait()] = "requeued"
+            for uid in backlog:
+                job.outcomes[uid] = "requeued"
+            # Иначе они останутся pending: продолжение их не выдаст, а после
+            # перезапуска они станут unknown
+            try:
+                await self._flush(job)
+            except Exception as e:
+                logger.error(f"Рассылка {job.id}: не удалось вернуть получателей в очередь: {e}")
+            self.active = None
+        if job.state == "paused":
+            markup = await AdminKB.broadcast_controls(job.id, paused=True)
+        else:
+            markup = await AdminKB.admin_menu()
+        await self._edit_status(job, limiter, markup)
+
+    async def _flush(self, job: BroadcastJob) -> None:
+        async with job.flush_lock:
+            outcomes, job.outcomes = job.outcomes, {}
+            unreachable, job.unreachable_uids = job.unreachable_uids, []
+            try:
+                await self.broadcast_req.save_outcomes(job.id, outcomes, job.sent, job.failed)
+            except Exception:
+                # Не потеряем итоги: запишем со следующей пачкой
+                job.outcomes = {**outcomes, **job.outcomes}
+                job.unreachable_uids = unreachable + job.unreachable_uids
+                raise
+            try:
+                await self.user_req.mark_unreachable(unreachable)
+            except Exception as e:
+                # Не критично: пользователь снова получит ошибку в следующей рассылке
+                logger.warning(f"Рассылка: не удалось пометить недоступных: {e}")
+
+    async def _worker(self, job: BroadcastJob, queue: asyncio.Queue, limiter: RateLimiter) -> None:
+        while True:
+            uid = await queue.get()
+            try:
+                if job.state == "cancelled":
+                    job.record(uid, "cancelled")
+                else:
+                    job.record(uid, await self._deliver(job, uid, limiter))
+            except asyncio.CancelledError:
+                # Остановка бота до запроса к Telegram: сообщение точно не ушло
+                if uid not in job.sending:
+                    job.outcomes[uid] = "requeued"
+                raise
+            except Exception as e:
+                logger.error(f"Рассылка: ошибка отправки {uid}: {e}")
+                job.record(uid, "failed")
+            finally:
+                job.sending.discard(uid)
+                queue.task_done()
+
+    async def _deliver(self, job: BroadcastJob, uid: int, limiter: RateLimiter) -> str:
+        """Итог отправки: sent, failed или один из UNREACHABLE_OUTCOMES"""
+        for attempt in range(1, self.max_attempts + 1):
+            await limiter.acquire(uid)
+            job.sending.add(uid)
+            try:
+                if job.photo:
+                    await self.bot.send_photo(uid, job.photo, caption=job.text)
+                else:
+                    await self.bot.send_message(uid, job.text)
+                job.sending.discard(uid)
+                return "sent"
+            except TelegramRetryAfter as e:
+                job.sending.discard(uid)
+                logger.warning(f"Рассылка: Telegram просит паузу {e.retry_after} с")
+                limiter.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                # Таймаут: сообщение могло дойти, поэтому uid остаётся в sending
+                logger.warning(f"Рассылка: временная ошибка для {uid}: {e}")
+                await asyncio.sleep(attempt)
+            except TelegramAPIError as e:
+                # Бот заблокирован, чат не найден и т.п. - повтор не поможет
+                job.sending.discard(uid)
+                outcome = classify_delivery_error(e)
+                if outcome == "failed":
+                    logger.warning(f"Рассылка: не удалось отправить {uid}: {e}")
+                return outcome
+            job.retries += 1
+        return "failed"
+
+    async def _report_progress(self, job: BroadcastJob, limiter: RateLimiter) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                await self._flush(job)
+            except Exception as e:
+                logger.warning(f"Рассылка: не удалось сохранить прогресс: {e}")
+            await self._edit_status(
+                job, limiter, await AdminKB.broadcast_controls(job.id, paused=False)
+            )
+
+    async def _edit_status(
+        self,
+        job: BroadcastJob,
+        limiter: RateLimiter,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ) -> None:
+        if job.status_message_id is None:
+            return
+        final = job.state != "running"
+        for _ in range(self.max_attempts if final else 1):
+            await limiter.acquire(job.chat_id)
+            try:
+                await self.bot.edit_message_text(
+                    job.progress_text(),
+                    chat_id=job.chat_id,
+                    message_id=job.status_message_id,
+                    reply_markup=reply_markup,
+                    parse_mode=None,
+                )
+                return
+            except TelegramRetryAfter as e:
+                # Промежуточный прогресс можно пропустить, итог - нет
+                limiter.pause(e.retry_after)
+            except TelegramBadRequest as e:
+                # "message is not modified" - прогресс не изменился с прошлого раза
+                if "not modified" not in str(e):
+                    logger.warning(f"Рассылка: не удалось обновить статус: {e}")
+                return
+            except TelegramAPIError as e:
+                logger.warning(f"Рассылка: не удалось обновить статус: {e}")
+                return
@@ -39,6 +39,15 @@ class MiningCalculator:
 
         return params
 
+    @staticmethod
+    def network_hashrate_unit(algorithm: str) -> str:
+        """Единицы хешрейта сети в algorithm_data и coin_network_params:
+        те же, что у хешрейта майнера, кроме Etchash - сеть хранится в MH/s
+        (см. приведение единиц в calculate_profitability)"""
+        if algorithm.lower() in ["etchash", "ethash", "etchash/ethash"]:
+            return "mh/s"
+        return MiningCalculator.get_algorithm_params(algorithm)["hashrate_unit"]
+
     @staticmethod
     def calculate_profitability(
         hash_rate: float,
@@ -171,28 +180,17 @@ class MiningCalculator:
         total_daily_income_usd = 0.0
         total_daily_income_rub = 0.0
         
-        # Определяем block_time по умолчанию для алгоритма
+        # Определяем block_time по умолчанию для алгоритма;
+        # block_time монеты (из coin_network_params) приходит в coin_data
         default_block_time = algo_params["block_time"]
         
-        # Для Scrypt: LTC=150, DOGE=60
-        if algorithm.lower() == "scrypt":
-            scrypt_block_times = {
-                "LTC": 150,
-                "DOGE": 60
-            }
-        else:
-            scrypt_block_times = {}
-        
         for symbol, coin_info in coin_data.items():
             # ШАГ 1: Рассчитываем долю майнера для ЭТОЙ конкретной монеты (с её network_hashrate!)
             coin_network_hash = coin_info["network_hashrate"]
             share = miner_hash / coin_network_hash if coin_network_hash > 0 else 0
             
             # Определяем block_time для конкретной монеты
-            if symbol in scrypt_block_times:
-                block_time = scrypt_block_times[symbol]
-            else:
-                block_time = coin_info.get("block_time", default_block_time)
+            block_time = coin_info.get("block_time") or default_block_time
             
             # ШАГ 2: Блоков в день
             if algorithm.lower() == "kheavyhash":
@@ -0,0 +1,470 @@
+import csv
+import io
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+from database.models import Algorithm, Manufacturer, parse_coin_symbols
+from database.read_models import AsicModelRow, ModelLineRow
+from database.request import CalculatorReq
+from utils.calculator import MiningCalculator
+
+logger = logging.getLogger(__name__)
+
+SHA256_COINS = "BTC, BCH, BSV, LCC, TRC, XJO, ACOIN, PPC, UNB, CRW, CURE"
+
+_UNIT_FACTORS = {"K": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15}
+# "82 TH/s", "110TH/s", "2Th/s", "850mh", "1.18TH", "17,6 GH/s"
+_HASHRATE = re.compile(r"(\d+(?:[.,]\d+)?)\s*([KMGTP])H(/S)?(?![A-Z0-9])", re.IGNORECASE)
+_UNIT = re.compile(r"([KMGTP])H(/S)?", re.IGNORECASE)
+_POWER = re.compile(r"(\d+(?:[.,]\d+)?)\s*W\s*$", re.IGNORECASE)
+# В прайсах встречается кириллица, похожая на латиницу ("Whatsminer М61")
+_LOOKALIKES = str.maketrans("АВЕКМНОРСТХаеорсх", "ABEKMHOPCTXaeopcx")
+_SPACES = re.compile(r"\s+")
+
+
+class LineRule(NamedTuple):
+    """Модель, название которой подходит под pattern, попадает в линейку line"""
+
+    pattern: Pattern
+    line: str
+    algorithm: Algorithm
+    get_coin: str
+    # Единица хранения хешрейта; None - число как в прайсе (так заполнял fill_asic_models.py)
+    unit: Optional[str] = None
+
+
+class VendorFile(NamedTuple):
+    filename: str
+    manufacturer: Manufacturer
+    rules: Tuple[LineRule, ...]
+    # Бренд, который дописывается к названию, если его нет в строке прайса
+    brand: str = ""
+    # Хешрейт вида "200 GH/s" остаётся в названии модели
+    hashrate_in_name: bool = True
+
+
+def _rule(pattern: str, line: str, algorithm: Algorithm, get_coin: str,
+          unit: Optional[str] = None) -> LineRule:
+    return LineRule(re.compile(pattern, re.IGNORECASE), line, algorithm, get_coin, unit)
+
+
+VENDOR_FILES = (
+    VendorFile(
+        "bitmain.txt",
+        Manufacturer.BITMAIN,
+        (
+            _rule(r"\bS19", "S19", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bS21|\bU3S21", "S21", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bT21", "T21", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bL7\b", "L7", Algorithm.SCRYPT, "LTC, DOGE"),
+            _rule(r"\bL9\b", "L9", Algorithm.SCRYPT, "LTC, DOGE"),
+            _rule(r"\bE9\b", "E9", Algorithm.ETCHASH, "ETC, ETHW"),
+            _rule(r"\bKA3\b", "KA3", Algorithm.BLAKE2S, "KDA"),
+            _rule(r"\bKAS\b", "KAS", Algorithm.KHEAVYHASH, "KASPA", unit="TH/s"),
+        ),
+    ),
+    VendorFile(
+        "whatsminer.txt",
+        Manufacturer.WHATSMINER,
+        (
+            _rule(r"\bM5\d", "M50", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bM3\d", "M30", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bM60", "M60", Algorithm.SHA256, SHA256_COINS),
+            _rule(r"\bM61", "M61", Algorithm.SHA256, SHA256_COINS),
+        ),
+    ),
+    VendorFile(
+        "Ice River.txt",
+        Manufacturer.ICERIVER,
+        (_rule(r"", "Ice River", Algorithm.KHEAVYHASH, "KASPA", unit="TH/s"),),
+        brand="IceRiver",
+        hashrate_in_name=False,
+    ),
+    VendorFile(
+        "Goldshell.txt",
+        Manufacturer.GOLDSHELL,
+        (
+            # Линейка Goldshell исторически заведена как SHA256, монеты - по модели
+            _rule(r"\bE-DG", "Goldshell", Algorithm.SHA256, "DOGE"),
+            _rule(r"\bE-KA|\bKA BOX", "Goldshell", Algorithm.SHA256, "KDA"),
+            _rule(r"\bAL BOX", "Goldshell", Algorithm.SHA256, "KLS"),
+        ),
+        hashrate_in_name=False,
+    ),
+    VendorFile(
+        "iPollo.txt",
+        Manufacturer.IPOLLO,
+        (_rule(r"", "iPollo", Algorithm.ETCHASH, "ETC, ETH"),),
+    ),
+)
+
+# В прайсе у KS5 хешрейт не указан - паспортные значения, TH/s
+HASHRATE_OVERRIDES = {
+    "Bitmain Antminer KAS Miner KS5": 20.0,
+    "Bitmain Antminer KAS Miner KS5 Pro": 21.0,
+}
+
+
+class ImportRow(NamedTuple):
+    manufacturer: Manufacturer
+    line: str
+    algorithm: Algorithm
+    name: str
+    hash_rate: float
+    unit: str
+    power_consumption: float
+    get_coin: str
+
+
+class CatalogImportError(ValueError):
+    """Строка прайса, из которой не удалось собрать модель"""
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def _convert(value: float, unit: str, target: Optional[str]) -> Tuple[float, str]:
+    if target is None or target.upper() == unit.upper():
+        return value, unit
+    converted = value * _UNIT_FACTORS[unit[0].upper()] / _UNIT_FACTORS[target[0].upper()]
+    return round(converted, 6), target
+
+
+def parse_vendor_line(text: str, vendor: VendorFile) -> ImportRow:
+    """'Bitmain Antminer S19 82 TH/s 3250W' -> ImportRow"""
+    text = _SPACES.sub(" ", text.translate(_LOOKALIKES)).strip()
+    power_match = _POWER.search(text)
+    if power_match is None:
+        raise CatalogImportError(f"нет потребления (…W): {text}")
+    power = _number(power_match.group(1))
+    text = text[: power_match.start()].strip()
+
+    hashrate_match = None
+    for hashrate_match in _HASHRATE.finditer(text):
+        pass
+    if hashrate_match is not None:
+        hash_rate = _number(hashrate_match.group(1))
+        unit = f"{hashrate_match.group(2).upper()}H/s"
+        # "KA BOX 1.18TH" - часть торгового названия, "3400 MH/s" - нет
+        if not vendor.hashrate_in_name and hashrate_match.group(3):
+            text = text[: hashrate_match.start()].strip()
+    elif text in HASHRATE_OVERRIDES:
+        hash_rate, unit = HASHRATE_OVERRIDES[text], "TH/s"
+    else:
+        raise CatalogImportError(f"нет хешрейта: {text}")
+
+    name = text
+    if vendor.brand and not name.lower().startswith(vendor.brand.lower()):
+        name = f"{vendor.brand} {name}"
+
+    for rule in vendor.rules:
+        if rule.pattern.search(name):
+            hash_rate, unit = _convert(hash_rate, unit, rule.unit)
+            return ImportRow(
+                manufacturer=vendor.manufacturer,
+                line=rule.line,
+                algorithm=rule.algorithm,
+                name=name,
+                hash_rate=hash_rate,
+                unit=unit,
+                power_consumption=power,
+                get_coin=rule.get_coin,
+            )
+    raise CatalogImportError(f"не определена линейка: {name}")
+
+
+def parse_vendor_file(path: str, vendor: VendorFile) -> Tuple[List[ImportRow], List[str]]:
+    """Модели из прайса и список строк, которые не удалось разобрать"""
+    rows: List[ImportRow] = []
+    errors: List[str] = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(parse_vendor_line(line, vendor))
+            except CatalogImportError as e:
+                errors.append(f"{os.path.basename(path)}:{number}: {e}")
+    return rows, errors
+
+
+def load_vendor_files(directory: str) -> Tuple[List[ImportRow], List[str]]:
+    rows: List[ImportRow] = []
+    errors: List[str] = []
+    for vendor in VENDOR_FILES:
+        path = os.path.join(directory, vendor.filename)
+        if not os.path.exists(path):
+            errors.append(f"{vendor.filename}: файл не найден")
+            continue
+        file_rows, file_errors = parse_vendor_file(path, vendor)
+        rows.extend(file_rows)
+        errors.extend(file_errors)
+    return rows, errors
+
+
+# Документ с каталогом, загруженный администратором: CSV (разделитель "," или ";")
+# или JSON - список объектов с теми же полями
+DOCUMENT_FIELDS = (
+    "manufacturer", "line", "algorithm", "name", "hash_rate", "power", "coins", "unit",
+)
+DOCUMENT_REQUIRED = DOCUMENT_FIELDS[:-1]
+
+
+def _enum_member(enum, value: Any):
+    """Производитель/алгоритм по имени ("BITMAIN") или значению ("Bitmain")"""
+    text = str(value or "").strip().lower()
+    for member in enum:
+        if text in (member.name.lower(), member.value.lower()):
+            return member
+    raise CatalogImportError(f"неизвестное значение {enum.__name__}: {value!r}")
+
+
+def _positive(value: Any, field: str) -> float:
+    try:
+        number = value if isinstance(value, (int, float)) else _number(str(value).strip())
+    except ValueError:
+        raise CatalogImportError(f"{field}: не число: {value!r}")
+    if not number > 0:
+        raise CatalogImportError(f"{field}: должно быть больше нуля")
+    return float(number)
+
+
+def _document_hashrate(value: Any, unit: Any, algorithm: Algorithm) -> Tuple[float, str]:
+    """Хешрейт в единицах, в которых калькулятор считает алгоритм линейки.
+    Без unit число уже в этих единицах"""
+    hash_rate = _positive(value, "hash_rate")
+    unit_name = MiningCalculator.get_algorithm_params(algorithm.value)["hashrate_unit"]
+    target = f"{unit_name[0].upper()}H/s"
+    text = str(unit or "").strip()
+    if not text:
+        return hash_rate, target
+    match = _UNIT.fullmatch(text.replace(" ", ""))
+    if match is None:
+        raise CatalogImportError(f"unit: неизвестная единица {unit!r}")
+    return _convert(hash_rate, f"{match.group(1).upper()}H/s", target)
+
+
+def parse_document_row(record: Dict[str, Any]) -> ImportRow:
+    missing = [field for field in DOCUMENT_REQUIRED if not str(record.get(field) or "").strip()]
+    if missing:
+        raise CatalogImportError(f"не заполнены поля: {', '.join(missing)}")
+    coins = parse_coin_symbols(str(record["coins"]))
+    if not coins:
+        raise CatalogImportError(f"нет монет: {record['coins']!r}")
+    algorithm = _enum_member(Algorithm, record["algorithm"])
+    hash_rate, unit = _document_hashrate(record["hash_rate"], record.get("unit"), algorithm)
+    return ImportRow(
+        manufacturer=_enum_member(Manufacturer, record["manufacturer"]),
+        line=_SPACES.sub(" ", str(record["line"])).strip(),
+        algorithm=algorithm,
+        name=_SPACES.sub(" ", str(record["name"]).translate(_LOOKALIKES)).strip(),
+        hash_rate=hash_rate,
+        unit=unit,
+        power_consumption=_positive(record["power"], "power"),
+        get_coin=", ".join(coins),
+    )
+
+
+def _csv_records(content: bytes) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8-sig", newline="")
+    header = text.readline()
+    # Excel с русской локалью сохраняет CSV через ";"
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    fields = [field.strip().lower() for field in next(csv.reader([header], delimiter=delimiter))]
+    missing = [field for field in DOCUMENT_REQUIRED if field not in fields]
+    if missing:
+        raise CatalogImportError(f"в заголовке CSV нет колонок: {', '.join(missing)}")
+    for number, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if any(value.strip() for value in values):
+            yield number, dict(zip(fields, values))
+
+
+def _json_records(content: bytes) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    try:
+        data = json.loads(content.decode("utf-8-sig"))
+    except ValueError as e:
+        raise CatalogImportError(f"некорректный JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("models")
+    if not isinstance(data, list):
+        raise CatalogImportError('JSON: ожидается список моделей или {"models": [...]}')
+    for number, record in enumerate(data, start=1):
+        yield number, record if isinstance(record, dict) else {}
+
+
+def parse_catalog_document(
+    content: bytes, filename: str
+) -> Tuple[List[ImportRow], List[str]]:
+    """Модели из CSV/JSON документа и ошибки вида "строка N: причина".
+    Документ проверяется за один проход; ошибка в строке не останавливает разбор"""
+    if filename.lower().endswith(".json"):
+        records = _json_records(content)
+        label = "запись"
+    elif filename.lower().endswith(".csv"):
+        records = _csv_records(content)
+        label = "строка"
+    else:
+        raise CatalogImportError("поддерживаются только файлы .csv и .json")
+    rows: List[ImportRow] = []
+    errors: List[str] = []
+    for number, record in records:
+        try:
+            rows.append(parse_document_row(record))
+        except CatalogImportError as e:
+            errors.append(f"{label} {number}: {e}")
+    return rows, errors
+
+
+class CatalogDiff:
+    """Что изменится в каталоге после импорта"""
+
+    def __init__(self) -> None:
+        # (производитель, линейка, алгоритм)
+        self.new_lines: List[Tuple[Manufacturer, str, Algorithm]] = []
+        # (id линейки, новый алгоритм)
+        self.line_updates: List[Tuple[int, Algorithm]] = []
+        self.inserts: List[ImportRow] = []
+        # (id модели, новые данные, поменялся ли список монет)
+        self.updates: List[Tuple[int, ImportRow, bool]] = []
+        self.deactivations: List[AsicModelRow] = []
+        self.unchanged = 0
+        self.duplicates: List[str] = []
+
+    @property
+    def is_empty(self) -> bool:
+        return not (
+            self.new_lines or self.line_updates or self.inserts
+            or self.updates or self.deactivations
+        )
+
+    def summary(self) -> str:
+        lines = [
+            f"Новых линеек: {len(self.new_lines)}",
+            f"Новых моделей: {len(self.inserts)}",
+            f"Изменённых моделей: {len(self.updates)}",
+            f"Снимаются с продажи: {len(self.deactivations)}",
+            f"Без изменений: {self.unchanged}",
+        ]
+        if self.line_updates:
+            lines.insert(1, f"Меняется алгоритм линеек: {len(self.line_updates)}")
+        if self.duplicates:
+            lines.append(f"Повторы в прайсе (взята последняя строка): {len(self.duplicates)}")
+        return "\n".join(lines)
+
+    def preview(self, limit: int = 15) -> List[str]:
+        """Первые изменения построчно - для подтверждения перед применением"""
+        changes = [f"➕ {row.name}" for row in self.inserts]
+        changes += [f"✏️ {row.name}" for _, row, _ in self.updates]
+        changes += [f"⛔ {model.name}" for model in self.deactivations]
+        if len(changes) > limit:
+            changes = changes[:limit] + [f"… и ещё {len(changes) - limit}"]
+        return changes
+
+
+def _same(a: float, b: float) -> bool:
+    return abs((a or 0) - (b or 0)) <= 1e-9 * max(1.0, abs(a or 0), abs(b or 0))
+
+
+def diff_catalog(
+    rows: Iterable[ImportRow],
+    lines: Iterable[ModelLineRow],
+    models: Iterable[AsicModelRow],
+    deactivate_missing: bool = True,
+) -> CatalogDiff:
+    """Сравнение прайса с каталогом. Модели сопоставляются по (производитель,
+    линейка, название); активные модели производителей из прайса, которых в
+    прайсе нет, снимаются с продажи (is_active=False), а не удаляются -
+    на них могут ссылаться заявки. deactivate_missing=False - только добавить
+    и обновить (документ с частью каталога)."""
+    diff = CatalogDiff()
+    line_by_key = {(line.manufacturer, line.name): line for line in lines}
+    models_by_line: Dict[int, Dict[str, AsicModelRow]] = {}
+    for model in models:
+        models_by_line.setdefault(model.model_line_id, {})[model.name] = model
+
+    wanted: Dict[Tuple[Manufacturer, str, str], ImportRow] = {}
+    for row in rows:
+        key = (row.manufacturer, row.line, row.name)
+        if key in wanted:
+            diff.duplicates.append(row.name)
+        wanted[key] = row
+
+    seen_lines = set()
+    seen_models = set()
+    for (manufacturer, line_name, name), row in wanted.items():
+        line = line_by_key.get((manufacturer, line_name))
+        if line is None:
+            if (manufacturer, line_name) not in seen_lines:
+                diff.new_lines.append((manufacturer, line_name, row.algorithm))
+            seen_lines.add((manufacturer, line_name))
+            diff.inserts.append(row)
+            continue
+        if line.algorithm != row.algorithm and (manufacturer, line_name) not in seen_lines:
+            diff.line_updates.append((line.id, row.algorithm))
+        seen_lines.add((manufacturer, line_name))
+
+        model = models_by_line.get(line.id, {}).get(name)
+        if model is None:
+            diff.inserts.append(row)
+            continue
+        seen_models.add(model.id)
+        coins_changed = tuple(parse_coin_symbols(row.get_coin)) != model.coins
+        if (
+            coins_changed
+            or not model.is_active
+            or not _same(model.hash_rate, row.hash_rate)
+            or not _same(model.power_consumption, row.power_consumption)
+        ):
+            diff.updates.append((model.id, row, coins_changed))
+        else:
+            diff.unchanged += 1
+
+    if not deactivate_missing:
+        return diff
+    manufacturers = {row.manufacturer for row in wanted.values()}
+    for (manufacturer, _), line in line_by_key.items():
+        if manufacturer not in manufacturers:
+            continue
+        for model in models_by_line.get(line.id, {}).values():
+            if model.is_active and model.id not in seen_models:
+                diff.deactivations.append(model)
+    return diff
+
+
+class CatalogImporter:
+    """Импорт каталога ASIC: разбор прайсов, сравнение с БД и применение
+    всех изменений одной транзакцией"""
+
+    def __init__(self, calc_req: CalculatorReq) -> None:
+        self.calc_req = calc_req
+
+    async def plan(
+        self, rows: Iterable[ImportRow], deactivate_missing: bool = True
+    ) -> CatalogDiff:
+        catalog = self.calc_req.catalog
+        # Сравниваем со свежим состоянием primary, а не с кэшем в памяти
+        await catalog.load()
+        return diff_catalog(
+            rows, await catalog.all_lines(), await catalog.all_models(), deactivate_missing
+        )
+
+    async def apply(self, diff: CatalogDiff) -> None:
+        if diff.is_empty:
+            return
+        await self.calc_req.apply_catalog_diff(diff)
+        logger.info(f"Каталог обновлён из прайса:\n{diff.summary()}")
+
+    async def import_rows(
+        self,
+        rows: Iterable[ImportRow],
+        dry_run: bool = False,
+        deactivate_missing: bool = True,
+    ) -> CatalogDiff:
+        diff = await self.plan(rows, deactivate_missing)
+        if not dry_run:
+            await self.apply(diff)
+        return diff
@@ -53,6 +53,7 @@ class CoinGeckoService:
             "ETHW": "ethereum-pow-iou",
         }
         self.bot = settings.bot
+        self.price_notifier = settings.price_notifier
 
     async def get_binance_p2p_price(self, asset: str, fiat: str = "RUB") -> Optional[float]:
         """Получение цены P2P с Binance. Возвращает среднюю цену из топ-5 объявлений"""
@@ -377,6 +378,9 @@ class CoinGeckoService:
             logger.error(f"Ошибка при обновлении цен: {e}", exc_info=True)
 
     async def send_price_notification(self, prices_data: Dict[str, Dict]):
+        # Текст готовится один раз на снимок цен, рассылка идёт в фоне
+        if not self.price_notifier.enabled:
+            return
         try:
             coins = await self.coin_req.get_all_coins()
 
@@ -407,18 +411,7 @@ class CoinGeckoService:
                         f"   {change_icon} {data['price_change']:+.1f}%\n\n"
                     )
 
-            # users = await self.user_req.get_all_users()
-            # for user in users:
-            #     if user.notifications:
-            #         try:
-            #             await self.bot.send_message(
-            #                 user.uid, message, parse_mode="Markdown"
-            #             )
-            #             await asyncio.sleep(0.1)
-            #         except Exception as e:
-            #             logger.error(
-            #                 f"Не удалось отправить уведомление пользователю {user.uid}: {e}"
-            #             )
+            self.price_notifier.notify(message)
 
             # Отправка в канал временно отключена
             # Делаем пост с курсом валют и монет в канал Asic Store (https://t.me/asic_mining_store)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+from database.request import AiConversationReq
+from utils.ai_service import create_chat
+
+logger = logging.getLogger(__name__)
+
+# Чаты ishushka живут 48ч, берём с запасом, чтобы не упереться в 404
+CONVERSATION_TTL = timedelta(hours=47)
+
+
+class ConversationManager:
+    """Привязка пользователей к чатам AI-сервиса.
+
+    Привязки хранятся в БД и кэшируются в памяти (LRU). Дополнительно держим
+    небольшой пул заранее созданных чатов, чтобы первое сообщение пользователя
+    не ждало лишнего запроса create_chat.
+    """
+
+    def __init__(
+        self,
+        conversation_req: AiConversationReq,
+        cache_size: int = 10_000,
+        pool_size: int = 5,
+        chat_factory: Callable[[], Awaitable[Optional[str]]] = create_chat,
+    ) -> None:
+        self.conversation_req = conversation_req
+        self.cache_size = cache_size
+        self.pool_size = pool_size
+        self.chat_factory = chat_factory
+        self._cache: "OrderedDict[int, Tuple[str, datetime]]" = OrderedDict()
+        self._pool: Deque[Tuple[str, datetime]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._schedule_refill()
+
+    async def stop(self) -> None:
+        if self._refill_task and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def pool_available(self) -> int:
+        return len(self._pool)
+
+    async def get_conversation(self, uid: int) -> Optional[str]:
+        """Актуальный чат пользователя из кэша или БД (None, если нет или истёк)"""
+        entry = self._cache.get(uid)
+        if entry is not None:
+            self._cache.move_to_end(uid)
+        else:
+            entry = await self.conversation_req.get_conversation(uid)
+            if entry is None:
+                return None
+            self._remember(uid, entry)
+
+        conversation_id, created_at = entry
+        if self._is_expired(created_at):
+            self._cache.pop(uid, None)
+            return None
+        return conversation_id
+
+    async def new_conversation(self, uid: int) -> Optional[str]:
+        """Выдать пользователю новый чат: из пула, а если он пуст — создать сразу"""
+        entry = self._take_from_pool()
+        if entry is None:
+            conversation_id = await self.chat_factory()
+            entry = (conversation_id, datetime.now()) if conversation_id else None
+        self._schedule_refill()
+
+        if entry is None:
+            return None
+        self._remember(uid, entry)
+        await self.conversation_req.save_conversation(uid, *entry)
+        return entry[0]
+
+    async def get_or_create(self, uid: int) -> Optional[str]:
+        conversation_id = await self.get_conversation(uid)
+        if conversation_id:
+            return conversation_id
+        return await self.new_conversation(uid)
+
+    def _remember(self, uid: int, entry: Tuple[str, datetime]) -> None:
+        self._cache[uid] = entry
+        self._cache.move_to_end(uid)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _take_from_pool(self) -> Optional[Tuple[str, datetime]]:
+        while self._pool:
+            entry = self._pool.popleft()
+            if not self._is_expired(entry[1]):
+                return entry
+        return None
+
+    @staticmethod
+    def _is_expired(created_at: Optional[datetime]) -> bool:
+        return created_at is None or datetime.now() - created_at > CONVERSATION_TTL
+
+    def _schedule_refill(self) -> None:
+        if self.pool_size <= 0:
+            return
+        if self._refill_task and not self._refill_task.done():
+            return
+        if len(self._pool) >= self.pool_size:
+            return
+        self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while len(self._pool) < self.pool_size:
+            conversation_id = await self.chat_factory()
+            if not conversation_id:
+                # Сервис недоступен — попробуем при следующей выдаче чата
+                logger.warning("Не удалось пополнить пул чатов AI-сервиса")
+                return
+            self._pool.append((conversation_id, datetime.now()))
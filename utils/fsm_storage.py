@@ -0,0 +1,242 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple, Type
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from database.models import Algorithm, Manufacturer, UserStatus
+from database.request import FsmReq
+
+logger = logging.getLogger(__name__)
+
+# Перечисления, которые обработчики кладут в данные FSM. Они наследуют str,
+# и json.dumps записал бы их как обычную строку - тегируем явно
+FSM_ENUMS: Dict[str, Type[Enum]] = {
+    enum.__name__: enum for enum in (Algorithm, Manufacturer, UserStatus)
+}
+_ENUM_TAG = "$e"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Enum) and type(value).__name__ in FSM_ENUMS:
+        return {_ENUM_TAG: type(value).__name__, "v": value.name}
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    enum_name = obj.get(_ENUM_TAG)
+    if enum_name is not None and len(obj) == 2:
+        return FSM_ENUMS[enum_name][obj["v"]]
+    return obj
+
+
+def dumps_data(data: Mapping[str, Any]) -> Optional[str]:
+    """Компактный JSON данных FSM; None для пустых данных"""
+    if not data:
+        return None
+    return json.dumps(_encode(dict(data)), ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_data(raw: Optional[str]) -> Dict[str, Any]:
+    if not raw:
+        return {}
+    return json.loads(raw, object_hook=_decode_object)
+
+
+def storage_key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        )
+    )
+
+
+class _Record:
+    __slots__ = ("key", "state", "data", "updated_at")
+
+    def __init__(
+        self, key: str, state: Optional[str], data: Dict[str, Any], updated_at: datetime
+    ) -> None:
+        self.key = key
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+
+
+class SqlStorage(BaseStorage):
+    """FSM aiogram в БД бота (fsm_states): диалоги калькулятора, продажи
+    и AI переживают деплой и падение.
+
+    Чтение и запись идут через кэш в памяти: апдейт не ждёт БД, если чат
+    уже в кэше. Изменённые ключи пишутся пачкой раз в flush_interval секунд
+    (write-behind) и при close(). Диалог, не менявшийся ttl секунд, считается
+    брошенным и начинается заново; такие строки удаляются раз в purge_interval.
+    Кэш у каждого процесса свой: апдейты одного чата должен обрабатывать
+    один процесс.
+    """
+
+    def __init__(
+        self,
+        fsm_req: FsmReq,
+        ttl: float = 3 * 24 * 3600,
+        flush_interval: float = 1.0,
+        cache_size: int = 10_000,
+        purge_interval: float = 3600,
+    ) -> None:
+        self.fsm_req = fsm_req
+        self.ttl = timedelta(seconds=ttl)
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.purge_interval = purge_interval
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # Ключи пачки, которая пишется сейчас: до успешной записи их нельзя вытеснять
+        self._flushing: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self.purge()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def _expired(self, record: _Record, now: datetime) -> bool:
+        return now - record.updated_at > self.ttl
+
+    async def _record(self, key: StorageKey) -> _Record:
+        raw_key = storage_key(key)
+        now = datetime.now()
+        record = self._cache.get(raw_key)
+        if record is None:
+            row = await self.fsm_req.get(raw_key)
+            # Пока ждали БД, этот чат мог записать другой апдейт - его данные новее
+            record = self._cache.get(raw_key)
+            if record is None:
+                if row is None:
+                    record = _Record(raw_key, None, {}, now)
+                else:
+                    state, data, updated_at = row
+                    record = _Record(raw_key, state, loads_data(data), updated_at)
+                self._cache[raw_key] = record
+                self._evict()
+        else:
+            self._cache.move_to_end(raw_key)
+        if self._expired(record, now):
+            record.state, record.data, record.updated_at = None, {}, now
+        return record
+
+    def _touch(self, record: _Record) -> None:
+        record.updated_at = datetime.now()
+        self._dirty.add(record.key)
+
+    def _pending(self, raw_key: str) -> bool:
+        return raw_key in self._dirty or raw_key in self._flushing
+
+    def _evict(self) -> None:
+        # Вытесняем давно не использованные ключи, кроме ещё не записанных
+        excess = len(self._cache) - self.cache_size
+        if excess <= 0:
+            return
+        for raw_key in list(self._cache):
+            if excess <= 0:
+                break
+            if not self._pending(raw_key):
+                del self._cache[raw_key]
+                excess -= 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        record = await self._record(key)
+        record.data = data.copy()
+        self._touch(record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key)).data.copy()
+
+    async def flush(self) -> None:
+        """Записать изменённые ключи одним запросом"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows: List[Tuple[str, Optional[str], Optional[str], datetime]] = []
+        deleted: List[str] = []
+        for raw_key in dirty:
+            record = self._cache.get(raw_key)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deleted.append(raw_key)
+                continue
+            try:
+                data = dumps_data(record.data)
+            except (TypeError, ValueError) as e:
+                # Иначе пачка не запишется никогда; диалог останется только в памяти
+                logger.error(f"FSM: данные {raw_key} не сериализуются в JSON: {e}")
+                continue
+            rows.append((raw_key, record.state, data, record.updated_at))
+        self._flushing = dirty
+        try:
+            await self.fsm_req.save_many(rows, deleted)
+        except Exception:
+            # Запишем со следующей пачкой; записи остались в кэше
+            self._dirty |= dirty
+            raise
+        finally:
+            self._flushing = set()
+
+    async def purge(self) -> int:
+        """Удалить брошенные диалоги из БД и кэша"""
+        now = datetime.now()
+        for raw_key, record in list(self._cache.items()):
+            if not self._pending(raw_key) and self._expired(record, now):
+                del self._cache[raw_key]
+        purged = await self.fsm_req.purge(now - self.ttl)
+        if purged:
+            logger.info(f"FSM: удалено брошенных диалогов: {purged}")
+        return purged
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_purge = loop.time() + self.purge_interval
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if loop.time() >= next_purge:
+                    next_purge = loop.time() + self.purge_interval
+                    await self.purge()
+            except Exception as e:
+                logger.warning(f"FSM: не удалось сохранить состояния: {e}")
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+from database.request import MediaReq
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = Path(__file__).resolve().parent.parent / "image"
+
+# Локальные файлы, которые бот отправляет пользователям
+MEDIA_ASSETS = {
+    "logo": IMAGE_DIR / "logo.JPG",
+    "repair_guide": IMAGE_DIR / "repare.pdf",
+}
+
+
+# Ошибки Telegram, после которых сохранённый file_id больше не годится
+FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file reference expired")
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    message = str(error).lower().replace("_", " ")
+    return any(marker in message for marker in FILE_ID_ERRORS)
+
+
+class MediaRegistry:
+    """Отправка локальных файлов через кэш Telegram file_id.
+
+    Файл загружается в Telegram один раз, полученный file_id сохраняется в БД
+    по хэшу содержимого. Если файл на диске изменился, хэш меняется и файл
+    автоматически загружается заново.
+    """
+
+    def __init__(self, bot: Bot, media_req: MediaReq) -> None:
+        self.bot = bot
+        self.media_req = media_req
+        # path -> (mtime, size, sha256): не перечитываем неизменившийся файл
+        self._hashes: Dict[Path, Tuple[float, int, str]] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def asset_path(name: str) -> Path:
+        return MEDIA_ASSETS[name]
+
+    async def send_photo(
+        self, chat_id: int, path: Path, **kwargs
+    ) -> types.Message:
+        return await self._send("photo", chat_id, Path(path), **kwargs)
+
+    async def send_document(
+        self, chat_id: int, path: Path, **kwargs
+    ) -> types.Message:
+        return await self._send("document", chat_id, Path(path), **kwargs)
+
+    async def _send(
+        self, kind: str, chat_id: int, path: Path, **kwargs
+    ) -> types.Message:
+        digest = await self._content_hash(path)
+        file_id = await self._get_file_id(digest)
+        if file_id:
+            try:
+                return await self._send_media(kind, chat_id, file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # Остальные ошибки (чат не найден, неверная подпись) к file_id не относятся
+                if not is_file_id_error(e):
+                    raise
+                # file_id стал недействительным (например, сменили токен бота)
+                logger.warning(f"file_id для {path.name} отклонён Telegram: {e}")
+                await self._forget(digest)
+
+        lock = self._upload_locks.setdefault(digest, asyncio.Lock())
+        async with lock:
+            # Пока ждали, файл мог загрузить параллельный запрос
+            file_id = self._file_ids.get(digest)
+            if file_id:
+                return await self._send_media(kind, chat_id, file_id, **kwargs)
+
+            message = await self._send_media(kind, chat_id, FSInputFile(path), **kwargs)
+            file_id = self._extract_file_id(kind, message)
+            if file_id:
+                self._file_ids[digest] = file_id
+                await self.media_req.save_file_id(digest, kind, file_id, str(path))
+                logger.info(f"{path.name} загружен в Telegram, file_id сохранён")
+            return message
+
+    async def _send_media(self, kind: str, chat_id: int, media, **kwargs):
+        if kind == "photo":
+            return await self.bot.send_photo(chat_id=chat_id, photo=media, **kwargs)
+        return await self.bot.send_document(chat_id=chat_id, document=media, **kwargs)
+
+    @staticmethod
+    def _extract_file_id(kind: str, message: types.Message) -> Optional[str]:
+        if kind == "photo" and message.photo:
+            return message.photo[-1].file_id
+        if kind == "document" and message.document:
+            return message.document.file_id
+        return None
+
+    async def _get_file_id(self, digest: str) -> Optional[str]:
+        file_id = self._file_ids.get(digest)
+        if file_id is None:
+            file_id = await self.media_req.get_file_id(digest)
+            if file_id:
+                self._file_ids[digest] = file_id
+        return file_id
+
+    async def _forget(self, digest: str) -> None:
+        self._file_ids.pop(digest, None)
+        await self.media_req.forget_file_id(digest)
+
+    async def _content_hash(self, path: Path) -> str:
+        stat = path.stat()
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = await asyncio.to_thread(self._sha256, path)
+        self._hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        return h.hexdigest()
@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.instrumentation import handler_scope
+from database.routing import consistency_key
+
+
+class DbConsistencyMiddleware(BaseMiddleware):
+    """Привязывает запросы к БД в обработке апдейта к пользователю.
+
+    Записи пользователя делают его чтения на несколько секунд «липкими» к
+    primary: следующий шаг FSM видит только что сохранённые данные.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        with consistency_key(user.id if user else None):
+            return await handler(event, data)
+
+
+class HandlerTagMiddleware(BaseMiddleware):
+    """Помечает запросы к БД именем обработчика aiogram (для /dbstats)"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = getattr(callback, "__qualname__", None) or type(event).__name__
+        with handler_scope(name):
+            return await handler(event, data)
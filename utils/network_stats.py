@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import aiohttp
+
+from database.models import Algorithm
+from database.read_models import AlgorithmDataRow, CoinParamsRow
+from database.request import CalculatorReq
+from database.routing import primary_reads
+from utils.calculator import MiningCalculator
+
+logger = logging.getLogger(__name__)
+
+
+def network_hashrate_factor(algorithm: Algorithm) -> float:
+    """Источники отдают H/s, в БД хешрейт сети - в единицах калькулятора"""
+    unit = MiningCalculator.network_hashrate_unit(algorithm.value)
+    return MiningCalculator.UNIT_MULTIPLIERS[unit]
+
+
+class NetworkStats(NamedTuple):
+    """Данные сети монеты; None - источник это значение не знает"""
+
+    network_hashrate: Optional[float] = None  # H/s
+    difficulty: Optional[float] = None
+    block_reward: Optional[float] = None
+
+
+class NetworkStatsSource:
+    """Источник данных сети. fetch возвращает None, если монета не поддерживается"""
+
+    name = "base"
+
+    async def fetch(
+        self, session: aiohttp.ClientSession, coin: str
+    ) -> Optional[NetworkStats]:
+        raise NotImplementedError
+
+
+class FixtureSource(NetworkStatsSource):
+    """Данные из JSON-файла или словаря: {"BTC": {"network_hashrate": ..., ...}}.
+    Для тестов и ручной правки без доступа к API"""
+
+    name = "fixture"
+
+    def __init__(self, data: Optional[Dict[str, dict]] = None, path: Optional[str] = None) -> None:
+        self.data = data
+        self.path = path
+
+    async def fetch(
+        self, session: aiohttp.ClientSession, coin: str
+    ) -> Optional[NetworkStats]:
+        data = self.data
+        if data is None:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        values = data.get(coin)
+        if values is None:
+            return None
+        return NetworkStats(
+            network_hashrate=values.get("network_hashrate"),
+            difficulty=values.get("difficulty"),
+            block_reward=values.get("block_reward"),
+        )
+
+
+class BlockchairSource(NetworkStatsSource):
+    """api.blockchair.com/{chain}/stats: хешрейт за 24 часа и сложность.
+    Награду за блок Blockchair не отдаёт - она остаётся прежней.
+    Сетей KAS, ETC, KDA и KLS у Blockchair нет: без другого источника
+    (например, fixture) их данные не обновляются - refresh пишет об этом в лог"""
+
+    name = "blockchair"
+    url = "https://api.blockchair.com/{chain}/stats"
+    chains = {
+        "BTC": "bitcoin",
+        "BCH": "bitcoin-cash",
+        "BSV": "bitcoin-sv",
+        "LTC": "litecoin",
+        "DOGE": "dogecoin",
+    }
+
+    async def fetch(
+        self, session: aiohttp.ClientSession, coin: str
+    ) -> Optional[NetworkStats]:
+        chain = self.chains.get(coin)
+        if chain is None:
+            return None
+        async with session.get(self.url.format(chain=chain)) as response:
+            response.raise_for_status()
+            payload = await response.json()
+        data = payload["data"]
+        hashrate = data.get("hashrate_24h")
+        difficulty = data.get("difficulty")
+        return NetworkStats(
+            network_hashrate=float(hashrate) if hashrate is not None else None,
+            difficulty=float(difficulty) if difficulty is not None else None,
+        )
+
+
+def make_sources(names: Iterable[str], fixture_path: Optional[str] = None) -> List[NetworkStatsSource]:
+    """Источники по именам из NETWORK_STATS_SOURCES, в порядке приоритета"""
+    sources: List[NetworkStatsSource] = []
+    for name in names:
+        name = name.strip().lower()
+        if name == "blockchair":
+            sources.append(BlockchairSource())
+        elif name == "fixture" and fixture_path:
+            sources.append(FixtureSource(path=fixture_path))
+        elif name:
+            logger.warning(f"Данные сети: неизвестный источник {name!r}")
+    return sources
+
+
+def _changed(old: float, new: float, threshold: float) -> bool:
+    return abs(new - (old or 0.0)) > threshold * max(abs(old or 0.0), 1e-12)
+
+
+class NetworkStatsRefresher:
+    """Обновление algorithm_data по расписанию (рядом с обновлением цен).
+
+    Данные по монете каждого алгоритма запрашиваются параллельно; источники
+    перебираются по приоритету, пока один не ответит. Записываются только
+    изменившиеся значения - одним запросом на таблицу; калькулятор читает
+    algorithm_data при каждом расчёте, а индекс coin_network_params
+    сбрасывается после записи, так что новые данные действуют без перезапуска.
+    Значения, отличающиеся от полученных в прошлый раз больше чем в max_jump
+    раз, считаются сбоем источника и пропускаются. Начальные значения
+    (refreshed_at IS NULL - из источника ещё не обновлялись) заменяются без
+    этой проверки: ради исправления устаревших начальных данных обновление
+    и нужно.
+    """
+
+    def __init__(
+        self,
+        calc_req: CalculatorReq,
+        sources: Sequence[NetworkStatsSource],
+        change_threshold: float = 0.001,
+        max_jump: float = 10.0,
+        timeout: float = 15.0,
+    ) -> None:
+        self.calc_req = calc_req
+        self.sources = list(sources)
+        self.change_threshold = change_threshold
+        self.max_jump = max_jump
+        self.timeout = timeout
+        # Монеты, по которым ни один источник не дал данных в прошлый раз
+        self.missing: List[str] = []
+
+    async def _fetch(self, session: aiohttp.ClientSession, coin: str) -> Optional[NetworkStats]:
+        for source in self.sources:
+            try:
+                stats = await source.fetch(session, coin)
+            except Exception as e:
+                logger.warning(f"Данные сети: {source.name} не ответил для {coin}: {e}")
+                continue
+            if stats is not None:
+                return stats
+        return None
+
+    def _updates(
+        self,
+        label: str,
+        current: Dict[str, Optional[float]],
+        candidates: Dict[str, Optional[float]],
+        guarded: bool,
+    ) -> Dict[str, float]:
+        updates = {}
+        for field, new in candidates.items():
+            old = current[field]
+            if new is None or not new > 0:
+                continue
+            if guarded and old and not (old / self.max_jump <= new <= old * self.max_jump):
+                logger.warning(
+                    f"Данные сети: {label} {field} {old} -> {new} "
+                    f"похоже на сбой источника, пропускаем"
+                )
+                continue
+            if _changed(old, new, self.change_threshold):
+                updates[field] = new
+        return updates
+
+    @staticmethod
+    def _first_refresh(
+        refreshed_at: Optional[datetime], candidates: Dict[str, Optional[float]]
+    ) -> bool:
+        """Источник впервые подтвердил начальные значения: строку надо пометить
+        обновлённой, даже если значения не изменились, - дальше действует max_jump"""
+        return refreshed_at is None and any(
+            value is not None and value > 0 for value in candidates.values()
+        )
+
+    @staticmethod
+    def _hashrate(algorithm: Algorithm, stats: NetworkStats) -> Optional[float]:
+        if stats.network_hashrate is None:
+            return None
+        return stats.network_hashrate / network_hashrate_factor(algorithm)
+
+    def _merge(self, row: AlgorithmDataRow, stats: NetworkStats) -> Optional[AlgorithmDataRow]:
+        candidates = {
+            "network_hashrate": self._hashrate(row.algorithm, stats),
+            "difficulty": stats.difficulty,
+            "block_reward": stats.block_reward,
+        }
+        current = {field: getattr(row, field) for field in candidates}
+        updates = self._updates(
+            row.algorithm.value, current, candidates, guarded=row.refreshed_at is not None
+        )
+        if not updates and not self._first_refresh(row.refreshed_at, candidates):
+            return None
+        now = datetime.now()
+        return row._replace(last_updated=now, refreshed_at=now, **updates)
+
+    def _merge_coin(self, row: CoinParamsRow, stats: NetworkStats) -> Optional[CoinParamsRow]:
+        candidates = {
+            "network_hashrate": self._hashrate(row.algorithm, stats),
+            "block_reward": stats.block_reward,
+        }
+        current = {field: getattr(row, field) for field in candidates}
+        updates = self._updates(
+            row.symbol, current, candidates, guarded=row.refreshed_at is not None
+        )
+        if not updates and not self._first_refresh(row.refreshed_at, candidates):
+            return None
+        now = datetime.now()
+        return row._replace(updated_at=now, refreshed_at=now, **updates)
+
+    def _report_missing(
+        self,
+        stats_by_coin: Dict[str, Optional[NetworkStats]],
+        rows: List[AlgorithmDataRow],
+        coin_rows: List[CoinParamsRow],
+    ) -> None:
+        """Монеты без данных ни в одном источнике - в лог при каждом изменении списка"""
+        missing = [coin for coin, stats in stats_by_coin.items() if stats is None]
+        if missing == self.missing:
+            return
+        self.missing = missing
+        if not missing:
+            return
+        algorithms = {row.symbol: row.algorithm for row in coin_rows}
+        algorithms.update({row.default_coin: row.algorithm for row in rows})
+        logger.warning(
+            "Данные сети: нет источника или данных для "
+            + ", ".join(f"{coin} ({algorithms[coin].value})" for coin in missing)
+            + " - калькулятор считает по прежним значениям"
+        )
+
+    async def refresh(self) -> List[AlgorithmDataRow]:
+        """Изменившиеся строки algorithm_data (уже записанные).
+
+        Заодно обновляются coin_network_params: у BCH, BSV и DOGE свои сети,
+        отличные от сети монеты алгоритма по умолчанию.
+        """
+        if not self.sources:
+            return []
+        # Сравниваем с primary: реплика может отставать
+        with primary_reads():
+            rows = await self.calc_req.get_algorithm_data_all()
+            coin_rows = await self.calc_req.get_coin_params_all()
+        coins = sorted(
+            {row.default_coin for row in rows} | {row.symbol for row in coin_rows}
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(*(self._fetch(session, coin) for coin in coins))
+        stats_by_coin = dict(zip(coins, results))
+        self._report_missing(stats_by_coin, rows, coin_rows)
+
+        changed = []
+        for row in rows:
+            stats = stats_by_coin.get(row.default_coin)
+            if stats is None:
+                continue
+            updated = self._merge(row, stats)
+            if updated is not None:
+                changed.append(updated)
+        await self.calc_req.update_network_stats(changed)
+
+        changed_coins = []
+        for row in coin_rows:
+            stats = stats_by_coin.get(row.symbol)
+            if stats is None:
+                continue
+            updated = self._merge_coin(row, stats)
+            if updated is not None:
+                changed_coins.append(updated)
+        await self.calc_req.update_coin_params(changed_coins)
+
+        if changed or changed_coins:
+            logger.info(
+                "Данные сети обновлены: "
+                + ", ".join(
+                    [row.algorithm.value for row in changed]
+                    + [row.symbol for row in changed_coins]
+                )
+            )
+        return changed
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from database.read_models import OutboxRow
+from database.request import OutboxReq
+
+logger = logging.getLogger(__name__)
+
+# Сбои, после которых отправку стоит повторить позже
+RETRYABLE_ERRORS = (TelegramNetworkError, TelegramServerError, OSError, asyncio.TimeoutError)
+
+
+class Outbox:
+    """Фоновая отправка сообщений из outbox_messages (заявки для администратора).
+
+    put() только записывает сообщение в БД и будит воркер, обработчик
+    пользователя не ждёт Telegram. При сбое сети воркер повторяет отправку
+    с экспоненциальной задержкой (до max_attempts попыток), retry_after
+    от Telegram выдерживает. Прочие ошибки API (бот заблокирован, неверный
+    file_id) окончательные - сообщение помечается failed. Сообщения
+    хранятся в БД, поэтому переживают перезапуск бота.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        outbox_req: OutboxReq,
+        max_attempts: int = 10,
+        base_delay: float = 5.0,
+        max_delay: float = 600.0,
+        poll_interval: float = 30.0,
+        lease: float = 60.0,
+        batch_size: int = 20,
+        keep_days: int = 7,
+    ) -> None:
+        self.bot = bot
+        self.outbox_req = outbox_req
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.batch_size = batch_size
+        self.keep_days = keep_days
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def put(
+        self,
+        chat_id: int,
+        text: str,
+        photo: Optional[str] = None,
+        fallback_text: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+    ) -> int:
+        message_id = await self.outbox_req.enqueue(
+            chat_id, text, photo=photo, fallback_text=fallback_text, parse_mode=parse_mode
+        )
+        self._wakeup.set()
+        return message_id
+
+    async def start(self) -> None:
+        purged = await self.outbox_req.purge_sent(
+            datetime.now() - timedelta(days=self.keep_days)
+        )
+        if purged:
+            logger.info(f"Outbox: удалено отправленных сообщений: {purged}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.drain()
+                timeout = await self._idle_timeout()
+            except Exception as e:
+                logger.warning(f"Outbox: ошибка обработки очереди: {e}")
+                timeout = self.poll_interval
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _idle_timeout(self) -> float:
+        """Ждём до ближайшей повторной попытки, но не дольше poll_interval"""
+        next_due = await self.outbox_req.next_due_at()
+        if next_due is None:
+            return self.poll_interval
+        wait = (next_due - datetime.now()).total_seconds()
+        return min(max(wait, 0.0), self.poll_interval)
+
+    async def drain(self) -> int:
+        """Отправить все сообщения, которым пора уйти; число отправленных"""
+        sent = 0
+        while True:
+            rows = await self.outbox_req.claim_due(self.batch_size, self.lease)
+            if not rows:
+                return sent
+            for row in rows:
+                if await self._deliver(row):
+                    sent += 1
+
+    async def _deliver(self, row: OutboxRow) -> bool:
+        try:
+            await self._send(row)
+        except TelegramRetryAfter as e:
+            await self.outbox_req.retry_later(row.id, e.retry_after, str(e))
+            return False
+        except RETRYABLE_ERRORS as e:
+            error = str(e) or type(e).__name__
+            if row.attempts >= self.max_attempts:
+                logger.error(f"Outbox: сообщение {row.id} не отправлено за {row.attempts} попыток: {error}")
+                await self.outbox_req.mark_failed(row.id, error)
+            else:
+                delay = min(self.base_delay * 2 ** (row.attempts - 1), self.max_delay)
+                await self.outbox_req.retry_later(row.id, delay, error)
+            return False
+        except TelegramAPIError as e:
+            logger.error(f"Outbox: сообщение {row.id} в чат {row.chat_id} отклонено: {e}")
+            await self.outbox_req.mark_failed(row.id, str(e))
+            return False
+        await self.outbox_req.mark_sent(row.id)
+        return True
+
+    async def _send(self, row: OutboxRow) -> None:
+        if not row.photo:
+            await self.bot.send_message(
+                row.chat_id, row.message_text, parse_mode=row.parse_mode
+            )
+            return
+        try:
+            await self.bot.send_photo(
+                chat_id=row.chat_id,
+                photo=row.photo,
+                caption=row.message_text,
+                parse_mode=row.parse_mode,
+                request_timeout=15,
+            )
+        except RETRYABLE_ERRORS as e:
+            if not row.fallback_text:
+                raise
+            # Фото не уходит из-за сети - администратор получит хотя бы текст
+            logger.warning(f"Outbox: фото не отправлено ({e}), отправляем текст")
+            await self.bot.send_message(row.chat_id, row.fallback_text, parse_mode=None)
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from database.request import UserReq
+from utils.broadcast import UNREACHABLE_OUTCOMES, RateLimiter, classify_delivery_error
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationCycle:
+    """Одна рассылка курсов: счётчики для лога"""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.sent = 0
+        self.failed = 0
+        self.unreachable: List[int] = []
+        self.task: Optional[asyncio.Task] = None
+
+
+class PriceNotifier:
+    """Рассылка курсов подписчикам (User.notifications) после каждого обновления цен.
+
+    Текст готовится один раз на снимок цен, uid читаются пачками по индексу
+    и раздаются пулу отправителей с общим на бота темпом (RateLimiter).
+    Если новый снимок пришёл раньше, чем закончилась рассылка прошлого,
+    прошлая отменяется: устаревшие цены дорассылать незачем.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        user_req: UserReq,
+        enabled: bool = False,
+        rate: float = 20.0,
+        workers: int = 8,
+        batch_size: int = 1000,
+        max_attempts: int = 3,
+        limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.bot = bot
+        self.user_req = user_req
+        self.enabled = enabled
+        # В боте - тот же RateLimiter, что у BroadcastEngine
+        self.limiter = limiter or RateLimiter(rate)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.current: Optional[NotificationCycle] = None
+
+    def notify(self, text: str) -> Optional[NotificationCycle]:
+        """Запускает рассылку в фоне и сразу возвращает управление"""
+        if not self.enabled:
+            return None
+        previous = self.current
+        if previous is not None and previous.task and not previous.task.done():
+            logger.info(
+                f"Курсы: новый снимок цен, прошлая рассылка остановлена "
+                f"(отправлено {previous.sent})"
+            )
+            previous.task.cancel()
+        cycle = NotificationCycle(text)
+        cycle.task = asyncio.create_task(self._run(cycle))
+        self.current = cycle
+        return cycle
+
+    async def stop(self) -> None:
+        cycle = self.current
+        if cycle is not None and cycle.task and not cycle.task.done():
+            cycle.task.cancel()
+            await asyncio.gather(cycle.task, return_exceptions=True)
+
+    async def _run(self, cycle: NotificationCycle) -> None:
+        limiter = self.limiter
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 4)
+        workers = [
+            asyncio.create_task(self._worker(cycle, queue, limiter))
+            for _ in range(self.workers)
+        ]
+        try:
+            async for batch in self.user_req.iter_uid_batches(
+                self.batch_size, notifications=True
+            ):
+                for uid in batch:
+                    await queue.put(uid)
+                if len(cycle.unreachable) >= self.batch_size:
+                    await self._mark_unreachable(cycle)
+            await queue.join()
+            logger.info(
+                f"Курсы разосланы: успешно {cycle.sent}, не доставлено {cycle.failed}"
+            )
+        except Exception as e:
+            logger.error(f"Курсы: рассылка прервана ошибкой: {e}")
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Отменённый цикл тоже сохраняет найденных недоступных
+            await asyncio.shield(self._mark_unreachable(cycle))
+            if self.current is cycle:
+                self.current = None
+
+    async def _mark_unreachable(self, cycle: NotificationCycle) -> None:
+        uids, cycle.unreachable = cycle.unreachable, []
+        try:
+            await self.user_req.mark_unreachable(uids)
+        except Exception as e:
+            logger.warning(f"Курсы: не удалось пометить недоступных: {e}")
+
+    async def _worker(
+        self, cycle: NotificationCycle, queue: asyncio.Queue, limiter: RateLimiter
+    ) -> None:
+        while True:
+            uid = await queue.get()
+            try:
+                outcome = await self._send(cycle.text, uid, limiter)
+                if outcome == "sent":
+                    cycle.sent += 1
+                else:
+                    cycle.failed += 1
+                    if outcome in UNREACHABLE_OUTCOMES:
+                        cycle.unreachable.append(uid)
+            except Exception as e:
+                logger.error(f"Курсы: ошибка отправки {uid}: {e}")
+                cycle.failed += 1
+            finally:
+                queue.task_done()
+
+    async def _send(self, text: str, uid: int, limiter: RateLimiter) -> str:
+        for attempt in range(1, self.max_attempts + 1):
+            await limiter.acquire(uid)
+            try:
+                await self.bot.send_message(uid, text, parse_mode="Markdown")
+                return "sent"
+            except TelegramRetryAfter as e:
+                logger.warning(f"Курсы: Telegram просит паузу {e.retry_after} с")
+                limiter.pause(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning(f"Курсы: временная ошибка для {uid}: {e}")
+                await asyncio.sleep(attempt)
+            except TelegramAPIError as e:
+                return classify_delivery_error(e)
+        return "failed"
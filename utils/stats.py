@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+from database.request import StatsReq
+
+logger = logging.getLogger(__name__)
+
+USERS_NEW = "users_new"
+CALCULATIONS = "calculations"
+AI_QUESTIONS = "ai_questions"
+SELL_REQUESTS = "sell_requests"
+
+METRIC_TITLES = (
+    (USERS_NEW, "👤 Новые пользователи"),
+    (CALCULATIONS, "🧮 Расчёты доходности"),
+    (AI_QUESTIONS, "🤖 Вопросы AI"),
+    (SELL_REQUESTS, "📦 Заявки на продажу"),
+)
+
+
+class StatsCounter:
+    """Счётчики для статистики админки.
+
+    Обработчики увеличивают счётчик в памяти (incr - без обращения к БД),
+    раз в flush_interval секунд приращения за день пишутся в daily_stats
+    одним запросом. Экран статистики читает суммы по дням - их число не
+    зависит от размера users и sell_requests.
+    """
+
+    def __init__(self, stats_req: StatsReq, flush_interval: float = 5.0) -> None:
+        self.stats_req = stats_req
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[date, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def incr(self, metric: str, value: int = 1) -> None:
+        key = (date.today(), metric)
+        self._pending[key] = self._pending.get(key, 0) + value
+
+    async def start(self) -> None:
+        if await self.stats_req.backfill(USERS_NEW, SELL_REQUESTS):
+            logger.info("Статистика: счётчики заполнены по существующим данным")
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        try:
+            await self.stats_req.add_counters(pending)
+        except Exception:
+            # Не потеряем приращения: запишем со следующей пачкой
+            for key, value in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + value
+            raise
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Статистика: не удалось сохранить счётчики: {e}")
+
+    async def snapshot(
+        self, days: int = 7
+    ) -> Tuple[Dict[str, int], Dict[date, Dict[str, int]]]:
+        """Итоги и счётчики за последние days дней, включая ещё не записанные"""
+        since = date.today() - timedelta(days=days - 1)
+        totals = await self.stats_req.get_totals()
+        daily = await self.stats_req.get_daily(since)
+        for (day, metric), value in self._pending.items():
+            totals[metric] = totals.get(metric, 0) + value
+            if day >= since:
+                day_stats = daily.setdefault(day, {})
+                day_stats[metric] = day_stats.get(metric, 0) + value
+        return totals, daily
+
+
+def render_stats(
+    totals: Dict[str, int], daily: Dict[date, Dict[str, int]], days: int = 7
+) -> str:
+    today = date.today()
+    week = [today - timedelta(days=offset) for offset in range(days)]
+    lines = ["📊 Статистика", ""]
+    for metric, title in METRIC_TITLES:
+        by_day = [daily.get(day, {}).get(metric, 0) for day in week]
+        lines.append(
+            f"{title}: всего {totals.get(metric, 0)}, сегодня {by_day[0]}, "
+            f"вчера {by_day[1]}, за {days} дн. {sum(by_day)}"
+        )
+
+    lines += ["", f"По дням ({days} дн.): пользователи / расчёты / AI / заявки"]
+    for day in week:
+        values = daily.get(day, {})
+        lines.append(
+            f"{day:%d.%m}: " + " / ".join(str(values.get(m, 0)) for m, _ in METRIC_TITLES)
+        )
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+import asyncio
+import hmac
+import logging
+import secrets
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def make_secret() -> str:
+    """Секрет для setWebhook: Telegram допускает A-Z, a-z, 0-9, _ и -"""
+    return secrets.token_urlsafe(32)
+
+
+class WebhookServer:
+    """Приём апдейтов Telegram через webhook (aiohttp).
+
+    Обработчик запроса проверяет секретный заголовок, кладёт апдейт в
+    ограниченную очередь и сразу отвечает 200; апдейты обрабатывают
+    workers фоновых задач через dp.feed_update. Если очередь заполнена,
+    отвечаем 503 - Telegram повторит доставку позже, память не растёт.
+    При остановке сервер перестаёт принимать запросы и дообрабатывает
+    очередь (не дольше drain_timeout секунд).
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        secret: str,
+        path: str = "/webhook",
+        queue_size: int = 1000,
+        workers: int = 16,
+        drain_timeout: float = 30.0,
+    ) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.path = path
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.queue: "asyncio.Queue[Update]" = asyncio.Queue(maxsize=queue_size)
+        self.received = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self._closing = False
+        self._tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle)
+        self.app.router.add_get("/health", self.health)
+        self.app.on_startup.append(self._on_startup)
+        self.app.on_shutdown.append(self._on_shutdown)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret.encode()):
+            return web.Response(status=401, text="Unauthorized")
+        if self._closing:
+            return web.Response(status=503, text="Shutting down")
+        try:
+            payload = await request.json(loads=self.bot.session.json_loads)
+            update = Update.model_validate(payload, context={"bot": self.bot})
+        except (ValueError, ValidationError):
+            return web.Response(status=400, text="Bad update")
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return web.Response(status=503, text="Busy")
+        self.received += 1
+        return web.Response()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "queue": self.queue.qsize(),
+                "received": self.received,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+            }
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Webhook: ошибка обработки апдейта {update.update_id}")
+            finally:
+                self.queue.task_done()
+
+    async def _on_startup(self, app: web.Application) -> None:
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        # Сайты уже остановлены (новых соединений нет) - дообрабатываем очередь
+        self._closing = True
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Webhook: не обработано {self.queue.qsize()} апдейтов за {self.drain_timeout} с"
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def start(self, host: str, port: int) -> None:
+        self._runner = web.AppRunner(self.app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        logger.info(f"Webhook: слушаем {host}:{port}{self.path}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None